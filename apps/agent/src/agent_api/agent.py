@@ -1,11 +1,22 @@
-from typing import Any, Protocol, Sequence
+import asyncio
+import hashlib
+from typing import Any, NamedTuple, Protocol, Sequence
 
+from openai import AsyncOpenAI
+from pydantic import BaseModel
 from pydantic_ai import Agent as PydanticAgent
 from pydantic_ai import AgentRunResult, BinaryContent, UserContent
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic_ai.providers.openai import OpenAIProvider
 
+from agent_api.metrics import Metrics
 from agent_api.models.procurement import ProcurementRequestCreate
+from agent_api.pdf_text import TextExtractor
+from agent_api.streaming import (
+    OutputListener,
+    forward_partial_output,
+    output_listener,
+)
 
 
 class Agent(Protocol):
@@ -22,18 +33,43 @@ class AgentApi(Protocol):
     async def complete(self, file_content: bytes) -> AgentRunResult[Any]: ...
 
 
-class IntakeAgent(Agent):
-    """Agent that extracts procurement information from documents."""
+DEFAULT_MODEL = "gpt-5"
+
+DOCUMENT_INSTRUCTION = "Extract the procurement information from this document."
+TEXT_LAYER_INSTRUCTION = (
+    f"{DOCUMENT_INSTRUCTION} This is its text, laid out as on the page with "
+    "pages separated by form feeds."
+)
+
 
-    def __init__(self, openai_api_key: str) -> None:
+class IntakeAgent(Agent):
+    """Agent that extracts procurement information from documents.
+
+    The output is a `ProcurementRequestCreate`, unless another `output_type`
+    is given, e.g. for parts of a document.
+    """
+
+    def __init__(
+        self,
+        openai_api_key: str,
+        model_name: str = DEFAULT_MODEL,
+        output_type: type[BaseModel] = ProcurementRequestCreate,
+    ) -> None:
+        self.model_name = model_name
         self.agent = PydanticAgent(
-            OpenAIChatModel("gpt-5", provider=OpenAIProvider(api_key=openai_api_key)),
-            output_type=ProcurementRequestCreate,
+            OpenAIChatModel(
+                model_name,
+                provider=OpenAIProvider(
+                    # Retries are left to the `LimitedAgent` wrapping this agent
+                    openai_client=AsyncOpenAI(api_key=openai_api_key, max_retries=0)
+                ),
+            ),
+            output_type=output_type,
         )
 
     async def run(
         self, user_prompt: str | Sequence[UserContent]
-    ) -> AgentRunResult[ProcurementRequestCreate]:
+    ) -> AgentRunResult[Any]:
         """
         Process a user prompt with the agent.
 
@@ -43,14 +79,46 @@ class IntakeAgent(Agent):
         Returns:
             AgentRunResult with the extracted procurement information
         """
+        if output_listener.get() is not None:
+            # Stream the response so the listener sees the output as it is generated
+            return await self.agent.run(
+                user_prompt, event_stream_handler=forward_partial_output
+            )
         return await self.agent.run(user_prompt)
 
 
-class IntakeAgentApi(AgentApi):
-    """Manages intake operations including document processing."""
+class _InFlight(NamedTuple):
+    run: asyncio.Future[AgentRunResult[ProcurementRequestCreate]]
+    # The output listeners of the callers, `None` if the run does not stream
+    listeners: list[OutputListener] | None
 
-    def __init__(self, agent: Agent) -> None:
+
+class IntakeAgentApi(AgentApi):
+    """Manages intake operations including document processing.
+
+    Concurrent calls for the same document share a single agent run. The
+    first call starts it, later calls wait for the same result or exception,
+    counted as `intake.runs` and `intake.coalesced`. The partial output of a
+    streaming run goes to the output listeners of all its callers. A run
+    that does not stream cannot stream to callers with a listener, so they
+    start a streaming run of their own instead.
+
+    With a `text_extractor`, documents with a text layer are sent to the
+    model as text, which is far fewer tokens than the PDF itself. Scanned
+    documents are still sent as PDF. Both are counted as `intake.text_layer`
+    and `intake.binary`.
+    """
+
+    def __init__(
+        self,
+        agent: Agent,
+        metrics: Metrics | None = None,
+        text_extractor: TextExtractor | None = None,
+    ) -> None:
         self.agent = agent
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.text_extractor = text_extractor
+        self._in_flight: dict[str, _InFlight] = {}
 
     async def complete(
         self, file_content: bytes
@@ -64,9 +132,68 @@ class IntakeAgentApi(AgentApi):
         Returns:
             AgentRunResult containing extracted information
         """
+        fingerprint = hashlib.sha256(file_content).hexdigest()
+        listener = output_listener.get()
+        in_flight = self._in_flight.get(fingerprint)
+        if in_flight is None or (listener is not None and in_flight.listeners is None):
+            self.metrics.increment("intake.runs")
+            in_flight = self._start(fingerprint, file_content, listener is not None)
+        else:
+            self.metrics.increment("intake.coalesced")
+
+        if listener is not None and in_flight.listeners is not None:
+            in_flight.listeners.append(listener)
+        try:
+            # A caller that goes away must not cancel the run for the others
+            return await asyncio.shield(in_flight.run)
+        finally:
+            if listener is not None and in_flight.listeners is not None:
+                in_flight.listeners.remove(listener)
+
+    def _start(self, fingerprint: str, file_content: bytes, stream: bool) -> _InFlight:
+        listeners: list[OutputListener] = []
+
+        def fan_out(partial: dict[str, Any]) -> None:
+            for listener in list(listeners):
+                listener(partial)
+
+        # The run copies the context, so it sees the listener set here
+        token = output_listener.set(fan_out if stream else None)
+        try:
+            run = asyncio.ensure_future(self._run(file_content))
+        finally:
+            output_listener.reset(token)
+        in_flight = _InFlight(run, listeners if stream else None)
+        self._in_flight[fingerprint] = in_flight
+        run.add_done_callback(lambda done: self._finish(fingerprint, done))
+        return in_flight
+
+    async def _run(
+        self, file_content: bytes
+    ) -> AgentRunResult[ProcurementRequestCreate]:
+        if self.text_extractor is not None:
+            text = await self.text_extractor.extract(file_content)
+            if text is not None:
+                self.metrics.increment("intake.text_layer")
+                return await self.agent.run([TEXT_LAYER_INSTRUCTION, text])
+            self.metrics.increment("intake.binary")
+
         return await self.agent.run(
             [
-                "Extract the procurement information from this document.",
+                DOCUMENT_INSTRUCTION,
                 BinaryContent(data=file_content, media_type="application/pdf"),
             ]
         )
+
+    def _finish(
+        self,
+        fingerprint: str,
+        run: asyncio.Future[AgentRunResult[ProcurementRequestCreate]],
+    ) -> None:
+        # A streaming run may have taken the place of this one
+        in_flight = self._in_flight.get(fingerprint)
+        if in_flight is not None and in_flight.run is run:
+            del self._in_flight[fingerprint]
+        if not run.cancelled():
+            # Mark the exception as retrieved in case every caller went away
+            run.exception()
@@ -1,8 +1,67 @@
 import asyncio
+from typing import Any, Callable
 
-from agent_api.agent import IntakeAgent, IntakeAgentApi
+from pydantic import BaseModel
+
+from agent_api.agent import Agent, IntakeAgent, IntakeAgentApi
+from agent_api.cache import (
+    CachingAgentApi,
+    DiskResultCache,
+    MemoryResultCache,
+    ResultCache,
+    TieredResultCache,
+)
+from agent_api.cascade import CascadeAgent, ModelTier
+from agent_api.chunking import ChunkingAgent, OrderLines
 from agent_api.config import AppConfig
+from agent_api.jobs import JobQueue
+from agent_api.limiter import AdaptiveLimiter, LimitedAgent
+from agent_api.metrics import Metrics
+from agent_api.models.procurement import ProcurementRequestCreate
+from agent_api.pdf_text import PdfTextExtractor
 from agent_api.shell import Shell
+from agent_api.templates import TemplateAgent, TemplateLearner
+from agent_api.validation import check_order_lines, check_request
+
+
+def build_cache(config: AppConfig) -> ResultCache:
+    """Create the result cache selected by the configuration."""
+    memory = MemoryResultCache(config.cache_max_entries, config.cache_ttl_seconds)
+    if config.cache_dir is None:
+        return memory
+    disk = DiskResultCache(
+        config.cache_dir, config.cache_disk_max_entries, config.cache_ttl_seconds
+    )
+    return TieredResultCache(memory, disk)
+
+
+def check_order_lines_of(output: Any) -> list[str]:
+    """Check only the order lines of an output, e.g. of a part of a document."""
+    return check_order_lines(output.order_lines)
+
+
+def build_model_agent(
+    config: AppConfig,
+    limiter: AdaptiveLimiter,
+    metrics: Metrics,
+    output_type: type[BaseModel] = ProcurementRequestCreate,
+    check: Callable[[Any], list[str]] = check_request,
+) -> Agent:
+    """Create the agent that calls the configured models, as a cascade if several."""
+    tiers = [
+        ModelTier(
+            model_name,
+            LimitedAgent(
+                IntakeAgent(config.openai_key, model_name, output_type),
+                limiter,
+                max_retries=config.llm_max_retries,
+            ),
+        )
+        for model_name in config.models
+    ]
+    if len(tiers) == 1:
+        return tiers[0].agent
+    return CascadeAgent(tiers, metrics, check)
 
 
 class App:
@@ -10,13 +69,67 @@ class App:
 
     def __init__(self, config: AppConfig) -> None:
         self.config = config
-        agent = IntakeAgent(openai_api_key=config.openai_key)
-        self.intake_agent_api = IntakeAgentApi(agent=agent)
-        self.shell = Shell(self.config, self.intake_agent_api)
+        self.metrics = Metrics()
+        limiter = AdaptiveLimiter(
+            self.metrics,
+            initial_limit=config.llm_initial_concurrency,
+            max_limit=config.llm_max_concurrency,
+            latency_target=config.llm_latency_target,
+        )
+        extraction_agent = build_model_agent(config, limiter, self.metrics)
+        if config.chunk_pages is not None:
+            # Parts are checked without the total cost, which covers the
+            # whole document, the merged request is checked in full
+            extraction_agent = ChunkingAgent(
+                extraction_agent,
+                build_model_agent(
+                    config, limiter, self.metrics, OrderLines, check_order_lines_of
+                ),
+                config.chunk_pages,
+                self.metrics,
+                header_agent=build_model_agent(
+                    config,
+                    limiter,
+                    self.metrics,
+                    check=check_order_lines_of,
+                ),
+            )
+        template_agent = TemplateAgent(extraction_agent, self.metrics)
+        self.template_learner = (
+            TemplateLearner(
+                template_agent,
+                config.procurement_api_url,
+                interval=config.template_refresh_seconds,
+                min_confirmations=config.template_min_confirmations,
+            )
+            if config.procurement_api_url is not None
+            else None
+        )
+        # Cached per file, so hits skip text extraction and every part of a
+        # long document
+        self.intake_agent_api = CachingAgentApi(
+            IntakeAgentApi(template_agent, self.metrics, PdfTextExtractor()),
+            build_cache(config),
+            ",".join(config.models),
+            self.metrics,
+        )
+        self.job_queue = JobQueue(
+            self.intake_agent_api,
+            self.metrics,
+            concurrency=config.job_concurrency,
+            max_queued=config.job_queue_size,
+            callback_hosts=config.callback_hosts,
+        )
+        self.shell = Shell(
+            self.config, self.intake_agent_api, self.metrics, self.job_queue
+        )
 
     async def run(self) -> None:
         async with asyncio.TaskGroup() as tg:
-            tg.create_task(self.shell.run())
+            shell = tg.create_task(self.shell.run())
+            if self.template_learner is not None:
+                learner = tg.create_task(self.template_learner.run())
+                shell.add_done_callback(lambda _: learner.cancel())
 
     def shutdown(self) -> None:
         self.shell.shutdown()
@@ -0,0 +1,111 @@
+import asyncio
+import io
+import zipfile
+from functools import partial
+from typing import Any, AsyncIterator, Callable, NamedTuple
+
+from agent_api.agent import AgentApi
+from agent_api.limiter import Priority, request_priority
+
+# Limits for one batch, zip archives are checked before anything is unpacked
+MAX_BATCH_DOCUMENTS = 1000
+MAX_UNPACKED_BYTES = 512 * 1024 * 1024
+
+_ZIP_MAGIC = b"PK\x03\x04"
+
+
+class Document(NamedTuple):
+    """A document of a batch, loaded only when it is processed."""
+
+    name: str
+    load: Callable[[], bytes]
+
+
+class InvalidBatchException(Exception): ...
+
+
+def unpack_upload(name: str, content: bytes) -> list[Document]:
+    """
+    Get the documents of an uploaded file.
+
+    Args:
+        name: The file name of the upload
+        content: The uploaded bytes, a PDF or a zip archive of PDFs
+
+    Returns:
+        The upload itself, or the PDFs in the archive in archive order
+
+    Raises:
+        InvalidBatchException: If the archive is damaged or too large
+    """
+    if not content.startswith(_ZIP_MAGIC):
+        return [Document(name, lambda: content)]
+
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile as error:
+        raise InvalidBatchException(f"Invalid zip archive '{name}': {error}")
+    entries = [
+        info
+        for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith(".pdf")
+        and not info.filename.startswith("__MACOSX/")
+    ]
+    if sum(info.file_size for info in entries) > MAX_UNPACKED_BYTES:
+        raise InvalidBatchException(f"Zip archive '{name}' is too large to unpack.")
+
+    # ZipFile serializes reads of its members, so entries can load in threads
+    return [
+        Document(f"{name}/{info.filename}", partial(archive.read, info))
+        for info in entries
+    ]
+
+
+async def extract_documents(
+    agent_api: AgentApi, documents: list[Document], concurrency: int
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Extract all documents of a batch, at most `concurrency` at once.
+
+    Args:
+        agent_api: The API that extracts a single document
+        documents: The documents of the batch
+        concurrency: How many documents are extracted at the same time, their
+            model calls are queued with background priority
+
+    Yields:
+        One result per document as soon as it is done, with its `index` in
+        the batch, its `file` name and the `result` or `error`
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def extract(index: int, document: Document) -> dict[str, Any]:
+        request_priority.set(Priority.BACKGROUND)
+        async with semaphore:
+            try:
+                content = await asyncio.to_thread(document.load)
+                result = await agent_api.complete(content)
+            except Exception as error:
+                return {
+                    "index": index,
+                    "file": document.name,
+                    "error": str(error) or type(error).__name__,
+                }
+        return {
+            "index": index,
+            "file": document.name,
+            "result": result.output.model_dump(mode="json"),
+        }
+
+    tasks = [
+        asyncio.create_task(extract(index, document))
+        for index, document in enumerate(documents)
+    ]
+    try:
+        for done in asyncio.as_completed(tasks):
+            yield await done
+    finally:
+        # Stop the remaining extractions if the client went away
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Protocol
+
+from pydantic import ValidationError
+from pydantic_ai import AgentRunResult
+
+from agent_api.agent import DOCUMENT_INSTRUCTION, TEXT_LAYER_INSTRUCTION, AgentApi
+from agent_api.chunking import HEADER_INSTRUCTION, LINES_INSTRUCTION, TEXT_LAYER_NOTE
+from agent_api.metrics import Metrics
+from agent_api.models.procurement import ProcurementRequestCreate
+
+# Changes whenever the output model changes, so old results are not reused
+SCHEMA_VERSION = hashlib.sha256(
+    json.dumps(ProcurementRequestCreate.model_json_schema(), sort_keys=True).encode()
+).hexdigest()[:16]
+
+# Changes whenever the instructions sent with documents change
+PROMPT_VERSION = hashlib.sha256(
+    "\0".join(
+        (
+            DOCUMENT_INSTRUCTION,
+            TEXT_LAYER_INSTRUCTION,
+            HEADER_INSTRUCTION,
+            LINES_INSTRUCTION,
+            TEXT_LAYER_NOTE,
+        )
+    ).encode()
+).hexdigest()[:16]
+
+
+def document_cache_key(model_name: str, file_content: bytes) -> str:
+    """
+    Derive the cache key of a document from its file.
+
+    Args:
+        model_name: The models that extract the document
+        file_content: Binary content of the uploaded file
+
+    Returns:
+        A hex digest over the models, output schema, prompts and file content
+    """
+    digest = hashlib.sha256()
+    digest.update(
+        f"{model_name}\0{SCHEMA_VERSION}\0{PROMPT_VERSION}\0document\0".encode()
+    )
+    digest.update(file_content)
+    return digest.hexdigest()
+
+
+class ResultCache(Protocol):
+    """Protocol for stores of extracted procurement requests."""
+
+    async def get(self, key: str) -> ProcurementRequestCreate | None: ...
+    async def put(self, key: str, value: ProcurementRequestCreate) -> None: ...
+
+
+class MemoryResultCache(ResultCache):
+    """In-memory cache that evicts the least recently used and expired entries."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, ProcurementRequestCreate]] = (
+            OrderedDict()
+        )
+
+    async def get(self, key: str) -> ProcurementRequestCreate | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if (
+            self.ttl_seconds is not None
+            and time.monotonic() - stored_at > self.ttl_seconds
+        ):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def put(self, key: str, value: ProcurementRequestCreate) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskResultCache(ResultCache):
+    """Cache that keeps one JSON file per entry, so it survives restarts.
+
+    A read refreshes the modification time of the file, which makes it the
+    last used time for LRU eviction. Entries are counted as they are written,
+    and once there are more than `max_entries`, the least recently used ones
+    are removed down to 90% of the limit, so the directory is only listed
+    once every so many writes. File access runs in a worker thread.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_entries: int = 10_000,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._evict_to = max(1, max_entries * 9 // 10)
+        self._lock = threading.Lock()
+        self._entries = sum(1 for _ in self.directory.glob("*.json"))
+
+    def __len__(self) -> int:
+        return self._entries
+
+    async def get(self, key: str) -> ProcurementRequestCreate | None:
+        return await asyncio.to_thread(self._read, self.directory / f"{key}.json")
+
+    async def put(self, key: str, value: ProcurementRequestCreate) -> None:
+        await asyncio.to_thread(
+            self._write, self.directory / f"{key}.json", value.model_dump_json()
+        )
+
+    def _read(self, path: Path) -> ProcurementRequestCreate | None:
+        try:
+            age = time.time() - path.stat().st_mtime
+            if self.ttl_seconds is not None and age > self.ttl_seconds:
+                self._remove(path)
+                return None
+            value = ProcurementRequestCreate.model_validate_json(path.read_bytes())
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except ValidationError:
+            # Written for an older output model or damaged, drop it
+            self._remove(path)
+            return None
+        return value
+
+    def _write(self, path: Path, content: str) -> None:
+        added = not path.exists()
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(content)
+        os.replace(temporary, path)
+
+        with self._lock:
+            if added:
+                self._entries += 1
+            if self._entries > self.max_entries:
+                self._evict()
+
+    def _remove(self, path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._entries -= 1
+
+    def _evict(self) -> None:
+        entries: list[tuple[float, Path]] = []
+        for entry in self.directory.glob("*.json"):
+            try:
+                entries.append((entry.stat().st_mtime, entry))
+            except FileNotFoundError:
+                # Removed since the directory was listed, e.g. by a read
+                continue
+        entries.sort(key=lambda entry: entry[0])
+        for _, entry in entries[: len(entries) - self._evict_to]:
+            entry.unlink(missing_ok=True)
+        # Also corrects the count for files others added or removed
+        self._entries = min(len(entries), self._evict_to)
+
+
+class TieredResultCache(ResultCache):
+    """Cache that asks a fast cache first and a larger, slower one second."""
+
+    def __init__(self, first: ResultCache, second: ResultCache) -> None:
+        self.first = first
+        self.second = second
+
+    async def get(self, key: str) -> ProcurementRequestCreate | None:
+        value = await self.first.get(key)
+        if value is None:
+            value = await self.second.get(key)
+            if value is not None:
+                await self.first.put(key, value)
+        return value
+
+    async def put(self, key: str, value: ProcurementRequestCreate) -> None:
+        await self.first.put(key, value)
+        await self.second.put(key, value)
+
+
+class CachingAgentApi(AgentApi):
+    """Agent API that answers documents uploaded before from a cache.
+
+    Documents are identified by the hash of their file, so a hit needs
+    neither text extraction nor a model call, however many parts a long
+    document is extracted in. Hits and misses are counted as `cache.hits`
+    and `cache.misses`.
+    """
+
+    def __init__(
+        self,
+        agent_api: AgentApi,
+        cache: ResultCache,
+        model_name: str,
+        metrics: Metrics,
+    ) -> None:
+        self.agent_api = agent_api
+        self.cache = cache
+        self.model_name = model_name
+        self.metrics = metrics
+
+    async def complete(self, file_content: bytes) -> AgentRunResult[Any]:
+        """
+        Process a document, using the cached output if there is one.
+
+        Args:
+            file_content: Binary content of the uploaded file
+
+        Returns:
+            AgentRunResult with the extracted procurement information
+        """
+        key = document_cache_key(self.model_name, file_content)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            self.metrics.increment("cache.hits")
+            return AgentRunResult(output=cached)
+
+        self.metrics.increment("cache.misses")
+        result = await self.agent_api.complete(file_content)
+        await self.cache.put(key, result.output)
+        return result
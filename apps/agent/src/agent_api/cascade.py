@@ -0,0 +1,89 @@
+import logging
+import time
+from typing import Any, Callable, NamedTuple, Sequence
+
+from pydantic_ai import AgentRunResult, UserContent
+from pydantic_ai.exceptions import UnexpectedModelBehavior
+
+from agent_api.agent import Agent
+from agent_api.metrics import Metrics
+from agent_api.validation import check_request
+
+logger = logging.getLogger(__name__)
+
+
+class ModelTier(NamedTuple):
+    """A model of a cascade and the agent that calls it."""
+
+    model_name: str
+    agent: Agent
+
+
+class CascadeAgent(Agent):
+    """Agent that tries cheaper models first and escalates on bad output.
+
+    The tiers are tried in order until one returns an output without
+    problems according to `check`. An output that does not fit the schema
+    counts as a problem, too. The last tier's output is returned either way.
+
+    Per tier, the counters `cascade.<model>.runs`, `.accepted`,
+    `.escalated` and `.latency_ms`, the total latency of its runs, show how
+    often a tier is good enough and what it costs in time.
+    """
+
+    def __init__(
+        self,
+        tiers: Sequence[ModelTier],
+        metrics: Metrics,
+        check: Callable[[Any], list[str]] = check_request,
+    ) -> None:
+        if not tiers:
+            raise ValueError("A cascade needs at least one tier.")
+        self.tiers = tiers
+        self.metrics = metrics
+        self.check = check
+
+    async def run(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> AgentRunResult[Any]:
+        """
+        Process a user prompt with the first tier whose output passes.
+
+        Args:
+            user_prompt: The prompt to send to the agent
+
+        Returns:
+            AgentRunResult with the extracted procurement information
+        """
+        *lower_tiers, last_tier = self.tiers
+        for tier in lower_tiers:
+            prefix = f"cascade.{tier.model_name}"
+            started = time.monotonic()
+            try:
+                result = await tier.agent.run(user_prompt)
+            except UnexpectedModelBehavior as error:
+                problems = [str(error)]
+            else:
+                problems = self.check(result.output)
+            self._count(prefix, started)
+            if not problems:
+                self.metrics.increment(f"{prefix}.accepted")
+                return result
+            self.metrics.increment(f"{prefix}.escalated")
+            logger.info("Escalating from %s: %s", tier.model_name, " ".join(problems))
+
+        prefix = f"cascade.{last_tier.model_name}"
+        started = time.monotonic()
+        try:
+            result = await last_tier.agent.run(user_prompt)
+        finally:
+            self._count(prefix, started)
+        if not self.check(result.output):
+            self.metrics.increment(f"{prefix}.accepted")
+        return result
+
+    def _count(self, prefix: str, started: float) -> None:
+        self.metrics.increment(f"{prefix}.runs")
+        self.metrics.increment(
+            f"{prefix}.latency_ms", round((time.monotonic() - started) * 1000)
+        )
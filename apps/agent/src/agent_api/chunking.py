@@ -0,0 +1,185 @@
+import asyncio
+import io
+import logging
+from concurrent.futures import Executor
+from typing import Any, Sequence
+
+from pydantic import BaseModel, Field
+from pydantic_ai import AgentRunResult, BinaryContent, UserContent
+from pypdf import PdfReader, PdfWriter
+
+from agent_api.agent import Agent
+from agent_api.metrics import Metrics
+from agent_api.models.procurement import OrderLine, ProcurementRequestCreate
+from agent_api.streaming import output_listener
+from agent_api.validation import check_request, merge_order_lines
+
+logger = logging.getLogger(__name__)
+
+HEADER_INSTRUCTION = (
+    "Extract the procurement information from the first pages of a longer "
+    "document. Only extract the order lines on these pages."
+)
+LINES_INSTRUCTION = (
+    "Extract the order lines on these pages of a longer document. Only "
+    "extract order lines, not the header of the document."
+)
+TEXT_LAYER_NOTE = (
+    "This is their text, laid out as on the page with pages separated by form feeds."
+)
+
+
+class OrderLines(BaseModel):
+    """Order lines extracted from a part of a document."""
+
+    order_lines: list[OrderLine] = Field(
+        ..., description="List of order line items on these pages"
+    )
+
+
+def split_pdf(file_content: bytes, pages_per_chunk: int) -> list[bytes]:
+    """
+    Split a PDF into PDFs of consecutive pages.
+
+    Args:
+        file_content: Binary content of the PDF
+        pages_per_chunk: Pages of each part, the last one may have less
+
+    Returns:
+        The parts in page order, or just the document if it has at most
+        `pages_per_chunk` pages or cannot be read
+    """
+    try:
+        reader = PdfReader(io.BytesIO(file_content))
+        page_count = len(reader.pages)
+        if page_count <= pages_per_chunk:
+            return [file_content]
+        chunks = []
+        for start in range(0, page_count, pages_per_chunk):
+            writer = PdfWriter()
+            for page in reader.pages[start : start + pages_per_chunk]:
+                writer.add_page(page)
+            output = io.BytesIO()
+            writer.write(output)
+            chunks.append(output.getvalue())
+        return chunks
+    except Exception as error:
+        # pypdf raises all kinds of errors on damaged files
+        logger.warning("PDF not split: %s", error)
+        return [file_content]
+
+
+def split_text(text: str, pages_per_chunk: int) -> list[str]:
+    """Split a text layer with form feeds between pages like `split_pdf`."""
+    pages = text.split("\f")
+    return [
+        "\f".join(pages[start : start + pages_per_chunk])
+        for start in range(0, len(pages), pages_per_chunk)
+    ]
+
+
+class ChunkingAgent(Agent):
+    """Agent that extracts long documents in parts of `pages_per_chunk` pages.
+
+    Prompts of an instruction and a document, as a PDF or its text layer,
+    are split at page boundaries. The first part goes to `header_agent`,
+    `agent` if not given, for the header and its order lines, the others go
+    to `line_agent`, which only extracts order lines, all at the same time.
+    Short documents go to `agent` whole. The order lines are merged in page
+    order, without lines that were extracted on both sides of a page break.
+
+    The order lines of a part cannot add up to the total cost of the whole
+    document, so `header_agent` should only check the lines themselves. The
+    merged request is checked with `check_request` instead. Documents are
+    counted as `chunking.documents`, their parts as `chunking.chunks` and
+    merged requests with problems as `chunking.inconsistent`.
+    """
+
+    def __init__(
+        self,
+        agent: Agent,
+        line_agent: Agent,
+        pages_per_chunk: int,
+        metrics: Metrics,
+        executor: Executor | None = None,
+        header_agent: Agent | None = None,
+    ) -> None:
+        self.agent = agent
+        self.header_agent = header_agent if header_agent is not None else agent
+        self.line_agent = line_agent
+        self.pages_per_chunk = pages_per_chunk
+        self.metrics = metrics
+        self.executor = executor
+
+    async def run(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> AgentRunResult[Any]:
+        """
+        Process a user prompt, in parts if it holds a long document.
+
+        Args:
+            user_prompt: The prompt to send to the agent
+
+        Returns:
+            AgentRunResult with the extracted procurement information
+        """
+        chunks = await self._split(user_prompt)
+        if len(chunks) < 2:
+            return await self.agent.run(user_prompt)
+
+        self.metrics.increment("chunking.documents")
+        self.metrics.increment("chunking.chunks", len(chunks))
+        header, *line_results = await asyncio.gather(
+            self.header_agent.run(
+                [self._instruction(HEADER_INSTRUCTION, chunks[0]), chunks[0]]
+            ),
+            *(self._extract_lines(chunk) for chunk in chunks[1:]),
+        )
+        output: ProcurementRequestCreate = header.output
+        order_lines = merge_order_lines(
+            [output.order_lines]
+            + [result.output.order_lines for result in line_results]
+        )
+
+        request = output.model_copy(update={"order_lines": order_lines})
+        problems = check_request(request)
+        if problems:
+            logger.warning("Merged request is inconsistent: %s", " ".join(problems))
+            self.metrics.increment("chunking.inconsistent")
+        return AgentRunResult(output=request)
+
+    async def _extract_lines(
+        self, chunk: str | BinaryContent
+    ) -> AgentRunResult[OrderLines]:
+        # Only the first part streams, the order lines of the others would
+        # interleave with its own
+        output_listener.set(None)
+        return await self.line_agent.run(
+            [self._instruction(LINES_INSTRUCTION, chunk), chunk]
+        )
+
+    async def _split(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> Sequence[str | BinaryContent]:
+        if isinstance(user_prompt, str) or len(user_prompt) != 2:
+            return []
+        document = user_prompt[1]
+        if isinstance(document, str):
+            return split_text(document, self.pages_per_chunk)
+        if (
+            isinstance(document, BinaryContent)
+            and document.media_type == "application/pdf"
+        ):
+            parts = await asyncio.get_running_loop().run_in_executor(
+                self.executor, split_pdf, document.data, self.pages_per_chunk
+            )
+            return [
+                BinaryContent(data=part, media_type="application/pdf") for part in parts
+            ]
+        return []
+
+    @staticmethod
+    def _instruction(instruction: str, chunk: str | BinaryContent) -> str:
+        if isinstance(chunk, str):
+            return f"{instruction} {TEXT_LAYER_NOTE}"
+        return instruction
@@ -10,14 +10,79 @@ class AppConfig(NamedTuple):
     host: str
     port: int
     openai_key: str
+    cache_max_entries: int = 1024
+    cache_ttl_seconds: float | None = 7 * 24 * 3600
+    cache_dir: str | None = None
+    cache_disk_max_entries: int = 10_000
+    job_concurrency: int = 4
+    job_queue_size: int = 1000
+    batch_concurrency: int = 8
+    llm_initial_concurrency: int = 4
+    llm_max_concurrency: int = 32
+    llm_latency_target: float | None = None
+    llm_max_retries: int = 5
+    procurement_api_url: str | None = None
+    template_refresh_seconds: float = 3600
+    template_min_confirmations: int = 3
+    chunk_pages: int | None = None
+    models: tuple[str, ...] = ("gpt-5",)
+    callback_hosts: tuple[str, ...] = ()
 
     @classmethod
     def from_env(cls) -> AppConfig:
         """Load configuration from environment variables"""
+        models = tuple(
+            model.strip()
+            for model in os.environ.get("AGENT_MODELS", "gpt-5").split(",")
+            if model.strip()
+        )
+        if not models:
+            raise ValueError("AGENT_MODELS must name at least one model.")
         return cls(
             host=os.environ["API_HOST"],
             port=int(os.environ["API_PORT"]),
             openai_key=str(os.environ["OPENAI_API_KEY"]),
+            cache_max_entries=int(os.environ.get("AGENT_CACHE_MAX_ENTRIES", 1024)),
+            cache_ttl_seconds=(
+                float(os.environ["AGENT_CACHE_TTL_SECONDS"])
+                if os.environ.get("AGENT_CACHE_TTL_SECONDS")
+                else 7 * 24 * 3600
+            ),
+            cache_dir=os.environ.get("AGENT_CACHE_DIR") or None,
+            cache_disk_max_entries=int(
+                os.environ.get("AGENT_CACHE_DISK_MAX_ENTRIES", 10_000)
+            ),
+            job_concurrency=int(os.environ.get("AGENT_JOB_CONCURRENCY", 4)),
+            job_queue_size=int(os.environ.get("AGENT_JOB_QUEUE_SIZE", 1000)),
+            batch_concurrency=int(os.environ.get("AGENT_BATCH_CONCURRENCY", 8)),
+            llm_initial_concurrency=int(
+                os.environ.get("AGENT_LLM_INITIAL_CONCURRENCY", 4)
+            ),
+            llm_max_concurrency=int(os.environ.get("AGENT_LLM_MAX_CONCURRENCY", 32)),
+            llm_latency_target=(
+                float(os.environ["AGENT_LLM_LATENCY_TARGET"])
+                if os.environ.get("AGENT_LLM_LATENCY_TARGET")
+                else None
+            ),
+            llm_max_retries=int(os.environ.get("AGENT_LLM_MAX_RETRIES", 5)),
+            procurement_api_url=os.environ.get("AGENT_PROCUREMENT_API_URL") or None,
+            template_refresh_seconds=float(
+                os.environ.get("AGENT_TEMPLATE_REFRESH_SECONDS", 3600)
+            ),
+            template_min_confirmations=int(
+                os.environ.get("AGENT_TEMPLATE_MIN_CONFIRMATIONS", 3)
+            ),
+            chunk_pages=(
+                int(os.environ["AGENT_CHUNK_PAGES"])
+                if os.environ.get("AGENT_CHUNK_PAGES")
+                else None
+            ),
+            models=models,
+            callback_hosts=tuple(
+                host.strip()
+                for host in os.environ.get("AGENT_CALLBACK_HOSTS", "").split(",")
+                if host.strip()
+            ),
         )
 
     @classmethod
@@ -0,0 +1,263 @@
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime
+from enum import Enum
+from typing import Any, Collection
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+import httpx
+
+from agent_api.agent import AgentApi
+from agent_api.limiter import Priority, request_priority
+from agent_api.metrics import Metrics
+from agent_api.models.procurement import ProcurementRequestCreate
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    """Status of an intake job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job:
+    """A document waiting for or going through extraction."""
+
+    def __init__(self, file_content: bytes, callback_url: str | None = None):
+        self.id: str = str(uuid4())
+        self.created_at: datetime = datetime.now(UTC)
+        self.status: JobStatus = JobStatus.QUEUED
+        self.callback_url = callback_url
+        self.result: ProcurementRequestCreate | None = None
+        self.error: str | None = None
+        self.wait_seconds: float | None = None
+        self.run_seconds: float | None = None
+        # Dropped once the job started, to not keep every upload in memory
+        self.file_content = file_content
+        self.queued_at = time.monotonic()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to dictionary representation."""
+        return {
+            "id": self.id,
+            "created_at": self.created_at.isoformat(),
+            "status": self.status.value,
+            "wait_seconds": self.wait_seconds,
+            "run_seconds": self.run_seconds,
+            "result": self.result.model_dump(mode="json") if self.result else None,
+            "error": self.error,
+        }
+
+
+class QueueFullException(Exception): ...
+
+
+class InvalidCallbackException(Exception): ...
+
+
+async def check_callback_url(
+    callback_url: str, allowed_hosts: Collection[str] = ()
+) -> None:
+    """
+    Check that a callback URL may be POSTed to.
+
+    Hosts in `allowed_hosts` are trusted. Without them, every address the
+    host resolves to must be public, so callbacks cannot reach loopback,
+    private, link-local or cloud metadata addresses.
+
+    Args:
+        callback_url: URL a finished job is POSTed to
+        allowed_hosts: Host names callbacks may go to, any public host if empty
+
+    Raises:
+        InvalidCallbackException: If the URL is no HTTP URL or its host is not allowed
+    """
+    url = urlsplit(callback_url)
+    if url.scheme not in ("http", "https") or not url.hostname:
+        raise InvalidCallbackException(f"Invalid callback_url: '{callback_url}'.")
+    if allowed_hosts:
+        if url.hostname not in allowed_hosts:
+            raise InvalidCallbackException(
+                f"Callback host '{url.hostname}' is not allowed."
+            )
+        return
+
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(
+            url.hostname, None, type=socket.SOCK_STREAM
+        )
+    except (socket.gaierror, UnicodeError):
+        raise InvalidCallbackException(
+            f"Callback host '{url.hostname}' cannot be resolved."
+        )
+    for *_, sockaddr in addresses:
+        try:
+            # Drop the zone of a scoped IPv6 address, e.g. `fe80::1%eth0`
+            address = ipaddress.ip_address(str(sockaddr[0]).partition("%")[0])
+        except ValueError:
+            raise InvalidCallbackException(
+                f"Callback host '{url.hostname}' has an invalid address."
+            )
+        if not address.is_global or address.is_multicast:
+            raise InvalidCallbackException(
+                f"Callback host '{url.hostname}' is not a public address."
+            )
+
+
+class JobQueue:
+    """Bounded in-process queue of intake jobs with a fixed pool of workers.
+
+    At most `concurrency` documents are extracted at once and at most
+    `max_queued` wait for a worker. When a job has a callback URL, the job is
+    POSTed there once it finished. The queue publishes `jobs.queue_depth` and
+    the total wait time `jobs.wait_ms` of the `jobs.started` jobs. Model calls
+    of jobs are queued with background priority.
+
+    Callback URLs go through `check_callback_url` with `callback_hosts`, once
+    more right before the POST, since the host may resolve to another
+    address by then.
+    """
+
+    def __init__(
+        self,
+        agent_api: AgentApi,
+        metrics: Metrics,
+        concurrency: int = 4,
+        max_queued: int = 1000,
+        max_kept: int = 10_000,
+        callback_client: httpx.AsyncClient | None = None,
+        callback_hosts: Collection[str] = (),
+    ) -> None:
+        self.agent_api = agent_api
+        self.metrics = metrics
+        self.concurrency = concurrency
+        self.max_kept = max_kept
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=max_queued)
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._workers: list[asyncio.Task[None]] = []
+        self._client = callback_client
+        self._owns_client = callback_client is None
+        self.callback_hosts = callback_hosts
+
+    async def start(self) -> None:
+        """Start the workers."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10.0)
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"intake-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers, queued jobs are not processed anymore."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def submit(self, file_content: bytes, callback_url: str | None = None) -> Job:
+        """
+        Queue a document for extraction.
+
+        Args:
+            file_content: Binary content of the uploaded file
+            callback_url: URL the finished job is POSTed to
+
+        Returns:
+            The queued job
+
+        Raises:
+            QueueFullException: If too many jobs are waiting already
+        """
+        job = Job(file_content, callback_url)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.metrics.increment("jobs.rejected")
+            raise QueueFullException
+        self._jobs[job.id] = job
+        self._forget_old_jobs()
+        self.metrics.increment("jobs.submitted")
+        self.metrics.set("jobs.queue_depth", self._queue.qsize())
+        return job
+
+    async def check_callback_url(self, callback_url: str) -> None:
+        """Check a callback URL against `callback_hosts`, see `check_callback_url`."""
+        await check_callback_url(callback_url, self.callback_hosts)
+
+    def get(self, job_id: str) -> Job | None:
+        """Get a job by ID."""
+        return self._jobs.get(job_id)
+
+    def _forget_old_jobs(self) -> None:
+        while len(self._jobs) > self.max_kept:
+            oldest = next(iter(self._jobs.values()))
+            if not oldest.finished:
+                break
+            del self._jobs[oldest.id]
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: Job) -> None:
+        started = time.monotonic()
+        job.wait_seconds = started - job.queued_at
+        job.status = JobStatus.RUNNING
+        self.metrics.set("jobs.queue_depth", self._queue.qsize())
+        self.metrics.increment("jobs.started")
+        self.metrics.increment("jobs.wait_ms", round(job.wait_seconds * 1000))
+
+        file_content, job.file_content = job.file_content, b""
+        # Nobody waits on the response, so interactive uploads go first
+        request_priority.set(Priority.BACKGROUND)
+        try:
+            result = await self.agent_api.complete(file_content)
+        except Exception as error:
+            logger.exception("Intake job %s failed", job.id)
+            job.error = str(error) or type(error).__name__
+            job.status = JobStatus.FAILED
+            self.metrics.increment("jobs.failed")
+        else:
+            job.result = result.output
+            job.status = JobStatus.SUCCEEDED
+            self.metrics.increment("jobs.succeeded")
+        job.run_seconds = time.monotonic() - started
+
+        if job.callback_url is not None:
+            await self._notify(job, job.callback_url)
+
+    async def _notify(self, job: Job, callback_url: str) -> None:
+        assert self._client is not None
+        try:
+            await self.check_callback_url(callback_url)
+        except InvalidCallbackException as error:
+            logger.warning("Callback for intake job %s refused: %s", job.id, error)
+            self.metrics.increment("jobs.callback_failures")
+            return
+        try:
+            response = await self._client.post(callback_url, json=job.to_dict())
+            response.raise_for_status()
+        except httpx.HTTPError as error:
+            logger.warning("Callback for intake job %s failed: %s", job.id, error)
+            self.metrics.increment("jobs.callback_failures")
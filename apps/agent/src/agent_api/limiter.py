@@ -0,0 +1,272 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, Sequence
+
+import httpx
+from openai import APIConnectionError
+from pydantic_ai import AgentRunResult, UserContent
+from pydantic_ai.exceptions import ModelHTTPError
+
+from agent_api.agent import Agent
+from agent_api.metrics import Metrics
+
+
+class Priority(IntEnum):
+    """Priority of a model call, lower values are served first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 10
+
+
+# Priority of the model calls made by the current task
+request_priority: ContextVar[Priority] = ContextVar(
+    "request_priority", default=Priority.INTERACTIVE
+)
+
+# Responses worth another try, and those that say the provider is overloaded
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+CONGESTION_STATUS_CODES = {429, 503}
+
+# Longest pause taken from a `Retry-After`, longer ones are most likely bogus
+MAX_RETRY_AFTER = 60.0
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Whether a model call failed to reach the provider or timed out."""
+    # pydantic-ai wraps the errors of the OpenAI client in a `ModelAPIError`
+    return any(
+        isinstance(
+            candidate, (APIConnectionError, httpx.TransportError, asyncio.TimeoutError)
+        )
+        for candidate in (error, error.__cause__)
+    )
+
+
+def retry_after(error: ModelHTTPError) -> float | None:
+    """
+    Get how long the provider asked us to wait before trying again.
+
+    Args:
+        error: The error the model call failed with
+
+    Returns:
+        The wait in seconds from the `retry-after-ms` or `retry-after`
+        header, or `None` if the provider did not say
+    """
+    headers: Any = getattr(error, "headers", None)
+    if not headers:
+        # Older pydantic-ai versions only keep the provider's own exception
+        response = getattr(error.__cause__, "response", None)
+        headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    if (milliseconds := headers.get("retry-after-ms")) is not None:
+        try:
+            return max(0.0, float(milliseconds) / 1000)
+        except ValueError:
+            pass
+    if (value := headers.get("retry-after")) is not None:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+class AdaptiveLimiter:
+    """Concurrency limit for model calls that adapts to the provider.
+
+    The limit grows by one per limit's worth of successful calls and halves
+    on congestion, i.e. a rate limit response or a call slower than
+    `latency_target` (additive increase, multiplicative decrease). Calls that
+    started before the last decrease do not decrease it again, so a burst of
+    rate limit responses only halves the limit once.
+
+    Waiting calls are admitted by priority, then in arrival order. After a
+    `pause`, e.g. for a `Retry-After`, no call is admitted until it is over.
+    """
+
+    def __init__(
+        self,
+        metrics: Metrics,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        latency_target: float | None = None,
+    ) -> None:
+        self.metrics = metrics
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._arrivals = itertools.count()
+        self._paused_until = 0.0
+        self._decreased_at = 0.0
+        self._publish()
+
+    @property
+    def paused(self) -> bool:
+        return time.monotonic() < self._paused_until
+
+    async def acquire(self, priority: int = Priority.INTERACTIVE) -> float:
+        """
+        Wait for a free slot.
+
+        Args:
+            priority: Calls with lower values are admitted first
+
+        Returns:
+            The start time to pass to `release`
+        """
+        if not self.paused and not self._waiters and self.in_flight < self._slots():
+            self.in_flight += 1
+        else:
+            admitted = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._arrivals), admitted))
+            self._publish()
+            try:
+                await admitted
+            except asyncio.CancelledError:
+                if admitted.done() and not admitted.cancelled():
+                    # Admitted just before the cancellation, give the slot back
+                    self.in_flight -= 1
+                    self._admit()
+                raise
+        self._publish()
+        return time.monotonic()
+
+    def release(
+        self, started: float, congested: bool = False, succeeded: bool = True
+    ) -> None:
+        """
+        Give a slot back and adapt the limit to how the call went.
+
+        Args:
+            started: The time returned by `acquire`
+            congested: Whether the provider signalled that it is overloaded
+            succeeded: Whether the call succeeded, failed calls that are not
+                congestion leave the limit as it is
+        """
+        self.in_flight -= 1
+        now = time.monotonic()
+        slow = self.latency_target is not None and now - started > self.latency_target
+        if congested or slow:
+            if started >= self._decreased_at:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self._decreased_at = now
+        elif succeeded:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._admit()
+
+    def pause(self, seconds: float) -> None:
+        """Admit no calls for the next `seconds`."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        asyncio.get_running_loop().call_later(seconds, self._admit)
+
+    def _slots(self) -> int:
+        return max(1, int(self.limit))
+
+    def _admit(self) -> None:
+        while self._waiters and not self.paused and self.in_flight < self._slots():
+            _, _, admitted = heapq.heappop(self._waiters)
+            if admitted.done():
+                continue
+            admitted.set_result(None)
+            self.in_flight += 1
+        self._publish()
+
+    def _publish(self) -> None:
+        self.metrics.set("llm.concurrency_limit", self._slots())
+        self.metrics.set("llm.in_flight", self.in_flight)
+        self.metrics.set("llm.queue_depth", len(self._waiters))
+
+
+class LimitedAgent(Agent):
+    """Agent that calls the model within the limits of an `AdaptiveLimiter`.
+
+    Rate limit and server errors, connection errors and timeouts are retried
+    up to `max_retries` times, the OpenAI client itself does not retry. A
+    `Retry-After` from the provider pauses all calls for that long, at most
+    `max_retry_after` seconds, otherwise the retry waits for an exponential
+    backoff with full jitter. Only successful calls raise the limit. Calls
+    are queued with the priority in `request_priority`.
+    """
+
+    def __init__(
+        self,
+        agent: Agent,
+        limiter: AdaptiveLimiter,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        max_retry_after: float = MAX_RETRY_AFTER,
+    ) -> None:
+        self.agent = agent
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retry_after = max_retry_after
+
+    async def run(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> AgentRunResult[Any]:
+        """
+        Process a user prompt, waiting for the limiter and retrying overloads.
+
+        Args:
+            user_prompt: The prompt to send to the agent
+
+        Returns:
+            AgentRunResult with the extracted procurement information
+        """
+        priority = request_priority.get()
+        for attempt in itertools.count():
+            started = await self.limiter.acquire(priority)
+            try:
+                result = await self.agent.run(user_prompt)
+            except ModelHTTPError as error:
+                congested = error.status_code in CONGESTION_STATUS_CODES
+                self.limiter.release(started, congested=congested, succeeded=False)
+                if congested:
+                    self.limiter.metrics.increment("llm.rate_limited")
+                if (
+                    error.status_code not in RETRY_STATUS_CODES
+                    or attempt >= self.max_retries
+                ):
+                    raise
+                wait = retry_after(error)
+            except Exception as error:
+                self.limiter.release(started, succeeded=False)
+                if not is_connection_error(error) or attempt >= self.max_retries:
+                    raise
+                self.limiter.metrics.increment("llm.connection_errors")
+                wait = None
+            except BaseException:
+                self.limiter.release(started, succeeded=False)
+                raise
+            else:
+                self.limiter.release(started)
+                return result
+
+            self.limiter.metrics.increment("llm.retries")
+            if wait is not None:
+                # The provider's quota applies to every call, not just this one
+                self.limiter.pause(min(wait, self.max_retry_after))
+            else:
+                ceiling = min(self.backoff_cap, self.backoff_base * 2**attempt)
+                await asyncio.sleep(random.uniform(0, ceiling))
+        raise AssertionError("unreachable")
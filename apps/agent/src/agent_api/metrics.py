@@ -0,0 +1,28 @@
+from collections import Counter
+
+
+class Metrics:
+    """Counters shared by the components of the agent API.
+
+    Counter names are dotted, e.g. `cache.hits`. A counter that was never
+    incremented reads as zero.
+    """
+
+    def __init__(self) -> None:
+        self._counters: Counter[str] = Counter()
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Add `amount` to the counter `name`."""
+        self._counters[name] += amount
+
+    def set(self, name: str, value: int) -> None:
+        """Set the counter `name`, for values that go up and down."""
+        self._counters[name] = value
+
+    def get(self, name: str) -> int:
+        """Get the current value of the counter `name`."""
+        return self._counters[name]
+
+    def snapshot(self) -> dict[str, int]:
+        """Get the current value of all counters, sorted by name."""
+        return dict(sorted(self._counters.items()))
@@ -105,3 +105,6 @@ class ProcurementRequestCreate(BaseModel):
     department: str = Field(
         ..., min_length=1, description="The department of the requestor"
     )
+    total_cost: float | None = Field(
+        default=None, gt=0, description="Total cost stated on the document, if any"
+    )
@@ -0,0 +1,72 @@
+import asyncio
+import io
+import logging
+from concurrent.futures import Executor
+from typing import Protocol
+
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# Pages with less text than this are taken for scans or images
+MIN_PAGE_CHARACTERS = 20
+
+
+class TextExtractor(Protocol):
+    """Protocol for extractors of the text layer of a document."""
+
+    async def extract(self, file_content: bytes) -> str | None: ...
+
+
+def read_text_layer(
+    file_content: bytes, min_page_characters: int = MIN_PAGE_CHARACTERS
+) -> str | None:
+    """
+    Read the text layer of a PDF, laid out as on the page.
+
+    The layout mode keeps the columns of tables aligned, so the order lines
+    of an invoice stay readable as rows.
+
+    Args:
+        file_content: Binary content of the PDF
+        min_page_characters: Text every page needs to count as digital
+
+    Returns:
+        The text of all pages separated by form feeds, or `None` if the
+        document is not a readable PDF or any page looks scanned
+    """
+    try:
+        reader = PdfReader(io.BytesIO(file_content))
+        pages = [page.extract_text(extraction_mode="layout") for page in reader.pages]
+    except Exception as error:
+        # pypdf raises all kinds of errors on damaged files
+        logger.warning("No text layer read: %s", error)
+        return None
+
+    if not pages:
+        return None
+    for page in pages:
+        if sum(not character.isspace() for character in page) < min_page_characters:
+            return None
+    return "\f".join(page.strip("\n") for page in pages)
+
+
+class PdfTextExtractor(TextExtractor):
+    """Reads the text layer of PDFs without blocking the event loop.
+
+    Parsing runs in `executor`, the default thread pool if not given. Pass a
+    process pool to parse several large documents in parallel.
+    """
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        min_page_characters: int = MIN_PAGE_CHARACTERS,
+    ) -> None:
+        self.executor = executor
+        self.min_page_characters = min_page_characters
+
+    async def extract(self, file_content: bytes) -> str | None:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, read_text_layer, file_content, self.min_page_characters
+        )
@@ -1,9 +1,31 @@
-from typing import cast
+import json
+from typing import Any, AsyncIterator, cast
 
-from fastapi import APIRouter, Depends, File, Request, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 
 from agent_api.agent import AgentApi
+from agent_api.batch import (
+    MAX_BATCH_DOCUMENTS,
+    Document,
+    InvalidBatchException,
+    extract_documents,
+    unpack_upload,
+)
+from agent_api.jobs import InvalidCallbackException, JobQueue, QueueFullException
+from agent_api.metrics import Metrics
 from agent_api.models.procurement import ProcurementRequestCreate
+from agent_api.streaming import stream_extraction
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
@@ -13,6 +35,139 @@ def get_intake_api(request: Request) -> AgentApi:
     return cast(AgentApi, request.state.intake_agent_api)
 
 
+def get_metrics(request: Request) -> Metrics:
+    """Get the metrics from request state."""
+    return cast(Metrics, request.state.metrics)
+
+
+def get_job_queue(request: Request) -> JobQueue:
+    """Get the job queue from request state."""
+    return cast(JobQueue, request.state.job_queue)
+
+
+def get_batch_concurrency(request: Request) -> int:
+    """Get the number of documents a batch extracts at once from request state."""
+    return cast(int, request.state.batch_concurrency)
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK)
+async def get_agent_metrics(metrics: Metrics = Depends(get_metrics)) -> dict[str, int]:
+    """
+    Get the counters of the agent API, e.g. cache hits and misses.
+    """
+    return metrics.snapshot()
+
+
+@router.post("/intake/stream", status_code=status.HTTP_200_OK)
+async def intake_document_stream(
+    file: UploadFile = File(...), intake_agent_api: AgentApi = Depends(get_intake_api)
+) -> StreamingResponse:
+    """
+    Accept a PDF file and stream its values as Server-Sent Events.
+
+    `field` events hold the `name` and `value` of a header field and
+    `order_line` events the `index` and `order_line`, each as soon as the
+    model generated it. A `result` event with the whole extraction or an
+    `error` event with its `detail` ends the stream.
+    """
+    contents = await file.read()
+
+    async def events() -> AsyncIterator[bytes]:
+        async for event, data in stream_extraction(intake_agent_api.complete, contents):
+            payload = json.dumps(data, separators=(",", ":"))
+            yield f"event: {event}\ndata: {payload}\n\n".encode()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/intake/batch", status_code=status.HTTP_200_OK)
+async def intake_batch(
+    files: list[UploadFile] = File(...),
+    intake_agent_api: AgentApi = Depends(get_intake_api),
+    concurrency: int = Depends(get_batch_concurrency),
+) -> StreamingResponse:
+    """
+    Accept several PDF files or zip archives of PDF files and extract them all.
+
+    One NDJSON line is streamed back per document as soon as it is done, so
+    the lines are in completion order. Every line holds the `index` of the
+    document in the batch, its `file` name and the `result` or the `error`.
+    """
+    documents: list[Document] = []
+    for file in files:
+        try:
+            documents.extend(unpack_upload(file.filename or "", await file.read()))
+        except InvalidBatchException as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+    if len(documents) > MAX_BATCH_DOCUMENTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch holds at most {MAX_BATCH_DOCUMENTS} documents.",
+        )
+
+    async def lines() -> AsyncIterator[bytes]:
+        async for result in extract_documents(intake_agent_api, documents, concurrency):
+            yield json.dumps(result, separators=(",", ":")).encode() + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_intake_job(
+    response: Response,
+    file: UploadFile = File(...),
+    callback_url: str | None = Form(None),
+    job_queue: JobQueue = Depends(get_job_queue),
+) -> dict[str, Any]:
+    """
+    Queue a PDF file for extraction and return the job right away.
+
+    Poll `GET /agent/jobs/{id}` for the result, or pass a `callback_url`
+    that the finished job is POSTed to.
+    """
+    if callback_url is not None:
+        try:
+            await job_queue.check_callback_url(callback_url)
+        except InvalidCallbackException as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+
+    contents = await file.read()
+    try:
+        job = job_queue.submit(contents, callback_url)
+    except QueueFullException:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many queued intake jobs, try again later.",
+            headers={"Retry-After": "30"},
+        )
+    response.headers["Location"] = f"{router.prefix}/jobs/{job.id}"
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}", status_code=status.HTTP_200_OK)
+async def get_intake_job(
+    job_id: str, job_queue: JobQueue = Depends(get_job_queue)
+) -> dict[str, Any]:
+    """
+    Get the status of an intake job, and its result once it succeeded.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Intake job with ID '{job_id}' not found.",
+        )
+    return job.to_dict()
+
+
 @router.post("/intake", status_code=status.HTTP_200_OK)
 async def intake_document(
     file: UploadFile = File(...), intake_agent_api: AgentApi = Depends(get_intake_api)
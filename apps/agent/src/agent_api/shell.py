@@ -7,6 +7,8 @@ from uvicorn import Config, Server
 
 from agent_api.agent import AgentApi
 from agent_api.config import AppConfig
+from agent_api.jobs import JobQueue
+from agent_api.metrics import Metrics
 from agent_api.routers.agent import router as agent_router
 
 
@@ -14,12 +16,36 @@ class ShellState(TypedDict):
     """State that is shared between requests."""
 
     intake_agent_api: AgentApi
+    metrics: Metrics
+    job_queue: JobQueue
+    batch_concurrency: int
 
 
-def build_app(intake_agent_api: AgentApi) -> FastAPI:
+def build_app(
+    intake_agent_api: AgentApi,
+    metrics: Metrics | None = None,
+    job_queue: JobQueue | None = None,
+    batch_concurrency: int = 8,
+) -> FastAPI:
+    shared_metrics = metrics if metrics is not None else Metrics()
+    jobs = (
+        job_queue
+        if job_queue is not None
+        else JobQueue(intake_agent_api, shared_metrics)
+    )
+
     @asynccontextmanager
     async def lifespan(app: FastAPI) -> AsyncIterator[ShellState]:
-        yield {"intake_agent_api": intake_agent_api}
+        await jobs.start()
+        try:
+            yield {
+                "intake_agent_api": intake_agent_api,
+                "metrics": shared_metrics,
+                "job_queue": jobs,
+                "batch_concurrency": batch_concurrency,
+            }
+        finally:
+            await jobs.stop()
 
     app = FastAPI(lifespan=lifespan)
 
@@ -39,9 +65,15 @@ def build_app(intake_agent_api: AgentApi) -> FastAPI:
 class Shell:
     """Provide user access to our application."""
 
-    def __init__(self, config: AppConfig, intake_agent: AgentApi) -> None:
+    def __init__(
+        self,
+        config: AppConfig,
+        intake_agent: AgentApi,
+        metrics: Metrics | None = None,
+        job_queue: JobQueue | None = None,
+    ) -> None:
         self.config = config
-        self.app = build_app(intake_agent)
+        self.app = build_app(intake_agent, metrics, job_queue, config.batch_concurrency)
         self.server: Server | None = None
 
     async def run(self) -> None:
@@ -0,0 +1,170 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable
+
+from pydantic_ai import AgentRunResult, RunContext
+from pydantic_ai.messages import (
+    AgentStreamEvent,
+    PartDeltaEvent,
+    PartStartEvent,
+    ToolCallPart,
+    ToolCallPartDelta,
+)
+from pydantic_core import from_json
+
+OutputListener = Callable[[dict[str, Any]], None]
+
+# Gets the output of the model calls of the current task while it is generated
+output_listener: ContextVar[OutputListener | None] = ContextVar(
+    "output_listener", default=None
+)
+
+# A value can only have been completed by a delta that holds one of these
+_VALUE_ENDS = frozenset(",]}")
+
+
+async def forward_partial_output(
+    ctx: RunContext[Any], events: AsyncIterable[AgentStreamEvent]
+) -> None:
+    """
+    Event stream handler that passes the output parsed so far to the listener.
+
+    The output arrives as the JSON arguments of a tool call. They are parsed
+    whenever a delta may have completed a value, incomplete trailing values
+    are left out.
+
+    Args:
+        ctx: The context of the agent run
+        events: The events of a streamed model response
+    """
+    listener = output_listener.get()
+    arguments: dict[int, str] = {}
+    async for event in events:
+        if listener is None:
+            continue
+        if isinstance(event, PartStartEvent) and isinstance(event.part, ToolCallPart):
+            if isinstance(event.part.args, dict):
+                listener(event.part.args)
+                continue
+            arguments[event.index] = event.part.args or ""
+            delta = arguments[event.index]
+        elif (
+            isinstance(event, PartDeltaEvent)
+            and isinstance(event.delta, ToolCallPartDelta)
+            and isinstance(event.delta.args_delta, str)
+        ):
+            delta = event.delta.args_delta
+            arguments[event.index] = arguments.get(event.index, "") + delta
+        else:
+            continue
+
+        if _VALUE_ENDS.isdisjoint(delta):
+            continue
+        try:
+            partial = from_json(arguments[event.index], allow_partial=True)
+        except ValueError:
+            continue
+        if isinstance(partial, dict):
+            listener(partial)
+
+
+class PartialOutputEvents:
+    """Turns partial outputs into events for the values that are complete.
+
+    A header field is complete once the next field started, an order line
+    once the next line started. A value that changes, e.g. when a larger
+    model takes over, is sent again.
+    """
+
+    def __init__(self) -> None:
+        self._fields: dict[str, Any] = {}
+        self._order_lines: dict[int, Any] = {}
+
+    def update(
+        self, partial: dict[str, Any], complete: bool = False
+    ) -> list[tuple[str, dict[str, Any]]]:
+        """
+        Get the events for the values that are new since the last update.
+
+        Args:
+            partial: The output parsed so far
+            complete: Whether the output is complete, so every value is
+
+        Returns:
+            `field` events with the `name` and `value` of header fields, and
+            `order_line` events with the `index` and `order_line`
+        """
+        events: list[tuple[str, dict[str, Any]]] = []
+        last = len(partial) - 1
+        for position, (name, value) in enumerate(partial.items()):
+            value_complete = complete or position < last
+            if name == "order_lines":
+                if isinstance(value, list):
+                    events.extend(self._order_line_events(value, value_complete))
+            elif value_complete and self._fields.get(name) != value:
+                self._fields[name] = value
+                events.append(("field", {"name": name, "value": value}))
+        return events
+
+    def _order_line_events(
+        self, order_lines: list[Any], complete: bool
+    ) -> list[tuple[str, dict[str, Any]]]:
+        events = []
+        last = len(order_lines) - 1
+        for index, order_line in enumerate(order_lines):
+            if not (complete or index < last) or not isinstance(order_line, dict):
+                continue
+            if self._order_lines.get(index) != order_line:
+                self._order_lines[index] = order_line
+                events.append(
+                    ("order_line", {"index": index, "order_line": order_line})
+                )
+        return events
+
+
+async def stream_extraction(
+    complete: Callable[[bytes], Awaitable[AgentRunResult[Any]]],
+    file_content: bytes,
+) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """
+    Extract a document and stream its values as soon as they are generated.
+
+    Args:
+        complete: Extracts a document, e.g. `AgentApi.complete`
+        file_content: Binary content of the uploaded file
+
+    Yields:
+        `field` and `order_line` events as `PartialOutputEvents` creates
+        them, then a `result` event with the whole output, or an `error`
+        event with its `detail`
+    """
+    tracker = PartialOutputEvents()
+    queue: asyncio.Queue[tuple[str, dict[str, Any]] | None] = asyncio.Queue()
+
+    def listen(partial: dict[str, Any]) -> None:
+        for event in tracker.update(partial):
+            queue.put_nowait(event)
+
+    # The task copies the context, so only its model calls are listened to
+    token = output_listener.set(listen)
+    try:
+        task = asyncio.ensure_future(complete(file_content))
+    finally:
+        output_listener.reset(token)
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    try:
+        while (event := await queue.get()) is not None:
+            yield event
+        try:
+            result = task.result()
+        except Exception as error:
+            yield "error", {"detail": str(error) or type(error).__name__}
+            return
+        output = result.output.model_dump(mode="json")
+        for event in tracker.update(output, complete=True):
+            yield event
+        yield "result", output
+    finally:
+        # Stop waiting for the extraction if the client went away
+        task.cancel()
@@ -0,0 +1,384 @@
+import asyncio
+import json
+import logging
+import re
+from collections import Counter, defaultdict
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Iterable, Mapping, NamedTuple, Sequence
+
+import httpx
+from pydantic import ValidationError
+from pydantic_ai import AgentRunResult, BinaryContent, UserContent
+
+from agent_api.agent import Agent
+from agent_api.metrics import Metrics
+from agent_api.models.procurement import (
+    CommodityGroup,
+    OrderLine,
+    ProcurementRequestCreate,
+)
+from agent_api.validation import line_total_matches, prices_match
+
+logger = logging.getLogger(__name__)
+
+# Labelled header fields, each pattern captures the value as `value`, which
+# ends at the next column of the layout text
+_VALUE = r"(?P<value>\S+(?: \S+)*)"
+DEFAULT_FIELD_PATTERNS: Mapping[str, re.Pattern[str]] = {
+    "requestor_name": re.compile(
+        rf"(?im)^\s*(?:requestor|requested by|ordered by)\s*:?\s+{_VALUE}"
+    ),
+    "title": re.compile(rf"(?im)^\s*(?:title|subject)\s*:?\s+{_VALUE}"),
+    "department": re.compile(rf"(?im)^\s*department\s*:?\s+{_VALUE}"),
+}
+
+# An order line in layout text: description, amount and unit, unit price and
+# total price, with columns separated by at least two spaces
+DEFAULT_LINE_PATTERN = re.compile(
+    r"^\s*(?P<position_description>\S.*?\S)\s{2,}"
+    r"(?P<amount>\d+)\s+(?P<unit>[^\d\s]\S*)\s{2,}"
+    r"(?P<unit_price>\d[\d.,]*)(?:\s*(?:EUR|€))?\s{2,}"
+    r"(?P<total_price>\d[\d.,]*)(?:\s*(?:EUR|€))?\s*$"
+)
+
+DEFAULT_TOTAL_PATTERN = re.compile(
+    r"(?im)^\s*(?:grand\s+)?total\b.*?\s(?P<value>\d[\d.,]*)(?:\s*(?:EUR|€))?\s*$"
+)
+
+_VAT_ID_PATTERN = re.compile(r"\b[A-Z]{2}\s?[0-9A-Z]{8,12}\b")
+
+# Header fields of the buyer, which invoices rarely print. Templates fill
+# them in with the most frequent value of the vendor's confirmed requests
+# when the document has no label for them.
+LEARNED_FIELDS = ("requestor_name", "title", "department")
+
+# Statuses of requests whose extraction a person has confirmed
+CONFIRMED_STATUSES = ("in-progress", "closed")
+
+
+class VendorTemplate(NamedTuple):
+    """How to read the invoices of one vendor, identified by its VAT ID.
+
+    `field_defaults` are the values of header fields that the document does
+    not print, learned from the vendor's confirmed requests.
+    """
+
+    vat_id: str
+    vendor_name: str
+    commodity_group: CommodityGroup
+    field_defaults: Mapping[str, str] = MappingProxyType({})
+    field_patterns: Mapping[str, re.Pattern[str]] = DEFAULT_FIELD_PATTERNS
+    line_pattern: re.Pattern[str] = DEFAULT_LINE_PATTERN
+    total_pattern: re.Pattern[str] = DEFAULT_TOTAL_PATTERN
+
+
+def normalize_vat_id(vat_id: str) -> str:
+    """Remove the spacing and punctuation vendors print VAT IDs with."""
+    return re.sub(r"[\s.\-]", "", vat_id).upper()
+
+
+def parse_price(value: str) -> float:
+    """
+    Parse a printed price, e.g. `1,998.00` or `1.998,00`.
+
+    Raises:
+        ValueError: If the value is not a number
+    """
+    if "," in value and "." in value:
+        # The separator that comes last is the decimal one
+        if value.rfind(",") > value.rfind("."):
+            value = value.replace(".", "").replace(",", ".")
+        else:
+            value = value.replace(",", "")
+    elif re.search(r",\d{1,2}$", value):
+        value = value.replace(",", ".")
+    else:
+        value = value.replace(",", "")
+    return float(value)
+
+
+def apply_template(
+    template: VendorTemplate, text: str
+) -> ProcurementRequestCreate | None:
+    """
+    Read a procurement request from the text of a document with a template.
+
+    Header fields without a label in the document are taken from the
+    `field_defaults` of the template. Every order line needs a total price of
+    unit price times amount, and the order lines need to add up to the total
+    of the document.
+
+    Args:
+        template: The template of the vendor of the document
+        text: The text layer of the document
+
+    Returns:
+        The procurement request, or `None` if the document does not fit the
+        template or its numbers do not add up
+    """
+    fields: dict[str, Any] = {}
+    for name, pattern in template.field_patterns.items():
+        match = pattern.search(text)
+        if match is not None:
+            fields[name] = match["value"]
+        elif name in template.field_defaults:
+            fields[name] = template.field_defaults[name]
+        else:
+            return None
+
+    try:
+        order_lines = []
+        for line in text.splitlines():
+            match = template.line_pattern.match(line)
+            if match is None:
+                continue
+            order_line = OrderLine(
+                position_description=match["position_description"],
+                unit_price=parse_price(match["unit_price"]),
+                amount=int(match["amount"]),
+                unit=match["unit"],
+                total_price=parse_price(match["total_price"]),
+            )
+            if not line_total_matches(order_line):
+                return None
+            order_lines.append(order_line)
+
+        total = template.total_pattern.search(text)
+        if total is None:
+            return None
+        total_cost = parse_price(total["value"])
+        if not prices_match(
+            total_cost, sum(order_line.total_price for order_line in order_lines)
+        ):
+            return None
+
+        return ProcurementRequestCreate(
+            **fields,
+            vendor_name=template.vendor_name,
+            vat_id=template.vat_id,
+            commodity_group=template.commodity_group,
+            order_lines=order_lines,
+            total_cost=total_cost,
+        )
+    except (ValueError, ValidationError):
+        return None
+
+
+class TemplateEngine:
+    """Reads documents of known vendors without a model call."""
+
+    def __init__(self, templates: Iterable[VendorTemplate] = ()) -> None:
+        self._templates = {
+            normalize_vat_id(template.vat_id): template for template in templates
+        }
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def extract(self, text: str) -> ProcurementRequestCreate | None:
+        """
+        Read a procurement request with the template of its vendor.
+
+        Args:
+            text: The text layer of the document
+
+        Returns:
+            The procurement request, or `None` if no template of a VAT ID in
+            the text fits the document
+        """
+        for candidate in _VAT_ID_PATTERN.findall(text.upper()):
+            template = self._templates.get(normalize_vat_id(candidate))
+            if template is not None:
+                result = apply_template(template, text)
+                if result is not None:
+                    return result
+        return None
+
+
+class VendorHistory:
+    """Counts what the confirmed requests of each vendor agree on.
+
+    Only the counts are kept, not the requests, so the whole export of the
+    Procurement API can be added one request at a time.
+    """
+
+    def __init__(self) -> None:
+        self._confirmations: Counter[str] = Counter()
+        self._values: defaultdict[str, defaultdict[str, Counter[str]]] = defaultdict(
+            lambda: defaultdict(Counter)
+        )
+
+    def add(self, request: Mapping[str, Any]) -> None:
+        """Count a confirmed request, as created from an extraction."""
+        vat_id = normalize_vat_id(request["vat_id"])
+        self._confirmations[vat_id] += 1
+        for name in ("vendor_name", "commodity_group", *LEARNED_FIELDS):
+            self._values[vat_id][name][request[name]] += 1
+
+    def templates(self, min_confirmations: int = 3) -> list[VendorTemplate]:
+        """
+        Learn vendor templates from the counted requests.
+
+        Args:
+            min_confirmations: Requests a vendor needs before it gets a template
+
+        Returns:
+            A template per vendor with enough requests that all agree on a
+            known commodity group, named after its most frequent vendor name
+            and with the most frequent values of the buyer's header fields
+        """
+        templates = []
+        for vat_id, confirmations in self._confirmations.items():
+            values = self._values[vat_id]
+            commodity_groups = values["commodity_group"]
+            if confirmations < min_confirmations or len(commodity_groups) != 1:
+                continue
+            commodity_group = next(iter(commodity_groups))
+            try:
+                known_group = CommodityGroup(commodity_group)
+            except ValueError:
+                # The Procurement API may know groups this agent does not yet
+                logger.warning(
+                    "No template for vendor %s with unknown commodity group '%s'",
+                    vat_id,
+                    commodity_group,
+                )
+                continue
+            templates.append(
+                VendorTemplate(
+                    vat_id=vat_id,
+                    vendor_name=values["vendor_name"].most_common(1)[0][0],
+                    commodity_group=known_group,
+                    field_defaults={
+                        name: values[name].most_common(1)[0][0]
+                        for name in LEARNED_FIELDS
+                    },
+                )
+            )
+        return templates
+
+
+def learn_templates(
+    requests: Iterable[Mapping[str, Any]], min_confirmations: int = 3
+) -> list[VendorTemplate]:
+    """
+    Learn vendor templates from confirmed procurement requests.
+
+    Args:
+        requests: Confirmed requests, as created from extractions
+        min_confirmations: Requests a vendor needs before it gets a template
+
+    Returns:
+        The templates of `VendorHistory.templates`
+    """
+    history = VendorHistory()
+    for request in requests:
+        history.add(request)
+    return history.templates(min_confirmations)
+
+
+class TemplateAgent(Agent):
+    """Agent that reads documents of known vendors with a template.
+
+    Text prompts, i.e. documents with a text layer, are tried against the
+    templates first and only go to the model if none fits. Counted as
+    `templates.hits` and `templates.misses`.
+    """
+
+    def __init__(
+        self,
+        agent: Agent,
+        metrics: Metrics,
+        templates: Iterable[VendorTemplate] = (),
+    ) -> None:
+        self.agent = agent
+        self.metrics = metrics
+        self.engine = TemplateEngine(templates)
+
+    def update(self, templates: Iterable[VendorTemplate]) -> None:
+        """Replace the templates."""
+        self.engine = TemplateEngine(templates)
+        self.metrics.set("templates.vendors", len(self.engine))
+
+    async def run(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> AgentRunResult[Any]:
+        """
+        Process a user prompt, with a template if one fits.
+
+        Args:
+            user_prompt: The prompt to send to the agent
+
+        Returns:
+            AgentRunResult with the extracted procurement information
+        """
+        parts = [user_prompt] if isinstance(user_prompt, str) else user_prompt
+        if len(self.engine) and not any(
+            isinstance(part, BinaryContent) for part in parts
+        ):
+            text = "\n".join(part for part in parts if isinstance(part, str))
+            output = self.engine.extract(text)
+            if output is not None:
+                self.metrics.increment("templates.hits")
+                return AgentRunResult(output=output)
+            self.metrics.increment("templates.misses")
+        return await self.agent.run(user_prompt)
+
+
+class TemplateLearner:
+    """Keeps the templates of a `TemplateAgent` learned from the Procurement API.
+
+    Requests that were moved on from `open` count as confirmed extractions.
+    They are exported from the Procurement API at `procurement_api_url` every
+    `interval` seconds.
+    """
+
+    def __init__(
+        self,
+        agent: TemplateAgent,
+        procurement_api_url: str,
+        interval: float = 3600,
+        min_confirmations: int = 3,
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
+        self.agent = agent
+        self.procurement_api_url = procurement_api_url.rstrip("/")
+        self.interval = interval
+        self.min_confirmations = min_confirmations
+        self._client = client
+
+    async def iter_confirmed(
+        self, client: httpx.AsyncClient
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Stream the confirmed requests from the export of the Procurement API."""
+        for request_status in CONFIRMED_STATUSES:
+            async with client.stream(
+                "GET",
+                f"{self.procurement_api_url}/intake/requests/export",
+                params={"status": request_status, "format": "ndjson"},
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        yield json.loads(line)["request"]
+
+    async def refresh(self) -> None:
+        """Learn the templates from the current confirmed requests."""
+        history = VendorHistory()
+        if self._client is not None:
+            async for request in self.iter_confirmed(self._client):
+                history.add(request)
+        else:
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                async for request in self.iter_confirmed(client):
+                    history.add(request)
+        self.agent.update(history.templates(self.min_confirmations))
+
+    async def run(self) -> None:
+        """Refresh the templates until cancelled."""
+        while True:
+            try:
+                await self.refresh()
+            except (httpx.HTTPError, ValueError, KeyError) as error:
+                logger.warning("Learning vendor templates failed: %s", error)
+            await asyncio.sleep(self.interval)
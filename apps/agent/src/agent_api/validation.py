@@ -0,0 +1,84 @@
+from typing import Iterable
+
+from agent_api.models.procurement import OrderLine, ProcurementRequestCreate
+
+# Tolerance for rounding in prices printed with two decimals
+PRICE_TOLERANCE = 0.01
+
+
+def prices_match(expected: float, actual: float) -> bool:
+    """Whether two prices are the same up to rounding."""
+    return abs(expected - actual) <= PRICE_TOLERANCE
+
+
+def line_total_matches(line: OrderLine) -> bool:
+    """Whether the total price of an order line is unit price times amount."""
+    return prices_match(line.unit_price * line.amount, line.total_price)
+
+
+def check_order_lines(lines: list[OrderLine]) -> list[str]:
+    """
+    Check that the prices of extracted order lines are consistent.
+
+    Args:
+        lines: The extracted order lines
+
+    Returns:
+        A description of each problem, empty if there is none
+    """
+    return [
+        f"Order line {number}: total price {line.total_price} is not unit price "
+        f"{line.unit_price} times amount {line.amount}."
+        for number, line in enumerate(lines, 1)
+        if not line_total_matches(line)
+    ]
+
+
+def check_request(request: ProcurementRequestCreate) -> list[str]:
+    """
+    Check that the prices of an extracted procurement request are consistent.
+
+    The schema already ensures known commodity groups and positive prices,
+    this checks the order lines and, if the document states one, that they
+    add up to the total cost.
+
+    Args:
+        request: The extracted procurement request
+
+    Returns:
+        A description of each problem, empty if there is none
+    """
+    problems = check_order_lines(request.order_lines)
+    lines_total = sum(line.total_price for line in request.order_lines)
+    if request.total_cost is not None and not prices_match(
+        lines_total, request.total_cost
+    ):
+        problems.append(
+            f"Order lines add up to {lines_total:.2f}, not the total cost "
+            f"{request.total_cost:.2f}."
+        )
+    return problems
+
+
+def merge_order_lines(chunks: Iterable[list[OrderLine]]) -> list[OrderLine]:
+    """
+    Merge the order lines extracted from consecutive parts of a document.
+
+    A line that continues over a page break can be extracted from both
+    parts. The parts do not overlap, so only such a line can be in both: the
+    first line of a part is dropped if it equals the last line of the
+    previous part. Other equal lines are kept, they are separate positions,
+    e.g. the same monthly fee on every page.
+
+    Args:
+        chunks: The order lines of each part, in document order
+
+    Returns:
+        The order lines of the whole document
+    """
+    merged: list[OrderLine] = []
+    for lines in chunks:
+        if merged and lines and lines[0] == merged[-1]:
+            lines = lines[1:]
+        merged.extend(lines)
+    return merged
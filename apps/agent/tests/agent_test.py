@@ -0,0 +1,163 @@
+import asyncio
+from typing import Any, Sequence
+
+import pytest
+from pydantic_ai import AgentRunResult, BinaryContent, UserContent
+
+from agent_api.agent import Agent, IntakeAgentApi
+from agent_api.cache import CachingAgentApi, MemoryResultCache
+from agent_api.metrics import Metrics
+from agent_api.pdf_text import PdfTextExtractor
+from tests.cache_test import make_output
+from tests.pdf_text_test import make_pdf, make_scanned_pdf
+
+
+class BlockingAgent(Agent):
+    """Agent that waits until it is released, then returns or raises."""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.error = error
+
+    async def run(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> AgentRunResult[Any]:
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return AgentRunResult(output=make_output())
+
+
+async def test_concurrent_calls_for_the_same_document_share_one_run():
+    # given three uploads of the same document that arrive together
+    agent = BlockingAgent()
+    metrics = Metrics()
+    agent_api = IntakeAgentApi(agent, metrics)
+    calls = [
+        asyncio.create_task(agent_api.complete(b"%PDF-1.4 same")) for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+
+    # when the agent finishes
+    agent.release.set()
+    results = await asyncio.gather(*calls)
+
+    # then the agent ran once and every caller got its result
+    assert agent.calls == 1
+    assert all(result.output == make_output() for result in results)
+    assert metrics.snapshot() == {"intake.coalesced": 2, "intake.runs": 1}
+
+
+async def test_concurrent_calls_share_the_exception():
+    # given two uploads of the same document while the agent fails
+    agent = BlockingAgent(error=RuntimeError("model unavailable"))
+    agent_api = IntakeAgentApi(agent)
+    calls = [
+        asyncio.create_task(agent_api.complete(b"%PDF-1.4 same")) for _ in range(2)
+    ]
+    await asyncio.sleep(0)
+
+    # when the agent fails
+    agent.release.set()
+    results = await asyncio.gather(*calls, return_exceptions=True)
+
+    # then both callers get the error, and a later upload runs again
+    assert [str(result) for result in results] == ["model unavailable"] * 2
+    with pytest.raises(RuntimeError):
+        await agent_api.complete(b"%PDF-1.4 same")
+    assert agent.calls == 2
+
+
+async def test_cancelled_caller_does_not_cancel_the_shared_run():
+    # given two uploads of the same document
+    agent = BlockingAgent()
+    agent_api = IntakeAgentApi(agent)
+    first = asyncio.create_task(agent_api.complete(b"%PDF-1.4 same"))
+    second = asyncio.create_task(agent_api.complete(b"%PDF-1.4 same"))
+    await asyncio.sleep(0)
+
+    # when the first caller goes away before the agent finishes
+    first.cancel()
+    agent.release.set()
+
+    # then the second caller still gets the result
+    assert (await second).output == make_output()
+
+
+class PromptRecordingAgent(Agent):
+    """Agent that keeps the prompts it was asked."""
+
+    def __init__(self) -> None:
+        self.prompts: list[str | Sequence[UserContent]] = []
+
+    async def run(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> AgentRunResult[Any]:
+        self.prompts.append(user_prompt)
+        return AgentRunResult(output=make_output())
+
+
+async def test_documents_with_a_text_layer_are_sent_as_text():
+    # given a digital invoice
+    agent = PromptRecordingAgent()
+    metrics = Metrics()
+    agent_api = IntakeAgentApi(agent, metrics, PdfTextExtractor())
+
+    # when it is extracted
+    await agent_api.complete(make_pdf("Invoice 42 from Dell Technologies"))
+
+    # then the model gets its text instead of the PDF
+    [prompt] = agent.prompts
+    assert prompt[1] == "Invoice 42 from Dell Technologies"
+    assert metrics.get("intake.text_layer") == 1
+
+
+async def test_scanned_documents_are_sent_as_pdf():
+    # given a scanned invoice
+    agent = PromptRecordingAgent()
+    metrics = Metrics()
+    agent_api = IntakeAgentApi(agent, metrics, PdfTextExtractor())
+    content = make_scanned_pdf()
+
+    # when it is extracted
+    await agent_api.complete(content)
+
+    # then the model gets the PDF
+    [prompt] = agent.prompts
+    assert prompt[1] == BinaryContent(data=content, media_type="application/pdf")
+    assert metrics.get("intake.binary") == 1
+
+
+class CountingExtractor(PdfTextExtractor):
+    """Text extractor that counts the documents it parsed."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    async def extract(self, file_content: bytes) -> str | None:
+        self.calls += 1
+        return await super().extract(file_content)
+
+
+async def test_cached_documents_are_not_parsed_again():
+    # given the intake of documents, cached per file
+    extractor = CountingExtractor()
+    metrics = Metrics()
+    agent_api = CachingAgentApi(
+        IntakeAgentApi(PromptRecordingAgent(), metrics, extractor),
+        MemoryResultCache(),
+        "gpt-5",
+        metrics,
+    )
+    content = make_pdf("Invoice 42 from Dell Technologies")
+
+    # when the same document is uploaded twice
+    await agent_api.complete(content)
+    await agent_api.complete(content)
+
+    # then its text layer was only read once
+    assert extractor.calls == 1
+    assert metrics.get("cache.hits") == 1
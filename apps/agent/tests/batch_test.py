@@ -0,0 +1,93 @@
+import asyncio
+import io
+import zipfile
+from typing import Any
+
+import pytest
+from pydantic_ai import AgentRunResult
+
+from agent_api.agent import AgentApi
+from agent_api.batch import (
+    Document,
+    InvalidBatchException,
+    extract_documents,
+    unpack_upload,
+)
+from tests.cache_test import make_output
+
+
+def make_zip(entries: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+class SlowAgentApi(AgentApi):
+    """Agent API that takes as many milliseconds as the document says."""
+
+    def __init__(self) -> None:
+        self.running = 0
+        self.max_running = 0
+
+    async def complete(self, file_content: bytes) -> AgentRunResult[Any]:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(int(file_content) / 1000)
+            if file_content == b"0":
+                raise ValueError("empty document")
+            return AgentRunResult(output=make_output(title=file_content.decode()))
+        finally:
+            self.running -= 1
+
+
+def make_document(name: str, content: bytes) -> Document:
+    def load() -> bytes:
+        return content
+
+    return Document(name, load)
+
+
+def test_unpack_upload_reads_pdfs_from_zip():
+    # given a zip archive with PDFs, a folder and another file
+    content = make_zip(
+        {"a.pdf": b"%PDF a", "invoices/b.PDF": b"%PDF b", "notes.txt": b"notes"}
+    )
+
+    # when we unpack it
+    documents = unpack_upload("batch.zip", content)
+
+    # then we get the PDFs only
+    assert [d.name for d in documents] == [
+        "batch.zip/a.pdf",
+        "batch.zip/invoices/b.PDF",
+    ]
+    assert [d.load() for d in documents] == [b"%PDF a", b"%PDF b"]
+
+
+def test_unpack_upload_rejects_damaged_zip():
+    # when we unpack a file that only starts like a zip archive
+    # then it is rejected
+    with pytest.raises(InvalidBatchException):
+        unpack_upload("batch.zip", b"PK\x03\x04 broken")
+
+
+async def test_extract_documents_yields_in_completion_order():
+    # given documents that take different times
+    agent_api = SlowAgentApi()
+    documents = [
+        make_document("slow", b"100"),
+        make_document("failing", b"0"),
+        make_document("fast", b"10"),
+    ]
+
+    # when we extract them two at a time
+    results = [result async for result in extract_documents(agent_api, documents, 2)]
+
+    # then results arrive as they complete, including errors
+    assert [r["file"] for r in results] == ["failing", "fast", "slow"]
+    assert results[0] == {"index": 1, "file": "failing", "error": "empty document"}
+    assert results[2]["result"]["title"] == "100"
+    assert agent_api.max_running == 2
@@ -0,0 +1,155 @@
+import os
+from pathlib import Path
+from typing import Any, Sequence
+
+import pytest
+from pydantic_ai import AgentRunResult, UserContent
+
+from agent_api import cache
+from agent_api.agent import Agent
+from agent_api.cache import (
+    DiskResultCache,
+    MemoryResultCache,
+    TieredResultCache,
+    document_cache_key,
+)
+from agent_api.models.procurement import (
+    CommodityGroup,
+    OrderLine,
+    ProcurementRequestCreate,
+)
+
+
+def make_output(title: str = "Test Procurement") -> ProcurementRequestCreate:
+    return ProcurementRequestCreate(
+        requestor_name="Test User",
+        title=title,
+        vendor_name="Test Vendor Inc",
+        vat_id="DE123456789",
+        commodity_group=CommodityGroup.SOFTWARE,
+        order_lines=[
+            OrderLine(
+                position_description="Test Software License",
+                unit_price=100.0,
+                amount=1,
+                unit="licenses",
+                total_price=100.0,
+            )
+        ],
+        department="IT",
+    )
+
+
+class CountingAgent(Agent):
+    """Agent that counts its calls and returns a fixed output."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def run(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> AgentRunResult[Any]:
+        self.calls += 1
+        return AgentRunResult(output=make_output())
+
+
+def test_document_cache_key_depends_on_content_model_and_prompts(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # given the key of a document
+    key = document_cache_key("gpt-5", b"%PDF-1.4 first")
+
+    # then equal content gives equal keys, anything else different keys
+    assert document_cache_key("gpt-5", b"%PDF-1.4 first") == key
+    assert document_cache_key("gpt-5", b"%PDF-1.4 second") != key
+    assert document_cache_key("gpt-5-mini", b"%PDF-1.4 first") != key
+
+    # and changed instructions invalidate the cached results
+    monkeypatch.setattr(cache, "PROMPT_VERSION", "changed")
+    assert document_cache_key("gpt-5", b"%PDF-1.4 first") != key
+
+
+async def test_memory_cache_evicts_least_recently_used():
+    # given a full cache where the first entry was used last
+    cache = MemoryResultCache(max_entries=2)
+    await cache.put("a", make_output("a"))
+    await cache.put("b", make_output("b"))
+    await cache.get("a")
+
+    # when another entry is added
+    await cache.put("c", make_output("c"))
+
+    # then the least recently used entry is gone
+    assert await cache.get("b") is None
+    assert await cache.get("a") is not None
+    assert len(cache) == 2
+
+
+async def test_memory_cache_expires_entries():
+    # given a cache whose entries expire immediately
+    cache = MemoryResultCache(ttl_seconds=0)
+    await cache.put("a", make_output())
+
+    # then the entry is not returned
+    assert await cache.get("a") is None
+
+
+async def test_disk_cache_survives_restart(tmp_path: Path):
+    # given an entry written by one cache
+    await DiskResultCache(str(tmp_path)).put("a", make_output())
+
+    # when a new cache reads the same directory
+    value = await DiskResultCache(str(tmp_path)).get("a")
+
+    # then the entry is found
+    assert value == make_output()
+
+
+async def test_tiered_cache_promotes_entries(tmp_path: Path):
+    # given an entry only in the second tier
+    memory = MemoryResultCache()
+    disk = DiskResultCache(str(tmp_path))
+    await disk.put("a", make_output())
+    cache = TieredResultCache(memory, disk)
+
+    # when we read it
+    value = await cache.get("a")
+
+    # then it is copied into the first tier
+    assert value == make_output()
+    assert await memory.get("a") == make_output()
+
+
+async def test_disk_cache_evicts_least_recently_used_below_the_limit(tmp_path: Path):
+    # given a full cache of ten entries, used in the order they were added
+    cache = DiskResultCache(str(tmp_path), max_entries=10)
+    for index in range(10):
+        await cache.put(str(index), make_output())
+        os.utime(tmp_path / f"{index}.json", (index, index))
+
+    # when another entry is added
+    await cache.put("10", make_output())
+
+    # then the least recently used entries are gone, down to 90% of the limit
+    assert len(cache) == 9
+    assert sorted(path.stem for path in tmp_path.glob("*.json")) == sorted(
+        str(index) for index in range(2, 11)
+    )
+
+
+async def test_disk_cache_counts_existing_entries_and_skips_vanished_ones(
+    tmp_path: Path,
+):
+    # given a directory with two entries and one that is gone when evicting
+    await DiskResultCache(str(tmp_path)).put("a", make_output())
+    await DiskResultCache(str(tmp_path)).put("b", make_output())
+    (tmp_path / "gone.json").symlink_to(tmp_path / "missing")
+    cache = DiskResultCache(str(tmp_path), max_entries=3)
+    assert len(cache) == 3
+
+    # when another entry is added
+    await cache.put("c", make_output())
+
+    # then the cache evicts without failing on the vanished entry
+    assert await cache.get("c") == make_output()
+    assert len(cache) == 2
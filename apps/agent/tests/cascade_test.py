@@ -0,0 +1,106 @@
+from typing import Any, Sequence
+
+import pytest
+from pydantic_ai import AgentRunResult, UserContent
+from pydantic_ai.exceptions import UnexpectedModelBehavior
+
+from agent_api.agent import Agent
+from agent_api.cascade import CascadeAgent, ModelTier
+from agent_api.config import AppConfig
+from agent_api.metrics import Metrics
+from agent_api.models.procurement import ProcurementRequestCreate
+from tests.cache_test import make_output
+
+
+class FixedAgent(Agent):
+    """Agent that counts its calls and returns or raises a fixed result."""
+
+    def __init__(self, output: ProcurementRequestCreate | Exception) -> None:
+        self.calls = 0
+        self.output = output
+
+    async def run(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> AgentRunResult[Any]:
+        self.calls += 1
+        if isinstance(self.output, Exception):
+            raise self.output
+        return AgentRunResult(output=self.output)
+
+
+def make_inconsistent_output() -> ProcurementRequestCreate:
+    return make_output().model_copy(update={"total_cost": 999.0})
+
+
+async def test_cascade_accepts_consistent_output_of_the_small_model():
+    # given a small model that extracts the document correctly
+    small = FixedAgent(make_output())
+    large = FixedAgent(make_output())
+    metrics = Metrics()
+    cascade = CascadeAgent(
+        [ModelTier("small", small), ModelTier("large", large)], metrics
+    )
+
+    # when a document is extracted
+    result = await cascade.run("prompt")
+
+    # then the large model was not asked
+    assert result.output == make_output()
+    assert (small.calls, large.calls) == (1, 0)
+    assert metrics.get("cascade.small.runs") == 1
+    assert metrics.get("cascade.small.accepted") == 1
+
+
+@pytest.mark.parametrize(
+    "small_output",
+    [make_inconsistent_output(), UnexpectedModelBehavior("Invalid commodity group")],
+)
+async def test_cascade_escalates_bad_output(small_output):
+    # given a small model with inconsistent or invalid output
+    small = FixedAgent(small_output)
+    large = FixedAgent(make_output(title="From the large model"))
+    metrics = Metrics()
+    cascade = CascadeAgent(
+        [ModelTier("small", small), ModelTier("large", large)], metrics
+    )
+
+    # when a document is extracted
+    result = await cascade.run("prompt")
+
+    # then the large model's output is returned
+    assert result.output.title == "From the large model"
+    assert metrics.get("cascade.small.escalated") == 1
+    assert metrics.get("cascade.large.runs") == 1
+    assert metrics.get("cascade.large.accepted") == 1
+
+
+async def test_cascade_returns_the_last_tier_output_even_if_inconsistent():
+    # given models that both extract inconsistent output
+    metrics = Metrics()
+    cascade = CascadeAgent(
+        [
+            ModelTier("small", FixedAgent(make_inconsistent_output())),
+            ModelTier("large", FixedAgent(make_inconsistent_output())),
+        ],
+        metrics,
+    )
+
+    # when a document is extracted
+    result = await cascade.run("prompt")
+
+    # then the large model's output is returned but not counted as accepted
+    assert result.output == make_inconsistent_output()
+    assert metrics.get("cascade.large.runs") == 1
+    assert metrics.get("cascade.large.accepted") == 0
+
+
+def test_config_needs_a_model(monkeypatch: pytest.MonkeyPatch):
+    # given an environment whose model list is empty
+    monkeypatch.setenv("API_HOST", "0.0.0.0")
+    monkeypatch.setenv("API_PORT", "8000")
+    monkeypatch.setenv("OPENAI_API_KEY", "key")
+    monkeypatch.setenv("AGENT_MODELS", " , ")
+
+    # when the configuration is loaded, then it is rejected
+    with pytest.raises(ValueError, match="AGENT_MODELS"):
+        AppConfig.from_env()
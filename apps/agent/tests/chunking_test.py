@@ -0,0 +1,201 @@
+import io
+from typing import Any, Sequence
+
+from pydantic_ai import AgentRunResult, BinaryContent, UserContent
+from pypdf import PdfReader
+
+from agent_api.agent import Agent, IntakeAgentApi
+from agent_api.cache import CachingAgentApi, MemoryResultCache
+from agent_api.chunking import ChunkingAgent, OrderLines, split_pdf, split_text
+from agent_api.metrics import Metrics
+from agent_api.pdf_text import PdfTextExtractor
+from tests.cache_test import make_output
+from tests.pdf_text_test import make_pdf
+from tests.validation_test import make_line
+
+
+class PageAgent(Agent):
+    """Agent that extracts one order line per page of a text prompt."""
+
+    def __init__(self, header: bool) -> None:
+        self.header = header
+        self.prompts: list[Sequence[UserContent]] = []
+
+    async def run(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> AgentRunResult[Any]:
+        assert not isinstance(user_prompt, str)
+        self.prompts.append(user_prompt)
+        document = user_prompt[1]
+        assert isinstance(document, str)
+        lines = [make_line(page) for page in document.split("\f")]
+        if self.header:
+            return AgentRunResult(
+                output=make_output().model_copy(update={"order_lines": lines})
+            )
+        return AgentRunResult(output=OrderLines(order_lines=lines))
+
+
+def test_split_pdf_keeps_the_page_order():
+    # given a PDF with five pages
+    content = make_pdf(*(f"Page {number}" for number in range(1, 6)))
+
+    # when it is split in parts of two pages
+    parts = split_pdf(content, 2)
+
+    # then the parts hold the pages in order
+    assert [
+        [page.extract_text().strip() for page in PdfReader(io.BytesIO(part)).pages]
+        for part in parts
+    ] == [["Page 1", "Page 2"], ["Page 3", "Page 4"], ["Page 5"]]
+
+
+def test_split_pdf_keeps_short_and_invalid_documents():
+    content = make_pdf("Page 1", "Page 2")
+    assert split_pdf(content, 2) == [content]
+    assert split_pdf(b"not a pdf", 2) == [b"not a pdf"]
+
+
+def test_split_text_splits_at_form_feeds():
+    assert split_text("1\f2\f3", 2) == ["1\f2", "3"]
+
+
+async def test_long_documents_are_extracted_in_parts():
+    # given a text layer of five pages, the second line continued on page three
+    header_agent = PageAgent(header=True)
+    line_agent = PageAgent(header=False)
+    metrics = Metrics()
+    agent = ChunkingAgent(header_agent, line_agent, 2, metrics)
+    text = "Cable\fSwitch\fSwitch\fRouter\fRack"
+
+    # when it is extracted
+    result = await agent.run(["Extract this.", text])
+
+    # then the header came from the first part and the lines from all parts
+    assert len(header_agent.prompts) == 1
+    assert [prompt[1] for prompt in line_agent.prompts] == ["Switch\fRouter", "Rack"]
+    assert result.output.requestor_name == make_output().requestor_name
+    assert [line.position_description for line in result.output.order_lines] == [
+        "Cable",
+        "Switch",
+        "Router",
+        "Rack",
+    ]
+    assert metrics.get("chunking.documents") == 1
+    assert metrics.get("chunking.chunks") == 3
+
+
+async def test_short_documents_are_extracted_at_once():
+    # given a text layer of two pages
+    header_agent = PageAgent(header=True)
+    line_agent = PageAgent(header=False)
+    agent = ChunkingAgent(header_agent, line_agent, 2, Metrics())
+    prompt = ["Extract this.", "Cable\fSwitch"]
+
+    # when it is extracted
+    await agent.run(prompt)
+
+    # then the prompt went to the agent unchanged
+    assert header_agent.prompts == [prompt]
+    assert line_agent.prompts == []
+
+
+async def test_long_pdfs_are_split_into_pdfs():
+    # given a PDF of three pages
+    prompts: list[Sequence[UserContent]] = []
+
+    class RecordingAgent(Agent):
+        async def run(
+            self, user_prompt: str | Sequence[UserContent]
+        ) -> AgentRunResult[Any]:
+            assert not isinstance(user_prompt, str)
+            prompts.append(user_prompt)
+            return AgentRunResult(output=make_output())
+
+    agent = ChunkingAgent(RecordingAgent(), RecordingAgent(), 2, Metrics())
+    content = make_pdf("Page 1", "Page 2", "Page 3")
+
+    # when it is extracted
+    await agent.run(
+        ["Extract this.", BinaryContent(data=content, media_type="application/pdf")]
+    )
+
+    # then each part went to the model as a PDF of its pages
+    page_counts = []
+    for prompt in prompts:
+        assert isinstance(prompt[1], BinaryContent)
+        page_counts.append(len(PdfReader(io.BytesIO(prompt[1].data)).pages))
+    assert page_counts == [2, 1]
+
+
+async def test_repeated_long_documents_are_answered_from_the_cache():
+    # given the intake of documents in parts of one page, cached per file
+    header_agent = PageAgent(header=True)
+    line_agent = PageAgent(header=False)
+    metrics = Metrics()
+    agent_api = CachingAgentApi(
+        IntakeAgentApi(
+            ChunkingAgent(header_agent, line_agent, 1, metrics),
+            metrics,
+            PdfTextExtractor(),
+        ),
+        MemoryResultCache(),
+        "gpt-5",
+        metrics,
+    )
+    content = make_pdf(
+        *(f"Network cable order line on page {number}" for number in range(1, 4))
+    )
+
+    # when the same document is uploaded twice
+    first = await agent_api.complete(content)
+    second = await agent_api.complete(content)
+
+    # then every part went to the model only once
+    assert len(header_agent.prompts) == 1
+    assert len(line_agent.prompts) == 2
+    assert second.output == first.output
+    assert metrics.get("cache.hits") == 1
+
+
+class StatedTotalAgent(PageAgent):
+    """Page agent whose header states the total cost of the whole document."""
+
+    def __init__(self, total_cost: float) -> None:
+        super().__init__(header=True)
+        self.total_cost = total_cost
+
+    async def run(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> AgentRunResult[Any]:
+        result = await super().run(user_prompt)
+        return AgentRunResult(
+            output=result.output.model_copy(update={"total_cost": self.total_cost})
+        )
+
+
+async def test_the_merged_request_is_checked_against_the_total_cost():
+    # given a header agent for the first part of documents that state a total
+    # cost of 30, and a document of three lines of 10
+    agent = PageAgent(header=True)
+    header_agent = StatedTotalAgent(total_cost=30.0)
+    metrics = Metrics()
+    chunking_agent = ChunkingAgent(
+        agent, PageAgent(header=False), 2, metrics, header_agent=header_agent
+    )
+
+    # when it is extracted
+    result = await chunking_agent.run(["Extract this.", "Cable\fSwitch\fRouter"])
+
+    # then the first part went to the header agent and the merged lines add up
+    assert agent.prompts == []
+    assert len(header_agent.prompts) == 1
+    assert result.output.total_cost == 30.0
+    assert metrics.get("chunking.inconsistent") == 0
+
+    # when the stated total cost does not match the lines
+    header_agent.total_cost = 50.0
+    await chunking_agent.run(["Extract this.", "Cable\fSwitch\fRouter"])
+
+    # then the merged request is counted as inconsistent
+    assert metrics.get("chunking.inconsistent") == 1
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import socket
+from typing import Any
+
+import httpx
+import pytest
+
+from agent_api.agent import IntakeAgentApi
+from agent_api.jobs import (
+    InvalidCallbackException,
+    JobQueue,
+    JobStatus,
+    QueueFullException,
+    check_callback_url,
+)
+from agent_api.metrics import Metrics
+from tests.agent_test import BlockingAgent
+from tests.cache_test import make_output
+
+
+async def wait_until_finished(job_queue: JobQueue, job_id: str) -> None:
+    for _ in range(100):
+        job = job_queue.get(job_id)
+        if job is not None and job.finished:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+async def test_job_is_processed_by_a_worker():
+    # given a running job queue
+    agent = BlockingAgent()
+    metrics = Metrics()
+    job_queue = JobQueue(IntakeAgentApi(agent), metrics, concurrency=1)
+    await job_queue.start()
+
+    # when a document is submitted
+    job = job_queue.submit(b"%PDF-1.4 invoice")
+
+    # then it waits for the agent and succeeds once the agent returns
+    assert job.status == JobStatus.QUEUED
+    agent.release.set()
+    await wait_until_finished(job_queue, job.id)
+    finished = job_queue.get(job.id)
+    assert finished is not None
+    assert finished.status == JobStatus.SUCCEEDED
+    assert finished.result == make_output()
+    assert finished.wait_seconds is not None
+    assert metrics.get("jobs.succeeded") == 1
+    assert metrics.get("jobs.queue_depth") == 0
+    await job_queue.stop()
+
+
+async def test_failed_job_keeps_the_error():
+    # given a job queue whose agent fails
+    agent = BlockingAgent(error=RuntimeError("model unavailable"))
+    agent.release.set()
+    job_queue = JobQueue(IntakeAgentApi(agent), Metrics())
+    await job_queue.start()
+
+    # when a document is processed
+    job = job_queue.submit(b"%PDF-1.4 invoice")
+    await wait_until_finished(job_queue, job.id)
+
+    # then the job failed with the error
+    assert job.status == JobStatus.FAILED
+    assert job.error == "model unavailable"
+    await job_queue.stop()
+
+
+async def test_full_queue_rejects_jobs():
+    # given a queue without running workers that holds one job
+    job_queue = JobQueue(IntakeAgentApi(BlockingAgent()), Metrics(), max_queued=1)
+    job_queue.submit(b"%PDF-1.4 first")
+
+    # when another job is submitted
+    # then it is rejected
+    with pytest.raises(QueueFullException):
+        job_queue.submit(b"%PDF-1.4 second")
+
+
+async def test_finished_job_is_posted_to_the_callback():
+    # given a job queue with a recording HTTP client
+    received: list[dict[str, object]] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        received.append(json.loads(request.content))
+        return httpx.Response(204)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    agent = BlockingAgent()
+    agent.release.set()
+    job_queue = JobQueue(
+        IntakeAgentApi(agent),
+        Metrics(),
+        callback_client=client,
+        callback_hosts=("erp.example",),
+    )
+    await job_queue.start()
+
+    # when a job with a callback URL finishes
+    job = job_queue.submit(b"%PDF-1.4 invoice", "http://erp.example/hooks/intake")
+    await wait_until_finished(job_queue, job.id)
+    await asyncio.sleep(0.01)
+
+    # then the finished job is posted to the callback URL
+    assert [body["id"] for body in received] == [job.id]
+    assert received[0]["status"] == "succeeded"
+    await job_queue.stop()
+    await client.aclose()
+
+
+async def test_callback_to_a_private_address_is_not_posted():
+    # given a job queue with a recording HTTP client
+    received: list[httpx.Request] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        received.append(request)
+        return httpx.Response(204)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    agent = BlockingAgent()
+    agent.release.set()
+    metrics = Metrics()
+    job_queue = JobQueue(IntakeAgentApi(agent), metrics, callback_client=client)
+    await job_queue.start()
+
+    # when a job with a callback URL on the loopback address finishes
+    job = job_queue.submit(b"%PDF-1.4 invoice", "http://127.0.0.1:8081/admin")
+    await wait_until_finished(job_queue, job.id)
+    await asyncio.sleep(0.01)
+
+    # then nothing is posted and the failed callback is counted
+    assert received == []
+    assert metrics.get("jobs.callback_failures") == 1
+    await job_queue.stop()
+    await client.aclose()
+
+
+@pytest.mark.parametrize(
+    "callback_url",
+    [
+        "file:///etc/passwd",
+        "http://127.0.0.1/hooks",
+        "http://10.0.0.5/hooks",
+        "http://169.254.169.254/latest/meta-data",
+        "http://[::1]/hooks",
+        "http://localhost/hooks",
+    ],
+)
+async def test_callbacks_to_internal_hosts_are_invalid(callback_url: str):
+    # when a callback URL that is no public HTTP URL is checked
+    # then it is invalid
+    with pytest.raises(InvalidCallbackException):
+        await check_callback_url(callback_url)
+
+
+@pytest.mark.parametrize("resolved", ["fe80::1%eth0", "not an address"])
+async def test_callbacks_to_scoped_or_invalid_addresses_are_invalid(
+    monkeypatch: pytest.MonkeyPatch, resolved: str
+):
+    # given a host that resolves to a link-local address with a zone, or to
+    # something that is no address
+    async def getaddrinfo(*args: Any, **kwargs: Any) -> list[tuple[Any, ...]]:
+        return [(socket.AF_INET6, socket.SOCK_STREAM, 6, "", (resolved, 0, 0, 2))]
+
+    monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+
+    # when a callback URL with the host is checked
+    # then it is invalid
+    with pytest.raises(InvalidCallbackException):
+        await check_callback_url("http://erp.example.com/hooks")
+
+
+async def test_only_allowed_callback_hosts_are_valid():
+    # given an allowed internal host
+    allowed_hosts = ("erp.internal",)
+
+    # when callback URLs are checked against it
+    # then only the allowed host is valid, without resolving it
+    await check_callback_url("https://erp.internal/hooks", allowed_hosts)
+    with pytest.raises(InvalidCallbackException):
+        await check_callback_url("https://8.8.8.8/hooks", allowed_hosts)
+
+
+async def test_public_callback_host_is_valid():
+    # when a callback URL with a public address is checked
+    # then it is valid
+    await check_callback_url("https://8.8.8.8/hooks")
@@ -0,0 +1,283 @@
+import asyncio
+from typing import Any, Sequence
+
+import httpx
+import pytest
+from pydantic_ai import AgentRunResult, UserContent
+from pydantic_ai.exceptions import ModelAPIError, ModelHTTPError
+
+from agent_api.agent import Agent
+from agent_api.limiter import (
+    AdaptiveLimiter,
+    LimitedAgent,
+    Priority,
+    request_priority,
+    retry_after,
+)
+from agent_api.metrics import Metrics
+from tests.cache_test import make_output
+
+
+class FailingAgent(Agent):
+    """Agent that raises the given errors first, then returns."""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.calls = 0
+        self.errors = list(errors)
+
+    async def run(
+        self, user_prompt: str | Sequence[UserContent]
+    ) -> AgentRunResult[Any]:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return AgentRunResult(output=make_output())
+
+
+def rate_limited(**headers: str) -> ModelHTTPError:
+    return ModelHTTPError(429, "gpt-5", headers=headers)
+
+
+async def test_limiter_queues_calls_over_the_limit():
+    # given a limiter with one slot in use
+    metrics = Metrics()
+    limiter = AdaptiveLimiter(metrics, initial_limit=1)
+    started = await limiter.acquire()
+
+    # when a second call arrives
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    # then it waits until the first call released its slot
+    assert not waiting.done()
+    assert metrics.get("llm.queue_depth") == 1
+    limiter.release(started)
+    await waiting
+    assert metrics.get("llm.in_flight") == 1
+
+
+async def test_limiter_admits_by_priority_then_arrival():
+    # given a full limiter with background calls waiting before an interactive one
+    limiter = AdaptiveLimiter(Metrics(), initial_limit=1, max_limit=1)
+    started = await limiter.acquire()
+    admitted: list[str] = []
+
+    async def call(name: str, priority: Priority) -> None:
+        await limiter.acquire(priority)
+        admitted.append(name)
+
+    tasks = [
+        asyncio.create_task(call("first job", Priority.BACKGROUND)),
+        asyncio.create_task(call("second job", Priority.BACKGROUND)),
+        asyncio.create_task(call("upload", Priority.INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+
+    # when slots free up one at a time
+    for _ in tasks:
+        limiter.release(started)
+        await asyncio.sleep(0)
+
+    # then the interactive call goes first
+    await asyncio.gather(*tasks)
+    assert admitted == ["upload", "first job", "second job"]
+
+
+async def test_limiter_increases_additively_and_halves_once_per_congestion():
+    # given a limiter at four slots
+    limiter = AdaptiveLimiter(Metrics(), initial_limit=4, max_limit=8)
+
+    # when four calls succeed
+    for _ in range(4):
+        limiter.release(await limiter.acquire())
+
+    # then the limit grew by about one
+    assert 4.9 < limiter.limit < 5.1
+
+    # when two calls that ran at the same time are rate limited
+    first = await limiter.acquire()
+    second = await limiter.acquire()
+    limiter.release(first, congested=True)
+    limiter.release(second, congested=True)
+
+    # then the limit halved only once
+    assert 2.4 < limiter.limit < 2.6
+
+
+async def test_limiter_treats_slow_calls_as_congestion():
+    # given a limiter with a latency target that every call misses
+    limiter = AdaptiveLimiter(Metrics(), initial_limit=4, latency_target=0)
+    started = await limiter.acquire()
+    await asyncio.sleep(0.001)
+
+    # when the call finishes
+    limiter.release(started)
+
+    # then the limit decreased
+    assert limiter.limit == 2
+
+
+async def test_limiter_admits_nothing_while_paused():
+    # given a paused limiter with free slots
+    limiter = AdaptiveLimiter(Metrics(), initial_limit=4)
+    limiter.pause(0.05)
+
+    # when a call arrives
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0.01)
+
+    # then it waits for the pause to end
+    assert not waiting.done()
+    await asyncio.wait_for(waiting, timeout=1)
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"retry-after": "2"}, 2.0),
+        ({"retry-after-ms": "250"}, 0.25),
+        ({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0.0),
+        ({"retry-after": "soon"}, None),
+        ({}, None),
+    ],
+)
+def test_retry_after_reads_the_provider_headers(headers, expected):
+    assert retry_after(rate_limited(**headers)) == expected
+
+
+async def test_limited_agent_retries_rate_limits_with_backoff():
+    # given an agent that is rate limited twice without a retry-after
+    metrics = Metrics()
+    agent = FailingAgent(rate_limited(), rate_limited())
+    limited = LimitedAgent(
+        agent, AdaptiveLimiter(metrics), backoff_base=0.001, backoff_cap=0.01
+    )
+
+    # when a document is extracted
+    result = await limited.run("prompt")
+
+    # then the third call succeeded
+    assert result.output == make_output()
+    assert agent.calls == 3
+    assert metrics.get("llm.rate_limited") == 2
+    assert metrics.get("llm.retries") == 2
+
+
+async def test_limited_agent_honors_retry_after():
+    # given an agent that asks to wait 50 milliseconds
+    limiter = AdaptiveLimiter(Metrics())
+    agent = FailingAgent(rate_limited(**{"retry-after-ms": "50"}))
+    limited = LimitedAgent(agent, limiter, backoff_base=0)
+
+    # when a document is extracted
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await limited.run("prompt")
+
+    # then the retry waited for the provider
+    assert loop.time() - started >= 0.04
+    assert agent.calls == 2
+
+
+async def test_limited_agent_gives_up_after_max_retries():
+    # given an agent that is always unavailable
+    agent = FailingAgent(*(ModelHTTPError(503, "gpt-5") for _ in range(3)))
+    limiter = AdaptiveLimiter(Metrics())
+    limited = LimitedAgent(agent, limiter, max_retries=2, backoff_base=0)
+
+    # when a document is extracted
+    # then the last error is raised and every slot was released
+    with pytest.raises(ModelHTTPError):
+        await limited.run("prompt")
+    assert agent.calls == 3
+    assert limiter.in_flight == 0
+
+
+async def test_limited_agent_retries_connection_errors_and_timeouts():
+    # given an agent that cannot reach the provider, then times out
+    unreachable = ModelAPIError("gpt-5", "Connection error.")
+    unreachable.__cause__ = httpx.ConnectError("Connection refused")
+    timed_out = TimeoutError()
+    metrics = Metrics()
+    limiter = AdaptiveLimiter(metrics, initial_limit=4)
+    agent = FailingAgent(unreachable, timed_out)
+    limited = LimitedAgent(agent, limiter, backoff_base=0.001, backoff_cap=0.01)
+
+    # when a document is extracted
+    result = await limited.run("prompt")
+
+    # then the third call succeeded and only it raised the limit
+    assert result.output == make_output()
+    assert agent.calls == 3
+    assert metrics.get("llm.retries") == 2
+    assert 4.2 < limiter.limit < 4.3
+
+
+async def test_limited_agent_does_not_count_server_errors_as_successes():
+    # given an agent that fails with an internal server error
+    limiter = AdaptiveLimiter(Metrics(), initial_limit=4)
+    agent = FailingAgent(ModelHTTPError(500, "gpt-5"))
+    limited = LimitedAgent(agent, limiter, max_retries=0)
+
+    # when a document is extracted
+    with pytest.raises(ModelHTTPError):
+        await limited.run("prompt")
+
+    # then the limit did not grow
+    assert limiter.limit == 4
+
+
+async def test_limited_agent_caps_the_retry_after_pause():
+    # given an agent that asks to wait an hour
+    limiter = AdaptiveLimiter(Metrics())
+    agent = FailingAgent(rate_limited(**{"retry-after": "3600"}))
+    limited = LimitedAgent(agent, limiter, max_retry_after=0.01)
+
+    # when a document is extracted
+    # then the retry only waited for the cap
+    await asyncio.wait_for(limited.run("prompt"), timeout=1)
+    assert agent.calls == 2
+
+
+async def test_limited_agent_does_not_retry_client_errors():
+    # given an agent that rejects the request
+    agent = FailingAgent(ModelHTTPError(400, "gpt-5"))
+    limited = LimitedAgent(agent, AdaptiveLimiter(Metrics()))
+
+    # when a document is extracted
+    # then the error is raised right away
+    with pytest.raises(ModelHTTPError):
+        await limited.run("prompt")
+    assert agent.calls == 1
+
+
+async def test_limited_agent_queues_with_the_request_priority():
+    # given a full limiter and a background call waiting
+    limiter = AdaptiveLimiter(Metrics(), initial_limit=1, max_limit=1)
+    started = await limiter.acquire()
+    order: list[str] = []
+
+    class RecordingAgent(Agent):
+        async def run(
+            self, user_prompt: str | Sequence[UserContent]
+        ) -> AgentRunResult[Any]:
+            order.append(str(user_prompt))
+            return AgentRunResult(output=make_output())
+
+    limited = LimitedAgent(RecordingAgent(), limiter)
+
+    async def background() -> None:
+        request_priority.set(Priority.BACKGROUND)
+        await limited.run("job")
+
+    tasks: list[asyncio.Task[Any]] = [asyncio.create_task(background())]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(limited.run("upload")))
+    await asyncio.sleep(0)
+
+    # when the slot frees up
+    limiter.release(started)
+    await asyncio.gather(*tasks)
+
+    # then the interactive upload ran first
+    assert order == ["upload", "job"]
@@ -0,0 +1,110 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pypdf import PdfWriter
+
+from agent_api import pdf_text
+from agent_api.pdf_text import PdfTextExtractor, read_text_layer
+
+
+def make_pdf(*pages: str) -> bytes:
+    """Create a PDF with a text layer, one page per text."""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for text in pages:
+        lines = " ".join(f"({line}) Tj T*" for line in text.split("\n"))
+        stream = f"BT /F1 12 Tf 14 TL 72 720 Td {lines} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    output = io.BytesIO(b"%PDF-1.4\n")
+    output.seek(0, io.SEEK_END)
+    offsets = []
+    for number, content in enumerate(objects, 1):
+        offsets.append(output.tell())
+        output.write(f"{number} 0 obj\n{content}\nendobj\n".encode())
+    xref = output.tell()
+    output.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        output.write(f"{offset:010d} 00000 n \n".encode())
+    output.write(
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n".encode()
+    )
+    return output.getvalue()
+
+
+def make_scanned_pdf() -> bytes:
+    """Create a PDF without a text layer, like a scan."""
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def test_read_text_layer_keeps_lines_and_pages():
+    # given a digital invoice with two pages
+    content = make_pdf(
+        "Invoice 42 from Dell Technologies\nLaptop   2   999.00",
+        "Total amount due   1998.00 EUR",
+    )
+
+    # when its text layer is read
+    text = read_text_layer(content)
+
+    # then the pages are separated by a form feed
+    assert text == (
+        "Invoice 42 from Dell Technologies\nLaptop   2   999.00"
+        "\fTotal amount due   1998.00 EUR"
+    )
+
+
+def test_read_text_layer_rejects_scanned_pages():
+    # given a scan and a digital invoice with an appended scanned page
+    scanned = make_scanned_pdf()
+    partly_scanned = make_pdf("Invoice 42 from Dell Technologies", "")
+
+    # when the text layers are read
+    # then both go to the model as PDF
+    assert read_text_layer(scanned) is None
+    assert read_text_layer(partly_scanned) is None
+
+
+def test_read_text_layer_rejects_invalid_documents():
+    assert read_text_layer(b"not a pdf") is None
+
+
+def test_read_text_layer_rejects_documents_pypdf_fails_on(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # given a damaged document that pypdf fails on with an unexpected error
+    def fail(*args: object) -> None:
+        raise AttributeError("'NullObject' object has no attribute 'get_object'")
+
+    monkeypatch.setattr(pdf_text, "PdfReader", fail)
+
+    # then it has no text layer, so it is sent as PDF
+    assert read_text_layer(make_pdf("Invoice 42 from Dell Technologies")) is None
+
+
+async def test_pdf_text_extractor_reads_in_the_executor():
+    # given an extractor with its own thread pool
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        extractor = PdfTextExtractor(executor)
+
+        # when a document is extracted
+        text = await extractor.extract(make_pdf("Invoice 42 from Dell Technologies"))
+
+    # then the text layer is returned
+    assert text == "Invoice 42 from Dell Technologies"
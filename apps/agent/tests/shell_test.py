@@ -1,5 +1,8 @@
 import asyncio
 import io
+import json
+import time
+import zipfile
 from typing import Any, Sequence
 
 from fastapi.testclient import TestClient
@@ -7,6 +10,7 @@ from pydantic_ai import AgentRunResult, BinaryContent
 
 from agent_api.agent import Agent, IntakeAgentApi
 from agent_api.config import AppConfig
+from agent_api.metrics import Metrics
 from agent_api.models.procurement import (
     CommodityGroup,
     OrderLine,
@@ -106,3 +110,139 @@ def test_post_agent_intake_gives_200():
         assert data["title"] == "Test Procurement"
         assert data["vendor_name"] == "Test Vendor Inc"
         assert data["commodity_group"] == "Software"
+
+
+def test_get_agent_metrics_gives_counters():
+    # given an app with counted events
+    metrics = Metrics()
+    metrics.increment("cache.hits", 2)
+    app = build_app(IntakeAgentApi(StubAgent()), metrics)
+
+    # when we get the metrics
+    with TestClient(app) as client:
+        response = client.get("/agent/metrics")
+
+    # then we get the counters
+    assert response.status_code == 200
+    assert response.json() == {"cache.hits": 2}
+
+
+def test_intake_job_can_be_polled():
+    # given an app
+    app = build_app(IntakeAgentApi(StubAgent()))
+    files = {"file": ("test.pdf", io.BytesIO(b"%PDF-1.4\n%test"), "application/pdf")}
+
+    with TestClient(app) as client:
+        # when we submit a job
+        response = client.post("/agent/jobs", files=files)
+
+        # then it is accepted right away
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+        assert response.headers["Location"] == f"/agent/jobs/{job_id}"
+
+        # and polling eventually gives the result
+        for _ in range(100):
+            job = client.get(f"/agent/jobs/{job_id}").json()
+            if job["status"] == "succeeded":
+                break
+            time.sleep(0.01)
+        assert job["result"]["title"] == "Test Procurement"
+
+
+def test_intake_job_with_invalid_callback_gives_400():
+    # given an app
+    app = build_app(IntakeAgentApi(StubAgent()))
+    files = {"file": ("test.pdf", io.BytesIO(b"%PDF-1.4\n%test"), "application/pdf")}
+
+    # when we submit a job with a callback that is no HTTP URL
+    with TestClient(app) as client:
+        response = client.post(
+            "/agent/jobs", files=files, data={"callback_url": "file:///etc/passwd"}
+        )
+
+    # then it is rejected
+    assert response.status_code == 400
+
+
+def test_intake_job_with_callback_to_a_private_address_gives_400():
+    # given an app
+    app = build_app(IntakeAgentApi(StubAgent()))
+    files = {"file": ("test.pdf", io.BytesIO(b"%PDF-1.4\n%test"), "application/pdf")}
+
+    # when we submit a job with a callback to the cloud metadata address
+    with TestClient(app) as client:
+        response = client.post(
+            "/agent/jobs",
+            files=files,
+            data={"callback_url": "http://169.254.169.254/latest/meta-data"},
+        )
+
+    # then it is rejected
+    assert response.status_code == 400
+    assert "not a public address" in response.json()["detail"]
+
+
+def test_unknown_intake_job_gives_404():
+    # given an app
+    app = build_app(IntakeAgentApi(StubAgent()))
+
+    # when we poll a job that does not exist
+    with TestClient(app) as client:
+        response = client.get("/agent/jobs/non-existent-id")
+
+    # then we get a 404 not found response
+    assert response.status_code == 404
+
+
+def test_post_agent_intake_batch_streams_ndjson():
+    # given an app
+    app = build_app(IntakeAgentApi(StubAgent()))
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("a.pdf", b"%PDF-1.4 a")
+        zip_file.writestr("b.pdf", b"%PDF-1.4 b")
+    files = [
+        ("files", ("single.pdf", io.BytesIO(b"%PDF-1.4 c"), "application/pdf")),
+        ("files", ("batch.zip", io.BytesIO(archive.getvalue()), "application/zip")),
+    ]
+
+    # when we upload a PDF and a zip archive with two PDFs
+    with TestClient(app) as client:
+        response = client.post("/agent/intake/batch", files=files)
+
+    # then we get one result line per document
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["file"] for line in lines) == [
+        "batch.zip/a.pdf",
+        "batch.zip/b.pdf",
+        "single.pdf",
+    ]
+    assert all(line["result"]["title"] == "Test Procurement" for line in lines)
+
+
+def test_post_agent_intake_stream_sends_server_sent_events():
+    # given an app
+    app = build_app(IntakeAgentApi(StubAgent()))
+    files = {
+        "file": ("invoice.pdf", io.BytesIO(b"%PDF-1.4 invoice"), "application/pdf")
+    }
+
+    # when we upload a PDF to the streaming endpoint
+    with TestClient(app) as client:
+        response = client.post("/agent/intake/stream", files=files)
+
+    # then the values and the result arrive as events
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append(
+            (event.removeprefix("event: "), json.loads(data.removeprefix("data: ")))
+        )
+    assert events[0] == ("field", {"name": "requestor_name", "value": "Test User"})
+    assert events[-1][0] == "result"
+    assert events[-1][1]["title"] == "Test Procurement"
@@ -0,0 +1,186 @@
+import asyncio
+from typing import Any, AsyncIterator
+
+from pydantic import BaseModel
+from pydantic_ai import Agent as PydanticAgent
+from pydantic_ai import AgentRunResult
+from pydantic_ai.messages import ModelMessage
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+
+from agent_api.agent import IntakeAgent, IntakeAgentApi
+from agent_api.metrics import Metrics
+from agent_api.models.procurement import ProcurementRequestCreate
+from agent_api.streaming import (
+    PartialOutputEvents,
+    output_listener,
+    stream_extraction,
+)
+from tests.cache_test import make_output
+
+
+def test_partial_output_events_wait_for_complete_values():
+    # given a tracker
+    tracker = PartialOutputEvents()
+
+    # when the output grows field by field and line by line
+    events = [
+        tracker.update({"requestor_name": "Test User"}),
+        tracker.update({"requestor_name": "Test User", "title": "Lap"}),
+        tracker.update(
+            {"requestor_name": "Test User", "title": "Laptops", "order_lines": [{}]}
+        ),
+        tracker.update(
+            {
+                "requestor_name": "Test User",
+                "title": "Laptops",
+                "order_lines": [{"amount": 1}, {"amount": 2}],
+            }
+        ),
+        tracker.update(
+            {
+                "requestor_name": "Test User",
+                "title": "Laptops",
+                "order_lines": [{"amount": 1}, {"amount": 2}],
+            },
+            complete=True,
+        ),
+    ]
+
+    # then each value is sent once it is complete, and only once
+    assert events == [
+        [],
+        [("field", {"name": "requestor_name", "value": "Test User"})],
+        [("field", {"name": "title", "value": "Laptops"})],
+        [("order_line", {"index": 0, "order_line": {"amount": 1}})],
+        [("order_line", {"index": 1, "order_line": {"amount": 2}})],
+    ]
+
+
+def test_partial_output_events_resend_changed_values():
+    # given a tracker that sent a field
+    tracker = PartialOutputEvents()
+    tracker.update({"title": "Laptops"}, complete=True)
+
+    # when a larger model takes over and extracts another value
+    events = tracker.update({"title": "Laptops for new hires"}, complete=True)
+
+    # then the new value is sent
+    assert events == [("field", {"name": "title", "value": "Laptops for new hires"})]
+
+
+def streaming_agent(
+    output: ProcurementRequestCreate,
+) -> PydanticAgent[object, BaseModel]:
+    """Create an agent whose model streams the output a few characters at a time."""
+
+    async def stream(
+        messages: list[ModelMessage], info: AgentInfo
+    ) -> AsyncIterator[dict[int, DeltaToolCall]]:
+        arguments = output.model_dump_json()
+        name = info.output_tools[0].name
+        yield {0: DeltaToolCall(name=name, json_args="", tool_call_id="call")}
+        for start in range(0, len(arguments), 7):
+            yield {0: DeltaToolCall(json_args=arguments[start : start + 7])}
+
+    return PydanticAgent(
+        FunctionModel(stream_function=stream), output_type=ProcurementRequestCreate
+    )
+
+
+async def test_intake_agent_passes_the_partial_output_to_the_listener():
+    # given an intake agent whose model streams its output
+    intake_agent = IntakeAgent(openai_api_key="test")
+    intake_agent.agent = streaming_agent(make_output())
+    partials: list[dict[str, Any]] = []
+    output_listener.set(partials.append)
+
+    # when a document is extracted
+    result = await intake_agent.run("prompt")
+
+    # then the listener saw the output grow before the run finished
+    assert result.output == make_output()
+    assert any(
+        "title" in partial and "department" not in partial for partial in partials
+    )
+    assert partials[-1]["department"] == "IT"
+
+
+async def test_stream_extraction_streams_the_values_before_the_result():
+    # given an agent API whose model streams its output
+    intake_agent = IntakeAgent(openai_api_key="test")
+    intake_agent.agent = streaming_agent(make_output())
+    agent_api = IntakeAgentApi(intake_agent)
+
+    # when a document is extracted
+    events = [event async for event in stream_extraction(agent_api.complete, b"%PDF")]
+
+    # then every value was sent once, followed by the result
+    assert [data.get("name", "order_line") for _, data in events[:-1]] == [
+        "requestor_name",
+        "title",
+        "vendor_name",
+        "vat_id",
+        "commodity_group",
+        "order_line",
+        "department",
+    ]
+    assert events[-1] == ("result", make_output().model_dump(mode="json"))
+
+
+async def test_stream_extraction_ends_with_the_error():
+    # given an agent API that fails
+    async def complete(
+        file_content: bytes,
+    ) -> AgentRunResult[ProcurementRequestCreate]:
+        raise RuntimeError("model unavailable")
+
+    # when a document is extracted
+    events = [event async for event in stream_extraction(complete, b"%PDF")]
+
+    # then the stream ends with the error
+    assert events == [("error", {"detail": "model unavailable"})]
+
+
+def field_names(events: list[tuple[str, dict[str, Any]]]) -> list[str]:
+    return [data["name"] for event, data in events if event == "field"]
+
+
+async def test_concurrent_streams_of_a_document_share_the_run_and_its_events():
+    # given an agent API whose model streams its output
+    intake_agent = IntakeAgent(openai_api_key="test")
+    intake_agent.agent = streaming_agent(make_output())
+    metrics = Metrics()
+    agent_api = IntakeAgentApi(intake_agent, metrics)
+
+    async def collect() -> list[tuple[str, dict[str, Any]]]:
+        return [event async for event in stream_extraction(agent_api.complete, b"%PDF")]
+
+    # when two clients stream the same document at the same time
+    first, second = await asyncio.gather(collect(), collect())
+
+    # then the model ran once and both clients got every value
+    assert metrics.get("intake.runs") == 1
+    assert metrics.get("intake.coalesced") == 1
+    assert field_names(first) == field_names(second)
+    assert "department" in field_names(second)
+
+
+async def test_stream_does_not_join_a_run_that_does_not_stream():
+    # given an agent API that is extracting a document for a plain request
+    intake_agent = IntakeAgent(openai_api_key="test")
+    intake_agent.agent = streaming_agent(make_output())
+    metrics = Metrics()
+    agent_api = IntakeAgentApi(intake_agent, metrics)
+    partials: list[dict[str, Any]] = []
+    plain = asyncio.ensure_future(agent_api.complete(b"%PDF"))
+    await asyncio.sleep(0)
+
+    # when a client streams the same document
+    output_listener.set(partials.append)
+    result = await agent_api.complete(b"%PDF")
+
+    # then it got a streaming run of its own with the partial output
+    assert metrics.get("intake.runs") == 2
+    assert partials[-1]["department"] == "IT"
+    assert result.output == make_output()
+    plain.cancel()
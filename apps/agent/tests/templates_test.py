@@ -0,0 +1,209 @@
+import json
+from typing import Any
+
+import httpx
+
+from agent_api.metrics import Metrics
+from agent_api.models.procurement import CommodityGroup
+from agent_api.templates import (
+    TemplateAgent,
+    TemplateEngine,
+    TemplateLearner,
+    VendorTemplate,
+    learn_templates,
+    parse_price,
+)
+from tests.cache_test import CountingAgent, make_output
+
+INVOICE = """\
+Dell Technologies GmbH                         Invoice 2024-0042
+VAT ID: DE 123456789
+
+Requestor: John Doe                            Date: 2024-03-01
+Department: IT Department
+Subject: Laptops for new hires
+
+Description                     Amount         Unit price         Total
+Dell Latitude 5540              2 pieces          1,099.00       2,198.00
+USB-C Dock                      2 pieces            149.50         299.00
+
+Total                                                             2,497.00 EUR
+"""
+
+DELL = VendorTemplate(
+    vat_id="DE123456789",
+    vendor_name="Dell Technologies GmbH",
+    commodity_group=CommodityGroup.HARDWARE,
+)
+
+
+# What the template of `DELL` learns from requests made by `make_confirmed`
+LEARNED_DELL = DELL._replace(
+    field_defaults={
+        "requestor_name": "Test User",
+        "title": "Test Procurement",
+        "department": "IT",
+    }
+)
+
+
+def make_confirmed(vat_id: str = "DE123456789", **fields: Any) -> dict[str, Any]:
+    return {
+        **make_output().model_dump(mode="json"),
+        "vat_id": vat_id,
+        "vendor_name": "Dell Technologies GmbH",
+        "commodity_group": "Hardware",
+        **fields,
+    }
+
+
+def test_parse_price_reads_both_decimal_separators():
+    assert parse_price("1,099.00") == 1099.0
+    assert parse_price("1.099,00") == 1099.0
+    assert parse_price("149,5") == 149.5
+    assert parse_price("2497") == 2497.0
+
+
+def test_engine_reads_invoices_of_known_vendors():
+    # given the template of the vendor
+    engine = TemplateEngine([DELL])
+
+    # when its invoice is read
+    request = engine.extract(INVOICE)
+
+    # then the header and all order lines are filled in
+    assert request is not None
+    assert request.requestor_name == "John Doe"
+    assert request.department == "IT Department"
+    assert request.title == "Laptops for new hires"
+    assert request.vendor_name == "Dell Technologies GmbH"
+    assert request.commodity_group == CommodityGroup.HARDWARE
+    assert request.total_cost == 2497.0
+    assert [
+        (line.position_description, line.amount, line.unit, line.total_price)
+        for line in request.order_lines
+    ] == [
+        ("Dell Latitude 5540", 2, "pieces", 2198.0),
+        ("USB-C Dock", 2, "pieces", 299.0),
+    ]
+
+
+def test_engine_does_not_read_invoices_of_unknown_vendors():
+    engine = TemplateEngine([DELL._replace(vat_id="DE999999999")])
+    assert engine.extract(INVOICE) is None
+
+
+def test_engine_rejects_invoices_whose_numbers_do_not_add_up():
+    # given an invoice with a wrong line total and one with a wrong total
+    wrong_line = INVOICE.replace("299.00", "300.00")
+    wrong_total = INVOICE.replace("2,497.00", "2,498.00")
+
+    # when they are read
+    # then they are left to the model
+    engine = TemplateEngine([DELL])
+    assert engine.extract(wrong_line) is None
+    assert engine.extract(wrong_total) is None
+
+
+def test_learn_templates_needs_enough_consistent_confirmations():
+    # given confirmed requests of three vendors
+    requests = [
+        make_confirmed(),
+        make_confirmed(vat_id="DE 123 456 789"),
+        make_confirmed(vendor_name="Dell GmbH"),
+        make_confirmed(vat_id="FR11222333444"),
+        make_confirmed(vat_id="NL123456789B01", commodity_group="Software"),
+        make_confirmed(vat_id="NL123456789B01"),
+        make_confirmed(vat_id="NL123456789B01"),
+    ]
+
+    # when templates are learned
+    templates = learn_templates(requests, min_confirmations=3)
+
+    # then only the vendor with three agreeing requests gets one
+    assert templates == [LEARNED_DELL]
+
+
+def test_learn_templates_skips_vendors_with_an_unknown_commodity_group():
+    # given confirmed requests of two vendors, one in a group the agent does
+    # not know
+    requests = [
+        *(make_confirmed() for _ in range(3)),
+        *(
+            make_confirmed(vat_id="FR11222333444", commodity_group="Space Travel")
+            for _ in range(3)
+        ),
+    ]
+
+    # when templates are learned
+    templates = learn_templates(requests, min_confirmations=3)
+
+    # then the other vendor still gets its template
+    assert templates == [LEARNED_DELL]
+
+
+def test_learned_templates_fill_in_the_header_fields_of_the_buyer():
+    # given confirmed requests of the vendor, mostly by the same requestor
+    requests = [
+        make_confirmed(requestor_name="Jane Roe", department="Procurement"),
+        make_confirmed(requestor_name="Jane Roe", department="Procurement"),
+        make_confirmed(requestor_name="Max Mustermann", department="Procurement"),
+    ]
+    # and an invoice that only prints the vendor's side
+    invoice = "\n".join(
+        line
+        for line in INVOICE.splitlines()
+        if not line.startswith(("Requestor", "Department", "Subject"))
+    )
+
+    # when the invoice is read with the learned template
+    engine = TemplateEngine(learn_templates(requests, min_confirmations=3))
+    request = engine.extract(invoice)
+
+    # then the buyer's fields are the most frequent confirmed ones
+    assert request is not None
+    assert request.requestor_name == "Jane Roe"
+    assert request.department == "Procurement"
+    assert request.total_cost == 2497.0
+
+
+async def test_template_agent_skips_the_model_for_known_vendors():
+    # given a template agent that knows the vendor
+    agent = CountingAgent()
+    metrics = Metrics()
+    template_agent = TemplateAgent(agent, metrics, [DELL])
+
+    # when the invoice and an unknown document are processed
+    result = await template_agent.run(["Extract this.", INVOICE])
+    await template_agent.run(["Extract this.", "Some other document"])
+
+    # then only the unknown document went to the model
+    assert result.output.vendor_name == "Dell Technologies GmbH"
+    assert agent.calls == 1
+    assert metrics.get("templates.hits") == 1
+    assert metrics.get("templates.misses") == 1
+
+
+async def test_template_learner_learns_from_the_procurement_api():
+    # given a Procurement API with confirmed requests of one vendor
+    def export(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/intake/requests/export"
+        stored = [
+            {"id": "1", "status": request.url.params["status"], "request": confirmed}
+            for confirmed in [make_confirmed(), make_confirmed()]
+        ]
+        return httpx.Response(200, text="".join(json.dumps(s) + "\n" for s in stored))
+
+    metrics = Metrics()
+    template_agent = TemplateAgent(CountingAgent(), metrics)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(export)) as client:
+        learner = TemplateLearner(
+            template_agent, "http://procurement/", min_confirmations=3, client=client
+        )
+
+        # when the templates are refreshed
+        await learner.refresh()
+
+    # then the vendor's in progress and closed requests taught a template
+    assert template_agent.engine.extract(INVOICE) is not None
+    assert metrics.get("templates.vendors") == 1
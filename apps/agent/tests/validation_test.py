@@ -0,0 +1,84 @@
+from agent_api.models.procurement import OrderLine
+from agent_api.validation import (
+    check_request,
+    line_total_matches,
+    merge_order_lines,
+)
+from tests.cache_test import make_output
+
+
+def make_line(description: str, total_price: float = 10.0) -> OrderLine:
+    return OrderLine(
+        position_description=description,
+        unit_price=5.0,
+        amount=2,
+        unit="pieces",
+        total_price=total_price,
+    )
+
+
+def test_line_total_matches_allows_rounding():
+    assert line_total_matches(make_line("Cable", total_price=10.004))
+    assert not line_total_matches(make_line("Cable", total_price=10.5))
+
+
+def test_merge_order_lines_drops_lines_extracted_on_both_sides_of_a_page_break():
+    # given three parts where a line continues from the first to the second
+    # part and the third part repeats a position of its own
+    first = [make_line("Cable"), make_line("Switch")]
+    second = [make_line("Switch"), make_line("Router")]
+    third = [make_line("Rack"), make_line("Rack")]
+
+    # when they are merged
+    merged = merge_order_lines([first, second, third])
+
+    # then the continued line is kept once and the repeated position twice
+    assert [line.position_description for line in merged] == [
+        "Cable",
+        "Switch",
+        "Router",
+        "Rack",
+        "Rack",
+    ]
+
+
+def test_merge_order_lines_keeps_repeated_positions_of_different_parts():
+    # given two parts that both list the same monthly fee, apart from the
+    # page break
+    first = [make_line("Monthly fee"), make_line("Monthly fee"), make_line("Setup")]
+    second = [make_line("Support"), make_line("Monthly fee"), make_line("Monthly fee")]
+
+    # when they are merged
+    merged = merge_order_lines([first, second])
+
+    # then every position is kept
+    assert [line.position_description for line in merged] == [
+        "Monthly fee",
+        "Monthly fee",
+        "Setup",
+        "Support",
+        "Monthly fee",
+        "Monthly fee",
+    ]
+
+
+def test_check_request_compares_the_lines_with_the_total_cost():
+    # given requests whose lines add up to 100.00
+    request = make_output()
+
+    # when they state different total costs
+    # then only the differing total is a problem
+    assert check_request(request) == []
+    assert check_request(request.model_copy(update={"total_cost": 100.0})) == []
+    assert check_request(request.model_copy(update={"total_cost": 120.0})) == [
+        "Order lines add up to 100.00, not the total cost 120.00."
+    ]
+
+
+def test_check_request_reports_inconsistent_lines():
+    request = make_output().model_copy(
+        update={"order_lines": [make_line("Cable"), make_line("Switch", 12.0)]}
+    )
+    assert check_request(request) == [
+        "Order line 2: total price 12.0 is not unit price 5.0 times amount 2."
+    ]
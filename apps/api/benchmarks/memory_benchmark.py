@@ -0,0 +1,68 @@
+"""Compare the memory held per stored request by the in-memory repositories.
+
+`InMemoryRepository` keeps every request as Pydantic models, while
+`CompactInMemoryRepository` keeps slotted records with interned strings and
+order lines packed into arrays. Both include the secondary indexes.
+
+Run with `uv run python benchmarks/memory_benchmark.py`.
+"""
+
+import gc
+import json
+import tracemalloc
+
+from procurement_api.compact_repository import CompactInMemoryRepository
+from procurement_api.models.procurement import ProcurementRequestCreate
+from procurement_api.repository import BaseInMemoryRepository, InMemoryRepository
+
+RECORDS = 10_000
+VENDORS = ["Adobe Inc", "Dell Technologies", "Lenovo", "Microsoft"]
+DEPARTMENTS = ["Design", "Engineering", "Finance"]
+
+
+def make_request(i: int) -> ProcurementRequestCreate:
+    # Parse JSON like the API does, so no strings are shared between requests
+    payload = {
+        "requestor_name": "Alice Smith",
+        "title": f"Software Licenses {i}",
+        "vendor_name": VENDORS[i % len(VENDORS)],
+        "vat_id": "DE123456789",
+        "commodity_group": "Software",
+        "order_lines": [
+            {
+                "position_description": f"Creative Cloud seat {i}-{line}",
+                "unit_price": 500.0,
+                "amount": 10,
+                "unit": "licenses",
+                "total_price": 5000.0,
+            }
+            for line in range(3)
+        ],
+        "total_cost": 15000.0,
+        "department": DEPARTMENTS[i % len(DEPARTMENTS)],
+    }
+    return ProcurementRequestCreate.model_validate_json(json.dumps(payload))
+
+
+def bytes_per_request(repository: BaseInMemoryRepository) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    repository.store_many([make_request(i) for i in range(RECORDS)])
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / RECORDS
+
+
+def main() -> None:
+    print(f"Memory held per stored request ({RECORDS} requests, 3 order lines)")
+    baseline = bytes_per_request(InMemoryRepository())
+    compact = bytes_per_request(CompactInMemoryRepository())
+    print(f"{'InMemoryRepository':>26}: {baseline:8.0f} bytes")
+    print(f"{'CompactInMemoryRepository':>26}: {compact:8.0f} bytes")
+    print(f"{'saved':>26}: {1 - compact / baseline:8.0%}")
+
+
+if __name__ == "__main__":
+    main()
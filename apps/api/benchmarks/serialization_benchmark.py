@@ -0,0 +1,77 @@
+"""Compare list response serialization for 10k stored requests.
+
+The dict path is what `GET /intake/requests` did before: `to_dict()` per
+request, then FastAPI's `jsonable_encoder` and a JSON dump. The cached path
+joins the per-request JSON bytes from `ProcurementRequestStored.to_json()`.
+
+Run with `uv run python benchmarks/serialization_benchmark.py`.
+"""
+
+import json
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+
+from procurement_api.models.procurement import OrderLine, ProcurementRequestCreate
+from procurement_api.repository import ProcurementRequestStored
+
+RECORDS = 10_000
+REPEAT = 5
+
+
+def make_requests() -> list[ProcurementRequestStored]:
+    request = ProcurementRequestCreate(
+        requestor_name="Alice Smith",
+        title="Software Licenses",
+        vendor_name="Adobe Inc",
+        vat_id="DE123456789",
+        commodity_group="Software",
+        order_lines=[
+            OrderLine(
+                position_description=f"Adobe Creative Cloud seat {i}",
+                unit_price=500.0,
+                amount=10,
+                unit="licenses",
+                total_price=5000.0,
+            )
+            for i in range(3)
+        ],
+        total_cost=15000.0,
+        department="Design",
+    )
+    return [ProcurementRequestStored(request) for _ in range(RECORDS)]
+
+
+def dict_path(requests: list[ProcurementRequestStored]) -> bytes:
+    content = jsonable_encoder([r.to_dict() for r in requests])
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+def cached_path(requests: list[ProcurementRequestStored]) -> bytes:
+    return b"[" + b",".join(r.to_json() for r in requests) + b"]"
+
+
+def main() -> None:
+    requests = make_requests()
+    assert json.loads(dict_path(requests)) == json.loads(cached_path(requests))
+
+    cold_requests = make_requests()
+    cold = timeit.timeit(lambda: cached_path(cold_requests), number=1)
+    timings = {
+        "dict + jsonable_encoder": min(
+            timeit.repeat(lambda: dict_path(requests), number=1, repeat=REPEAT)
+        ),
+        "to_json (cold cache)": cold,
+        "to_json (warm cache)": min(
+            timeit.repeat(lambda: cached_path(requests), number=1, repeat=REPEAT)
+        ),
+    }
+
+    baseline = timings["dict + jsonable_encoder"]
+    print(f"Serializing {RECORDS} stored requests")
+    for name, seconds in timings.items():
+        print(f"{name:>24}: {seconds * 1000:8.1f} ms  ({baseline / seconds:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
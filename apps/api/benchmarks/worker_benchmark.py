@@ -0,0 +1,107 @@
+"""Compare throughput and tail latency of direct and batched worker calls.
+
+Starts the fake worker from `procurement_api.fake_worker` on a free local
+port. The direct path sends one request per caller to `HttpWorker`, the
+batched path collects the prompts of concurrent callers with
+`BatchingWorker` first. Every request costs a fixed latency, so batching
+trades a few milliseconds of waiting for fewer round trips. Last, a single
+batch is completed whole and as a stream, where each prompt is answered as
+soon as it is finished.
+
+Run with `uv run python benchmarks/worker_benchmark.py`.
+"""
+
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+import uvicorn
+
+from procurement_api.batcher import BatchingWorker
+from procurement_api.fake_worker import build_fake_worker
+from procurement_api.http_worker import HttpWorker
+from procurement_api.worker import WorkerApi
+
+CALLERS = 64
+BATCH_SIZE = 256
+PROMPTS_PER_CALLER = 20
+LATENCY = 0.02
+LATENCY_PER_PROMPT = 0.0005
+JITTER = 0.01
+
+
+def start_fake_worker() -> str:
+    with socket.socket() as free:
+        free.bind(("127.0.0.1", 0))
+        port = free.getsockname()[1]
+    config = uvicorn.Config(
+        build_fake_worker(LATENCY, LATENCY_PER_PROMPT, JITTER),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+async def run_callers(worker: WorkerApi) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+
+    async def caller(number: int) -> None:
+        for index in range(PROMPTS_PER_CALLER):
+            started = time.perf_counter()
+            await worker.complete([f"Caller {number} prompt {index}"])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(number) for number in range(CALLERS)))
+    return time.perf_counter() - started, latencies
+
+
+async def benchmark(base_url: str) -> None:
+    http_worker = HttpWorker(base_url, model="fake", max_connections=CALLERS)
+    try:
+        # Open the connections before measuring
+        await run_callers(http_worker)
+        paths: dict[str, WorkerApi] = {
+            "direct": http_worker,
+            "batched": BatchingWorker(http_worker, max_wait=0.002),
+        }
+        prompts = CALLERS * PROMPTS_PER_CALLER
+        print(f"{CALLERS} callers, {prompts} prompts, {LATENCY * 1000:.0f} ms latency")
+        for name, worker in paths.items():
+            seconds, latencies = await run_callers(worker)
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(
+                f"{name:>8}: {prompts / seconds:8.0f} prompts/s"
+                f"  p50 {quantiles[49] * 1000:6.1f} ms"
+                f"  p99 {quantiles[98] * 1000:6.1f} ms"
+            )
+
+        batch = [f"Batch prompt {index}" for index in range(BATCH_SIZE)]
+        started = time.perf_counter()
+        await http_worker.complete(batch)
+        whole = [time.perf_counter() - started] * BATCH_SIZE
+        started = time.perf_counter()
+        streamed = [
+            time.perf_counter() - started
+            async for _ in http_worker.complete_stream(batch)
+        ]
+        print(f"Batch of {BATCH_SIZE} prompts, mean latency per prompt")
+        for name, latencies in {"whole": whole, "streamed": streamed}.items():
+            print(f"{name:>8}: {statistics.mean(latencies) * 1000:8.1f} ms")
+    finally:
+        await http_worker.aclose()
+
+
+def main() -> None:
+    asyncio.run(benchmark(start_fake_worker()))
+
+
+if __name__ == "__main__":
+    main()
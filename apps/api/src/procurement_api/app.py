@@ -1,9 +1,25 @@
 import asyncio
 
-from procurement_api.config import AppConfig
+from procurement_api.compact_repository import CompactInMemoryRepository
+from procurement_api.config import AppConfig, RepositoryBackend
 from procurement_api.intake import Intake
-from procurement_api.repository import InMemoryRepository
+from procurement_api.journal import JournaledRepository
+from procurement_api.repository import InMemoryRepository, Repository
 from procurement_api.shell import Shell
+from procurement_api.sqlite_repository import SqliteRepository
+
+
+def build_repository(config: AppConfig) -> Repository:
+    """Create the repository selected by the configuration."""
+    match config.repository_backend:
+        case RepositoryBackend.MEMORY:
+            return InMemoryRepository()
+        case RepositoryBackend.COMPACT:
+            return CompactInMemoryRepository()
+        case RepositoryBackend.SQLITE:
+            return SqliteRepository(config.sqlite_path)
+        case RepositoryBackend.JOURNAL:
+            return JournaledRepository(config.journal_dir)
 
 
 class App:
@@ -13,12 +29,17 @@ class App:
         self.config = config
 
     async def run(self) -> None:
-        async with asyncio.TaskGroup() as tg:
-            repository = InMemoryRepository()
-            self.intake = Intake(self.config.commodity_group_data_path, repository)
-            self.shell = Shell(self.config, self.intake)
+        repository = build_repository(self.config)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                self.intake = Intake(self.config.commodity_group_data_path, repository)
+                self.shell = Shell(self.config, self.intake)
 
-            tg.create_task(self.shell.run())
+                tg.create_task(self.shell.run())
+        finally:
+            # Only once the server stopped, so no request writes after it,
+            # e.g. the journal is flushed or the SQLite connections closed
+            repository.close()
 
     def shutdown(self) -> None:
         self.shell.shutdown()
@@ -0,0 +1,139 @@
+import asyncio
+from typing import Callable, NamedTuple
+
+from procurement_api.worker import CompletionResponse, WorkerApi
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Estimate the tokens of a prompt, about four characters each."""
+    return len(prompt) // 4 + 1
+
+
+class BatcherStats(NamedTuple):
+    """Counters of a batching worker since it was created."""
+
+    batches: int
+    prompts: int
+    tokens: int
+
+
+class _Pending(NamedTuple):
+    prompt: str
+    tokens: int
+    result: asyncio.Future[CompletionResponse]
+
+
+class BatchingWorker(WorkerApi):
+    """Collects prompts of concurrent callers into batches for a worker.
+
+    A batch is sent once it holds `max_batch_size` prompts or
+    `max_batch_tokens` estimated tokens, or `max_wait` seconds after its first
+    prompt arrived, whichever comes first. Each caller gets the completion of
+    its own prompt, or the exception of its batch. Callers of a batch that
+    is cancelled are cancelled as well.
+    """
+
+    def __init__(
+        self,
+        worker: WorkerApi,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        max_batch_tokens: int = 16_384,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ) -> None:
+        self.worker = worker
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_batch_tokens = max_batch_tokens
+        self.count_tokens = count_tokens
+        self._pending: list[_Pending] = []
+        self._pending_tokens = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._batches: set[asyncio.Task[None]] = set()
+        self._stats = BatcherStats(batches=0, prompts=0, tokens=0)
+
+    def stats(self) -> BatcherStats:
+        """Get the counters, `prompts / batches` is the batching factor."""
+        return self._stats
+
+    async def submit(self, prompt: str) -> CompletionResponse:
+        """
+        Complete a single prompt as part of the next batch.
+
+        Args:
+            prompt: The prompt to complete
+
+        Returns:
+            The completion of the prompt
+        """
+        tokens = self.count_tokens(prompt)
+        if self._pending and self._pending_tokens + tokens > self.max_batch_tokens:
+            self._flush()
+
+        result: asyncio.Future[CompletionResponse] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._pending.append(_Pending(prompt, tokens, result))
+        self._pending_tokens += tokens
+        if (
+            len(self._pending) >= self.max_batch_size
+            or self._pending_tokens >= self.max_batch_tokens
+        ):
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_wait, self._flush
+            )
+        return await result
+
+    async def complete(self, prompts: list[str]) -> list[CompletionResponse]:
+        """Complete prompts, batched together with those of other callers."""
+        return list(await asyncio.gather(*(self.submit(prompt) for prompt in prompts)))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Callers that went away do not need their prompt completed anymore
+        batch = [pending for pending in self._pending if not pending.result.done()]
+        self._pending = []
+        self._pending_tokens = 0
+        if not batch:
+            return
+
+        self._stats = BatcherStats(
+            batches=self._stats.batches + 1,
+            prompts=self._stats.prompts + len(batch),
+            tokens=self._stats.tokens + sum(pending.tokens for pending in batch),
+        )
+        task = asyncio.create_task(self._run(batch))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+        # The batch may be cancelled, even before it started, or raise a
+        # `BaseException`, the callers must not wait forever then
+        task.add_done_callback(lambda _: self._cancel_unanswered(batch))
+
+    async def _run(self, batch: list[_Pending]) -> None:
+        try:
+            responses = await self.worker.complete(
+                [pending.prompt for pending in batch]
+            )
+            if len(responses) != len(batch):
+                raise RuntimeError(
+                    f"Worker returned {len(responses)} completions "
+                    f"for {len(batch)} prompts."
+                )
+        except Exception as error:
+            for pending in batch:
+                if not pending.result.done():
+                    pending.result.set_exception(error)
+            return
+        for pending, response in zip(batch, responses):
+            if not pending.result.done():
+                pending.result.set_result(response)
+
+    @staticmethod
+    def _cancel_unanswered(batch: list[_Pending]) -> None:
+        for pending in batch:
+            if not pending.result.done():
+                pending.result.cancel()
@@ -0,0 +1,116 @@
+import sys
+from array import array
+from datetime import datetime
+
+from procurement_api.models.procurement import OrderLine, ProcurementRequestCreate
+from procurement_api.repository import (
+    BaseInMemoryRepository,
+    ProcurementRequestStatus,
+    ProcurementRequestStored,
+)
+
+
+class CompactRecord:
+    """Memory efficient form of a stored procurement request.
+
+    Strings that repeat across requests are interned, so all requests of a
+    vendor share one string object. The order lines are kept column-wise:
+    descriptions and units in tuples, prices and amounts in typed arrays.
+    """
+
+    __slots__ = (
+        "id",
+        "created_at",
+        "status",
+        "requestor_name",
+        "title",
+        "vendor_name",
+        "vat_id",
+        "commodity_group",
+        "total_cost",
+        "department",
+        "descriptions",
+        "units",
+        "prices",
+        "amounts",
+        "version",
+    )
+
+    def __init__(self, stored_request: ProcurementRequestStored) -> None:
+        request = stored_request.request
+        lines = request.order_lines
+        self.id: str = stored_request.id
+        self.created_at: datetime = stored_request.created_at
+        self.status: ProcurementRequestStatus = stored_request.status
+        self.version: int = stored_request.version
+        self.requestor_name: str = sys.intern(request.requestor_name)
+        self.title: str = request.title
+        self.vendor_name: str = sys.intern(request.vendor_name)
+        self.vat_id: str = sys.intern(request.vat_id)
+        self.commodity_group: str = sys.intern(request.commodity_group)
+        self.total_cost: float = request.total_cost
+        self.department: str = sys.intern(request.department)
+        self.descriptions: tuple[str, ...] = tuple(
+            line.position_description for line in lines
+        )
+        self.units: tuple[str, ...] = tuple(sys.intern(line.unit) for line in lines)
+        # Unit price and total price of every line, one after the other
+        self.prices = array(
+            "d",
+            [price for line in lines for price in (line.unit_price, line.total_price)],
+        )
+        self.amounts = array("q", [line.amount for line in lines])
+
+    def to_stored(self) -> ProcurementRequestStored:
+        """Build the stored request with its Pydantic models."""
+        prices = self.prices
+        order_lines = [
+            OrderLine.model_construct(
+                position_description=description,
+                unit_price=prices[2 * position],
+                amount=amount,
+                unit=unit,
+                total_price=prices[2 * position + 1],
+            )
+            for position, (description, unit, amount) in enumerate(
+                zip(self.descriptions, self.units, self.amounts)
+            )
+        ]
+        return ProcurementRequestStored(
+            ProcurementRequestCreate.model_construct(
+                requestor_name=self.requestor_name,
+                title=self.title,
+                vendor_name=self.vendor_name,
+                vat_id=self.vat_id,
+                commodity_group=self.commodity_group,
+                order_lines=order_lines,
+                total_cost=self.total_cost,
+                department=self.department,
+            ),
+            status=self.status,
+            request_id=self.id,
+            created_at=self.created_at,
+            version=self.version,
+        )
+
+
+class CompactInMemoryRepository(BaseInMemoryRepository[CompactRecord]):
+    """In-memory repository that keeps requests as `CompactRecord`s.
+
+    It needs a fraction of the memory of `InMemoryRepository`, but builds
+    fresh Pydantic models on every read, so their JSON encoding is not cached
+    between reads.
+    """
+
+    _index_fields = {
+        "status": lambda record: record.status,
+        "commodity_group": lambda record: record.commodity_group,
+        "vendor_name": lambda record: record.vendor_name,
+        "department": lambda record: record.department,
+    }
+
+    def _pack(self, stored_request: ProcurementRequestStored) -> CompactRecord:
+        return CompactRecord(stored_request)
+
+    def _unpack(self, record: CompactRecord) -> ProcurementRequestStored:
+        return record.to_stored()
@@ -2,17 +2,30 @@ from __future__ import annotations
 
 import json
 import os
+from enum import Enum
 from typing import NamedTuple
 
 from procurement_api.models.commodity_group import CommodityGroupInfo
 
 
+class RepositoryBackend(str, Enum):
+    """Where procurement requests are stored."""
+
+    MEMORY = "memory"
+    COMPACT = "compact"
+    SQLITE = "sqlite"
+    JOURNAL = "journal"
+
+
 class AppConfig(NamedTuple):
     """Configuration on how to run the app"""
 
     host: str
     port: int
     commodity_group_data_path: str
+    repository_backend: RepositoryBackend = RepositoryBackend.MEMORY
+    sqlite_path: str = "data/procurement.db"
+    journal_dir: str = "data/journal"
 
     @classmethod
     def from_env(cls) -> AppConfig:
@@ -21,6 +34,11 @@ class AppConfig(NamedTuple):
             host=os.environ["API_HOST"],
             port=int(os.environ["API_PORT"]),
             commodity_group_data_path=os.environ["COMMODITY_GROUPS_DATA_PATH"],
+            repository_backend=RepositoryBackend(
+                os.environ.get("REPOSITORY_BACKEND", RepositoryBackend.MEMORY.value)
+            ),
+            sqlite_path=os.environ.get("SQLITE_PATH", "data/procurement.db"),
+            journal_dir=os.environ.get("JOURNAL_DIR", "data/journal"),
         )
 
     @classmethod
@@ -0,0 +1,108 @@
+import csv
+import io
+import zlib
+from enum import Enum
+from itertools import islice
+from typing import Iterable, Iterator
+
+from procurement_api.repository import ProcurementRequestStored
+
+
+class ExportFormat(str, Enum):
+    """Formats procurement requests can be exported in."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+# One CSV row per order line, the request columns repeat on every line
+CSV_COLUMNS = [
+    "id",
+    "created_at",
+    "status",
+    "requestor_name",
+    "title",
+    "vendor_name",
+    "vat_id",
+    "commodity_group",
+    "total_cost",
+    "department",
+    "position",
+    "position_description",
+    "unit_price",
+    "amount",
+    "unit",
+    "total_price",
+]
+
+# Records are encoded in chunks to keep the number of writes low
+_CHUNK_SIZE = 500
+
+
+def _chunks(
+    requests: Iterable[ProcurementRequestStored],
+) -> Iterator[list[ProcurementRequestStored]]:
+    iterator = iter(requests)
+    while chunk := list(islice(iterator, _CHUNK_SIZE)):
+        yield chunk
+
+
+def iter_ndjson(requests: Iterable[ProcurementRequestStored]) -> Iterator[bytes]:
+    """Encode requests as newline delimited JSON, one chunk at a time."""
+    for chunk in _chunks(requests):
+        yield b"".join(stored.to_json() + b"\n" for stored in chunk)
+
+
+def iter_csv(requests: Iterable[ProcurementRequestStored]) -> Iterator[bytes]:
+    """Encode requests as CSV with one row per order line, a chunk at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for chunk in _chunks(requests):
+        for stored in chunk:
+            request = stored.request
+            header = [
+                stored.id,
+                stored.created_at.isoformat(),
+                stored.status.value,
+                request.requestor_name,
+                request.title,
+                request.vendor_name,
+                request.vat_id,
+                request.commodity_group,
+                request.total_cost,
+                request.department,
+            ]
+            writer.writerows(
+                [
+                    *header,
+                    position,
+                    line.position_description,
+                    line.unit_price,
+                    line.amount,
+                    line.unit,
+                    line.total_price,
+                ]
+                for position, line in enumerate(request.order_lines)
+            )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a stream of chunks into a single gzip stream."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,128 @@
+"""Stand-in for a local inference server, to benchmark workers offline.
+
+Serves the OpenAI compatible `/v1/completions` endpoint like vLLM and
+completes every prompt with the prompt itself, like `StubWorker`. A request
+takes `latency` seconds plus `latency_per_prompt` per prompt of its batch,
+plus up to `jitter` seconds, so batching amortizes the fixed part. Streamed
+requests send each completion once it is finished, a character per delta.
+
+Run with `uv run python -m procurement_api.fake_worker --latency-ms 50`.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+from typing import Any, AsyncIterator
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+
+class CompletionRequest(BaseModel):
+    model: str
+    prompt: str | list[str]
+    max_tokens: int = 16
+    stream: bool = False
+
+
+def _event(model: str, index: int, text: str, finish_reason: str | None) -> str:
+    chunk = {
+        "object": "text_completion",
+        "model": model,
+        "choices": [{"index": index, "text": text, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+def build_fake_worker(
+    latency: float = 0.05, latency_per_prompt: float = 0.002, jitter: float = 0.0
+) -> FastAPI:
+    """
+    Create the app of a fake worker.
+
+    Args:
+        latency: Seconds every request takes
+        latency_per_prompt: Seconds every prompt of a request adds
+        jitter: Most seconds added at random to every request
+
+    Returns:
+        The FastAPI app
+    """
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health() -> dict[str, str]:
+        return {"status": "ok"}
+
+    async def stream(model: str, prompts: list[str]) -> AsyncIterator[str]:
+        # Later prompts of the batch finish later, the last one after the
+        # time the whole batch takes without streaming
+        finish_times = [
+            latency + latency_per_prompt * (index + 1) + random.uniform(0, jitter)
+            for index in range(len(prompts))
+        ]
+        started = asyncio.get_running_loop().time()
+        for index in sorted(range(len(prompts)), key=finish_times.__getitem__):
+            # Sleep until the finish time, so the overshoot of each sleep
+            # does not add up over the batch
+            now = asyncio.get_running_loop().time()
+            await asyncio.sleep(max(0.0, started + finish_times[index] - now))
+            # One write per finished prompt, not per delta
+            yield "".join(
+                [_event(model, index, character, None) for character in prompts[index]]
+                + [_event(model, index, "", "stop")]
+            )
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/completions", response_model=None)
+    async def complete(
+        request: CompletionRequest,
+    ) -> dict[str, Any] | StreamingResponse:
+        prompts = (
+            [request.prompt] if isinstance(request.prompt, str) else request.prompt
+        )
+        if request.stream:
+            return StreamingResponse(
+                stream(request.model, prompts), media_type="text/event-stream"
+            )
+        await asyncio.sleep(
+            latency + latency_per_prompt * len(prompts) + random.uniform(0, jitter)
+        )
+        tokens = sum(len(prompt) for prompt in prompts)
+        return {
+            "object": "text_completion",
+            "model": request.model,
+            "choices": [
+                {"index": index, "text": prompt, "finish_reason": "stop"}
+                for index, prompt in enumerate(prompts)
+            ],
+            "usage": {
+                "prompt_tokens": tokens,
+                "completion_tokens": tokens,
+                "total_tokens": 2 * tokens,
+            },
+        }
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--per-prompt-ms", type=float, default=2.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app = build_fake_worker(
+        args.latency_ms / 1000, args.per_prompt_ms / 1000, args.jitter_ms / 1000
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import importlib.util
+import json
+from typing import Any, AsyncIterator
+
+import httpx
+
+from procurement_api.worker import CompletionResponse, WorkerApi
+
+DEFAULT_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+
+def http2_available() -> bool:
+    """Whether httpx can speak HTTP/2, which needs the optional `h2` package."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def split_tokens(total: int, completions: list[str]) -> list[int]:
+    """
+    Split the tokens of a batch over its completions by their length.
+
+    OpenAI compatible servers only report the usage of a whole request.
+
+    Args:
+        total: The completion tokens of the batch
+        completions: The completions of the batch
+
+    Returns:
+        The tokens of each completion, adding up to `total`
+    """
+    length = sum(len(completion) for completion in completions)
+    if length == 0:
+        return [total // len(completions)] * len(completions) if completions else []
+    tokens = [total * len(completion) // length for completion in completions]
+    # Give the rounding remainder to the longest completion
+    longest = max(range(len(completions)), key=lambda i: len(completions[i]))
+    tokens[longest] += total - sum(tokens)
+    return tokens
+
+
+class HttpWorker(WorkerApi):
+    """Worker behind an OpenAI compatible completions endpoint, e.g. vLLM.
+
+    A batch is sent as one request with a list of prompts. With
+    `complete_stream` the worker streams the completions back, so each one
+    is available as soon as it is finished. Requests share a
+    pool of keep-alive connections. With the `h2` package installed they are
+    multiplexed over HTTP/2, so concurrent batches are in flight on the same
+    connection instead of waiting for a free one.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        max_tokens: int = 256,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        max_connections: int = 16,
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
+        self.model = model
+        self.max_tokens = max_tokens
+        self._client = client or httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            http2=http2_available(),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    async def complete(self, prompts: list[str]) -> list[CompletionResponse]:
+        """
+        Complete a batch of prompts with a single request.
+
+        Args:
+            prompts: The prompts to complete
+
+        Returns:
+            The completions in the order of the prompts
+
+        Raises:
+            httpx.HTTPError: If the worker cannot be reached, times out or
+                answers with an error status
+        """
+        if not prompts:
+            return []
+        response = await self._client.post(
+            "/v1/completions",
+            json={
+                "model": self.model,
+                "prompt": prompts,
+                "max_tokens": self.max_tokens,
+            },
+        )
+        response.raise_for_status()
+        body: dict[str, Any] = response.json()
+
+        choices = sorted(body["choices"], key=lambda choice: choice["index"])
+        completions = [choice["text"] for choice in choices]
+        if len(completions) != len(prompts):
+            raise httpx.DecodingError(
+                f"Worker returned {len(completions)} completions "
+                f"for {len(prompts)} prompts.",
+                request=response.request,
+            )
+        tokens = split_tokens(body["usage"]["completion_tokens"], completions)
+        return [
+            CompletionResponse(completion=completion, tokens=count)
+            for completion, count in zip(completions, tokens)
+        ]
+
+    async def complete_stream(
+        self, prompts: list[str]
+    ) -> AsyncIterator[tuple[int, CompletionResponse]]:
+        """
+        Complete a batch of prompts and yield each completion once finished.
+
+        The worker streams the completions as server-sent events with a
+        delta of about one token each, so the deltas count as the tokens.
+
+        Args:
+            prompts: The prompts to complete
+
+        Yields:
+            The index of a prompt and its completion, in the order they finish
+
+        Raises:
+            httpx.HTTPError: If the worker cannot be reached, times out,
+                answers with an error status or ends the stream early
+        """
+        if not prompts:
+            return
+        deltas: dict[int, list[str]] = {}
+        finished = 0
+        async with self._client.stream(
+            "POST",
+            "/v1/completions",
+            json={
+                "model": self.model,
+                "prompt": prompts,
+                "max_tokens": self.max_tokens,
+                "stream": True,
+            },
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                data = line.removeprefix("data:").strip()
+                if not line.startswith("data:") or data == "[DONE]":
+                    continue
+                for choice in json.loads(data)["choices"]:
+                    index = choice["index"]
+                    if choice["text"]:
+                        deltas.setdefault(index, []).append(choice["text"])
+                    if choice.get("finish_reason") is not None:
+                        finished += 1
+                        text = deltas.pop(index, [])
+                        yield index, CompletionResponse("".join(text), len(text))
+            if finished != len(prompts):
+                raise httpx.DecodingError(
+                    f"Worker finished {finished} completions "
+                    f"for {len(prompts)} prompts.",
+                    request=response.request,
+                )
+
+    async def check_health(self) -> None:
+        """
+        Check that the worker is up with its health endpoint.
+
+        Raises:
+            httpx.HTTPError: If the worker cannot be reached, times out or
+                is not healthy
+        """
+        response = await self._client.get("/health")
+        response.raise_for_status()
+
+    async def aclose(self) -> None:
+        """Close the connections to the worker."""
+        await self._client.aclose()
@@ -1,12 +1,17 @@
 import json
-from typing import Protocol
+from itertools import islice
+from typing import Iterator, Protocol, Sequence
 
 from procurement_api.models.commodity_group import CommodityGroupInfo
 from procurement_api.models.procurement import ProcurementRequestCreate
 from procurement_api.repository import (
+    PageCursor,
     ProcurementRequestStatus,
     ProcurementRequestStored,
     Repository,
+    RequestFilter,
+    StatusUpdateSummary,
+    VersionConflictException,
 )
 
 
@@ -17,16 +22,60 @@ class IntakeApi(Protocol):
         self,
         request: ProcurementRequestCreate,
     ) -> dict[str, str]: ...
-    def get_all_requests(self) -> list[ProcurementRequestStored]: ...
+    def create_procurement_requests(
+        self, requests: Sequence[ProcurementRequestCreate]
+    ) -> list[ProcurementRequestStored | None]: ...
+    def get_all_requests(
+        self,
+        criteria: RequestFilter = RequestFilter(),
+        after: PageCursor | None = None,
+        limit: int | None = None,
+    ) -> list[ProcurementRequestStored]: ...
+    def iter_requests(
+        self, criteria: RequestFilter = RequestFilter()
+    ) -> Iterator[ProcurementRequestStored]: ...
     def get_request_by_id(self, request_id: str) -> ProcurementRequestStored | None: ...
     def update_request_status(
-        self, request_id: str, status: ProcurementRequestStatus
+        self,
+        request_id: str,
+        status: ProcurementRequestStatus,
+        expected_version: int | None = None,
     ) -> ProcurementRequestStored | None: ...
+    def update_request_statuses(
+        self,
+        status: ProcurementRequestStatus,
+        request_ids: Sequence[str] = (),
+        criteria: RequestFilter | None = None,
+    ) -> StatusUpdateSummary: ...
 
 
 class CommodityGroupNotFoundException(Exception): ...
 
 
+class InvalidStatusTransitionException(Exception): ...
+
+
+class TooManyRequestsSelectedException(Exception): ...
+
+
+# Requests only move forward: open -> in-progress -> closed
+STATUS_TRANSITIONS: dict[ProcurementRequestStatus, set[ProcurementRequestStatus]] = {
+    ProcurementRequestStatus.OPEN: {ProcurementRequestStatus.IN_PROGRESS},
+    ProcurementRequestStatus.IN_PROGRESS: {ProcurementRequestStatus.CLOSED},
+    ProcurementRequestStatus.CLOSED: set(),
+}
+
+# Most requests whose status is updated in one step, by IDs or by filter
+MAX_BULK_STATUS_IDS = 10_000
+
+# How often a status update is tried when concurrent updates get in the way
+STATUS_UPDATE_ATTEMPTS = 3
+
+
+# Number of requests fetched from the repository at once when iterating
+ITER_PAGE_SIZE = 1000
+
+
 class Intake(IntakeApi):
     """Manages intake operations including commodity group validation."""
 
@@ -61,23 +110,146 @@ class Intake(IntakeApi):
             "status": stored_request.status.value,
         }
 
+    def create_procurement_requests(
+        self, requests: Sequence[ProcurementRequestCreate]
+    ) -> list[ProcurementRequestStored | None]:
+        """
+        Store a batch of procurement requests.
+
+        Args:
+            requests: The procurement requests to store
+
+        Returns:
+            The stored request for each input, or `None` where the commodity
+            group is unknown and the request was not stored
+        """
+        unknown = {r.commodity_group for r in requests} - self._valid_names
+        valid = [r for r in requests if r.commodity_group not in unknown]
+        stored = iter(self.repository.store_many(valid))
+        return [
+            None if r.commodity_group in unknown else next(stored) for r in requests
+        ]
+
     def is_valid_commodity_group(self, name: str) -> bool:
         """Check if a commodity group name is valid."""
         return name in self._valid_names
 
-    def get_all_requests(self) -> list[ProcurementRequestStored]:
-        """Get all stored procurement requests."""
-        return self.repository.get_all()
+    def get_all_requests(
+        self,
+        criteria: RequestFilter = RequestFilter(),
+        after: PageCursor | None = None,
+        limit: int | None = None,
+    ) -> list[ProcurementRequestStored]:
+        """Get a page of stored procurement requests matching the criteria."""
+        return self.repository.find(criteria, after=after, limit=limit)
+
+    def iter_requests(
+        self, criteria: RequestFilter = RequestFilter()
+    ) -> Iterator[ProcurementRequestStored]:
+        """Iterate over all requests matching the criteria, one page at a time."""
+        after = None
+        while page := self.repository.find(criteria, after=after, limit=ITER_PAGE_SIZE):
+            yield from page
+            after = PageCursor(created_at=page[-1].created_at, id=page[-1].id)
 
     def get_request_by_id(self, request_id: str) -> ProcurementRequestStored | None:
         """Get a procurement request by ID."""
         return self.repository.get_by_id(request_id)
 
     def update_request_status(
-        self, request_id: str, status: ProcurementRequestStatus
+        self,
+        request_id: str,
+        status: ProcurementRequestStatus,
+        expected_version: int | None = None,
     ) -> ProcurementRequestStored | None:
-        """Update the status of a procurement request."""
-        stored_request = self.repository.get_by_id(request_id)
-        if stored_request:
-            stored_request.status = status
-        return stored_request
+        """
+        Move a procurement request to a new status.
+
+        The transition is checked against the current status and written with
+        a compare-and-set on the version, so concurrent updates never
+        overwrite each other. Without an expected version, a lost race is
+        retried against the new state of the request. A request that already
+        has the status is returned as it is.
+
+        Args:
+            request_id: The ID of the request to update
+            status: The new status
+            expected_version: Only update if the request is at this version
+
+        Returns:
+            The updated request, or `None` if there is no request with the ID
+
+        Raises:
+            VersionConflictException: If the request is not at the expected
+                version, or keeps changing while it is updated
+            InvalidStatusTransitionException: If the request cannot move from
+                its current status to the new one
+        """
+        attempt = 1
+        while True:
+            current = self.repository.get_by_id(request_id)
+            if current is None:
+                return None
+            if expected_version is not None and current.version != expected_version:
+                raise VersionConflictException(
+                    request_id, expected_version, current.version
+                )
+            if status == current.status:
+                # Nothing to change, e.g. a client that repeats its update
+                return current
+            if status not in STATUS_TRANSITIONS[current.status]:
+                raise InvalidStatusTransitionException(
+                    f"Cannot change status from '{current.status.value}' "
+                    f"to '{status.value}'."
+                )
+
+            try:
+                return self.repository.update_status(
+                    request_id, status, expected_version=current.version
+                )
+            except VersionConflictException:
+                if expected_version is not None or attempt >= STATUS_UPDATE_ATTEMPTS:
+                    raise
+                attempt += 1
+
+    def update_request_statuses(
+        self,
+        status: ProcurementRequestStatus,
+        request_ids: Sequence[str] = (),
+        criteria: RequestFilter | None = None,
+    ) -> StatusUpdateSummary:
+        """
+        Move several procurement requests to a new status in one step.
+
+        Requests that already have the status are left as they are, like a
+        single update to the current status.
+
+        Args:
+            status: The new status
+            request_ids: The IDs of the requests to update
+            criteria: Also update all requests matching this filter
+
+        Returns:
+            Which requests were updated, missing, not allowed to change or
+            unchanged
+
+        Raises:
+            TooManyRequestsSelectedException: If more than
+                `MAX_BULK_STATUS_IDS` requests are selected, none is updated
+        """
+        if criteria is not None:
+            matching = self.iter_requests(criteria)
+            request_ids = [
+                *request_ids,
+                *(stored.id for stored in islice(matching, MAX_BULK_STATUS_IDS + 1)),
+            ]
+        if len(request_ids) > MAX_BULK_STATUS_IDS:
+            raise TooManyRequestsSelectedException(
+                f"Select at most {MAX_BULK_STATUS_IDS} requests at once."
+            )
+        allowed_from = {
+            current
+            for current, targets in STATUS_TRANSITIONS.items()
+            if status in targets
+        }
+        return self.repository.update_status_many(request_ids, status, allowed_from)
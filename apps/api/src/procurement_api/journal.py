@@ -0,0 +1,411 @@
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Collection, Iterator, NamedTuple, Sequence
+
+from procurement_api.models.procurement import ProcurementRequestCreate
+from procurement_api.repository import (
+    InMemoryRepository,
+    ProcurementRequestStatus,
+    ProcurementRequestStored,
+    StatusUpdateSummary,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(record: dict[str, Any]) -> bytes:
+    return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+
+def _fsync_directory(path: Path) -> None:
+    """Make renames and newly created files in a directory durable."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class JournalStats(NamedTuple):
+    """Counters of a journal since it was opened."""
+
+    records: int
+    fsyncs: int
+    bytes_written: int
+
+
+class Journal:
+    """Append-only JSONL log with group commit.
+
+    Records are buffered in memory and written by a background thread. All
+    records that arrive while an `fsync` is in progress are written together
+    with the next one, so concurrent writers share the cost of a single `fsync`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file = open(path, "ab")
+        self._condition = threading.Condition()
+        self._pending: list[bytes] = []
+        self._enqueued = 0
+        self._durable = 0
+        self._error: OSError | None = None
+        self._closed = False
+        self._stats = JournalStats(records=0, fsyncs=0, bytes_written=0)
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="journal-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def enqueue(self, record: dict[str, Any]) -> int:
+        """
+        Queue a record for writing without waiting for it.
+
+        Args:
+            record: The JSON serializable record to append
+
+        Returns:
+            The sequence number to pass to `wait_durable`
+        """
+        line = _encode(record)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Journal is closed")
+            self._pending.append(line)
+            self._enqueued += 1
+            self._condition.notify_all()
+            return self._enqueued
+
+    def wait_durable(self, sequence: int) -> None:
+        """Block until the record with the given sequence number is on disk."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._durable >= sequence or self._error is not None
+            )
+            if self._durable < sequence:
+                raise RuntimeError("Writing the journal failed") from self._error
+
+    def rotate(self, archive: Path) -> None:
+        """Move the durable log to `archive` and continue with an empty log."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._durable >= self._enqueued or self._error is not None
+            )
+            self._file.close()
+            os.replace(self.path, archive)
+            self._file = open(self.path, "ab")
+            _fsync_directory(self.path.parent)
+
+    def stats(self) -> JournalStats:
+        """Get the journal counters, `records / fsyncs` is the batching factor."""
+        with self._condition:
+            return self._stats
+
+    def close(self) -> None:
+        """Write all pending records and close the log."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._flusher.join()
+        self._file.close()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                sequence = self._enqueued
+                file = self._file
+
+            data = b"".join(batch)
+            try:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            except OSError as error:
+                with self._condition:
+                    self._error = error
+                    self._condition.notify_all()
+                return
+
+            with self._condition:
+                self._durable = sequence
+                self._stats = JournalStats(
+                    records=self._stats.records + len(batch),
+                    fsyncs=self._stats.fsyncs + 1,
+                    bytes_written=self._stats.bytes_written + len(data),
+                )
+                self._condition.notify_all()
+
+
+class RecoveryReport(NamedTuple):
+    """What it took to restore the repository at startup."""
+
+    requests: int
+    snapshot_records: int
+    journal_records: int
+    bytes_replayed: int
+    live_bytes: int
+    duration_seconds: float
+
+    @property
+    def write_amplification(self) -> float:
+        """Bytes kept on disk per byte of live data."""
+        return self.bytes_replayed / self.live_bytes if self.live_bytes else 1.0
+
+
+def _read_snapshot(path: Path) -> Iterator[bytes]:
+    """Read the lines of a snapshot through a memory map."""
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter(mapped.readline, b"")
+
+
+def _read_journal(path: Path) -> Iterator[bytes]:
+    """Read the lines of a journal, cutting off a torn last record."""
+    if not path.exists():
+        return
+    with open(path, "r+b") as f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                f.truncate(offset)
+                logger.warning("Truncated torn record at %s:%d", path, offset)
+                return
+            offset += len(line)
+            yield line
+
+
+class JournaledRepository(InMemoryRepository):
+    """In-memory repository that survives restarts.
+
+    Every change is appended to a journal before it is acknowledged. After
+    `snapshot_every` changes, the full state is compacted into a snapshot in
+    the background and the journal starts over. At startup the snapshot is
+    read through a memory map and the journal is replayed on top of it.
+    """
+
+    def __init__(self, directory: str, snapshot_every: int = 10_000) -> None:
+        super().__init__()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.snapshot_every = snapshot_every
+        self._snapshot_path = self.directory / "snapshot.jsonl"
+        self._journal_path = self.directory / "journal.jsonl"
+        self._archive_path = self.directory / "journal.jsonl.old"
+
+        # Changes are applied and queued for the journal in the same order
+        self._write_lock = threading.Lock()
+        self._snapshot_thread: threading.Thread | None = None
+
+        self.recovery = self._recover()
+        logger.info(
+            "Recovered %d procurement requests in %.3fs from %d snapshot and %d "
+            "journal records (%d bytes, write amplification %.2f)",
+            self.recovery.requests,
+            self.recovery.duration_seconds,
+            self.recovery.snapshot_records,
+            self.recovery.journal_records,
+            self.recovery.bytes_replayed,
+            self.recovery.write_amplification,
+        )
+        self._changes_since_snapshot = self.recovery.journal_records
+        if self._archive_path.exists():
+            # Fold the leftovers of an unfinished snapshot into a new one
+            self._write_snapshot(self.get_all())
+            self._journal_path.unlink(missing_ok=True)
+            self._changes_since_snapshot = 0
+        self._journal = Journal(self._journal_path)
+
+    def store_procurement_request(
+        self, request: ProcurementRequestCreate
+    ) -> ProcurementRequestStored:
+        """Store a procurement request and wait until it is journaled."""
+        with self._write_lock:
+            stored_request = super().store_procurement_request(request)
+            sequence = self._journal.enqueue(
+                {"op": "store", **stored_request.to_dict()}
+            )
+            self._maybe_snapshot()
+        self._journal.wait_durable(sequence)
+        return stored_request
+
+    def store_many(
+        self, requests: Sequence[ProcurementRequestCreate]
+    ) -> list[ProcurementRequestStored]:
+        """Store a batch of procurement requests and wait until it is journaled."""
+        sequence = 0
+        with self._write_lock:
+            stored_requests = super().store_many(requests)
+            for stored_request in stored_requests:
+                sequence = self._journal.enqueue(
+                    {"op": "store", **stored_request.to_dict()}
+                )
+            self._maybe_snapshot(changes=len(stored_requests))
+        self._journal.wait_durable(sequence)
+        return stored_requests
+
+    def update_status(
+        self,
+        request_id: str,
+        status: ProcurementRequestStatus,
+        expected_version: int | None = None,
+    ) -> ProcurementRequestStored | None:
+        """Update the status of a request and wait until it is journaled."""
+        with self._write_lock:
+            stored_request = super().update_status(request_id, status, expected_version)
+            if stored_request is None:
+                return None
+            sequence = self._journal.enqueue(
+                {
+                    "op": "status",
+                    "id": request_id,
+                    "status": status.value,
+                    "version": stored_request.version,
+                }
+            )
+            self._maybe_snapshot()
+        self._journal.wait_durable(sequence)
+        return stored_request
+
+    def update_status_many(
+        self,
+        request_ids: Sequence[str],
+        status: ProcurementRequestStatus,
+        allowed_from: Collection[ProcurementRequestStatus],
+    ) -> StatusUpdateSummary:
+        """Update the status of several requests and wait until it is journaled."""
+        sequence = 0
+        with self._write_lock:
+            summary = super().update_status_many(request_ids, status, allowed_from)
+            for request_id in summary.updated:
+                sequence = self._journal.enqueue(
+                    {
+                        "op": "status",
+                        "id": request_id,
+                        "status": status.value,
+                        "version": self._storage[request_id].version,
+                    }
+                )
+            self._maybe_snapshot(changes=len(summary.updated))
+        self._journal.wait_durable(sequence)
+        return summary
+
+    def clear(self) -> None:
+        """Clear all stored requests (useful for testing)."""
+        with self._write_lock:
+            super().clear()
+            sequence = self._journal.enqueue({"op": "clear"})
+        self._journal.wait_durable(sequence)
+
+    def journal_stats(self) -> JournalStats:
+        """Get the counters of the current journal."""
+        return self._journal.stats()
+
+    def close(self) -> None:
+        """Finish a running snapshot and close the journal."""
+        with self._write_lock:
+            if self._snapshot_thread is not None:
+                self._snapshot_thread.join()
+            self._journal.close()
+
+    def _maybe_snapshot(self, changes: int = 1) -> None:
+        self._changes_since_snapshot += changes
+        if self._changes_since_snapshot < self.snapshot_every:
+            return
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            return
+
+        # Changes after the rotation land in the new journal, which is
+        # replayed on top of the snapshot, so the snapshot may be written
+        # while the repository keeps changing.
+        self._changes_since_snapshot = 0
+        self._journal.rotate(self._archive_path)
+        records = self.get_all()
+        self._snapshot_thread = threading.Thread(
+            target=self._write_snapshot, args=(records,), name="snapshot-writer"
+        )
+        self._snapshot_thread.start()
+
+    def _write_snapshot(self, records: list[ProcurementRequestStored]) -> None:
+        started = time.perf_counter()
+        temporary = self._snapshot_path.with_suffix(".tmp")
+        with open(temporary, "wb") as f:
+            for stored_request in records:
+                f.write(_encode({"op": "store", **stored_request.to_dict()}))
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(temporary, self._snapshot_path)
+        self._archive_path.unlink(missing_ok=True)
+        _fsync_directory(self.directory)
+        logger.info(
+            "Wrote snapshot of %d procurement requests (%d bytes) in %.3fs",
+            len(records),
+            size,
+            time.perf_counter() - started,
+        )
+
+    def _recover(self) -> RecoveryReport:
+        started = time.perf_counter()
+        records: dict[str, dict[str, Any]] = {}
+        sizes: dict[str, int] = {}
+        bytes_replayed = 0
+
+        def apply(line: bytes) -> None:
+            nonlocal bytes_replayed
+            bytes_replayed += len(line)
+            record = json.loads(line)
+            match record.pop("op"):
+                case "store":
+                    records[record["id"]] = record
+                    sizes[record["id"]] = len(line)
+                case "status":
+                    stored = records[record["id"]]
+                    stored["status"] = record["status"]
+                    stored["version"] = record.get("version", 1)
+                case "clear":
+                    records.clear()
+                    sizes.clear()
+
+        snapshot_records = 0
+        for line in _read_snapshot(self._snapshot_path):
+            apply(line)
+            snapshot_records += 1
+
+        # An archived journal is left behind if a snapshot did not finish
+        journal_records = 0
+        for path in (self._archive_path, self._journal_path):
+            for line in _read_journal(path):
+                apply(line)
+                journal_records += 1
+
+        self._insert(
+            ProcurementRequestStored(
+                ProcurementRequestCreate.model_validate(record["request"]),
+                status=ProcurementRequestStatus(record["status"]),
+                request_id=record["id"],
+                created_at=datetime.fromisoformat(record["created_at"]),
+                version=record.get("version", 1),
+            )
+            for record in records.values()
+        )
+
+        return RecoveryReport(
+            requests=len(records),
+            snapshot_records=snapshot_records,
+            journal_records=journal_records,
+            bytes_replayed=bytes_replayed,
+            live_bytes=sum(sizes.values()),
+            duration_seconds=time.perf_counter() - started,
+        )
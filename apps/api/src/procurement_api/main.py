@@ -1,4 +1,5 @@
 import asyncio
+import logging
 
 from dotenv import load_dotenv
 
@@ -7,6 +8,7 @@ from procurement_api.config import AppConfig
 
 if __name__ == "__main__":
     load_dotenv()
+    logging.basicConfig(level=logging.INFO)
     config = AppConfig.from_env()
     app = App(config)
 
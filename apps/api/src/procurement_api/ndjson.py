@@ -0,0 +1,55 @@
+import json
+from typing import Any, AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MAX_LINE_LENGTH = 1 << 20
+
+
+class LineTooLongError(ValueError):
+    """A line of a newline delimited stream exceeds the length limit."""
+
+
+def encode_line(record: dict[str, Any]) -> bytes:
+    """Encode a record as one line of newline delimited JSON."""
+    return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_length: int = MAX_LINE_LENGTH
+) -> AsyncIterator[bytes]:
+    """Split a stream of byte chunks into lines without the line breaks.
+
+    Only the current incomplete line is buffered, up to `max_length` bytes.
+
+    Raises:
+        LineTooLongError: If a line is longer than `max_length` bytes
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if len(line) > max_length:
+                raise LineTooLongError(f"Line exceeds {max_length} bytes.")
+            yield line
+        if len(buffer) > max_length:
+            raise LineTooLongError(f"Line exceeds {max_length} bytes.")
+    if buffer:
+        yield buffer
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Streaming response whose body is produced while the request is read.
+
+    `StreamingResponse` listens for a client disconnect on the request channel
+    while it streams, which would swallow the request body chunks the content
+    iterator is still reading. A lost client surfaces as a send error instead.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from typing import Callable, NamedTuple
+
+from procurement_api.batcher import estimate_tokens
+from procurement_api.worker import CompletionResponse, WorkerApi
+
+
+class PromptCacheStats(NamedTuple):
+    """Counters of a caching worker since it was created.
+
+    A hit is a prompt answered without the worker, from the cache or as a
+    repeat within its batch. `tokens_saved` are the tokens of those answers.
+    `tokens` are what the entries are charged, prompt and completion.
+    """
+
+    hits: int
+    misses: int
+    tokens_saved: int
+    entries: int
+    tokens: int
+
+
+class CachingWorker(WorkerApi):
+    """Remembers the completions of a worker for prompts that repeat.
+
+    Identical prompts of a batch are sent to the worker once. Completions
+    are kept in least recently used order, up to `max_tokens` tokens. Each
+    entry is charged the tokens of its prompt, the key it is kept under, and
+    of its completion, at least one, so entries with empty completions are
+    evicted too. Only use it for workers that complete deterministically,
+    e.g. with temperature 0.
+    """
+
+    def __init__(
+        self,
+        worker: WorkerApi,
+        max_tokens: int = 1_000_000,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ) -> None:
+        self.worker = worker
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+        # The completion of each prompt with the tokens it is charged
+        self._cache: OrderedDict[str, tuple[CompletionResponse, int]] = OrderedDict()
+        self._tokens = 0
+        self._stats = PromptCacheStats(
+            hits=0, misses=0, tokens_saved=0, entries=0, tokens=0
+        )
+
+    def stats(self) -> PromptCacheStats:
+        """Get the counters, `hits / (hits + misses)` is the hit rate."""
+        return self._stats._replace(entries=len(self._cache), tokens=self._tokens)
+
+    async def complete(self, prompts: list[str]) -> list[CompletionResponse]:
+        """
+        Complete prompts, sending only those not seen before to the worker.
+
+        Args:
+            prompts: The prompts to complete
+
+        Returns:
+            The completions in the order of the prompts
+        """
+        known: dict[str, CompletionResponse] = {}
+        for prompt in prompts:
+            if prompt not in known and prompt in self._cache:
+                self._cache.move_to_end(prompt)
+                known[prompt] = self._cache[prompt][0]
+        # dict keys keep the order of the prompts and drop repeats
+        missing = list(
+            dict.fromkeys(prompt for prompt in prompts if prompt not in known)
+        )
+
+        if missing:
+            responses = await self.worker.complete(missing)
+            if len(responses) != len(missing):
+                raise RuntimeError(
+                    f"Worker returned {len(responses)} completions "
+                    f"for {len(missing)} prompts."
+                )
+            for prompt, response in zip(missing, responses):
+                known[prompt] = response
+                self._store(prompt, response)
+
+        completions = [known[prompt] for prompt in prompts]
+        hits = len(prompts) - len(missing)
+        self._stats = self._stats._replace(
+            hits=self._stats.hits + hits,
+            misses=self._stats.misses + len(missing),
+            tokens_saved=self._stats.tokens_saved
+            + sum(response.tokens for response in completions)
+            - sum(known[prompt].tokens for prompt in missing),
+        )
+        return completions
+
+    def _store(self, prompt: str, response: CompletionResponse) -> None:
+        cost = max(1, self.count_tokens(prompt) + response.tokens)
+        if cost > self.max_tokens:
+            return
+        if prompt in self._cache:
+            self._tokens -= self._cache.pop(prompt)[1]
+        self._cache[prompt] = (response, cost)
+        self._tokens += cost
+        while self._tokens > self.max_tokens:
+            _, (_, evicted_cost) = self._cache.popitem(last=False)
+            self._tokens -= evicted_cost
@@ -1,6 +1,19 @@
+import json
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
 from datetime import UTC, datetime
 from enum import Enum
-from typing import Protocol
+from typing import (
+    Callable,
+    Collection,
+    Generic,
+    Iterable,
+    NamedTuple,
+    Protocol,
+    Sequence,
+    TypeVar,
+)
 from uuid import uuid4
 
 from procurement_api.models.procurement import ProcurementRequestCreate
@@ -21,11 +34,16 @@ class ProcurementRequestStored:
         self,
         request: ProcurementRequestCreate,
         status: ProcurementRequestStatus = ProcurementRequestStatus.OPEN,
+        request_id: str | None = None,
+        created_at: datetime | None = None,
+        version: int = 1,
     ):
-        self.id: str = str(uuid4())
-        self.created_at: datetime = datetime.now(UTC)
+        self.id: str = request_id or str(uuid4())
+        self.created_at: datetime = created_at or datetime.now(UTC)
         self.request: ProcurementRequestCreate = request
         self.status: ProcurementRequestStatus = status
+        self.version: int = version
+        self._json: tuple[int, bytes] | None = None
 
     def to_dict(self) -> dict:
         """Convert to dictionary representation."""
@@ -33,9 +51,84 @@ class ProcurementRequestStored:
             "id": self.id,
             "created_at": self.created_at.isoformat(),
             "status": self.status.value,
+            "version": self.version,
             "request": self.request.model_dump(),
         }
 
+    def to_json(self) -> bytes:
+        """
+        Encode the `to_dict` representation as JSON.
+
+        The encoding is cached together with the version it was made for, so a
+        status change invalidates it.
+        """
+        # Updates assign the status before the version, so reading them in the
+        # opposite order never pairs a new version with an old status
+        version = self.version
+        status = self.status
+        cached = self._json
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        head = json.dumps(
+            {
+                "id": self.id,
+                "created_at": self.created_at.isoformat(),
+                "status": status.value,
+                "version": version,
+            },
+            separators=(",", ":"),
+        )
+        encoded = f'{head[:-1]},"request":{self.request.model_dump_json()}}}'.encode()
+        self._json = (version, encoded)
+        return encoded
+
+
+class VersionConflictException(Exception):
+    """The stored request changed since the version the caller expected."""
+
+    def __init__(self, request_id: str, expected: int, actual: int) -> None:
+        super().__init__(
+            f"Procurement request '{request_id}' is at version {actual}, "
+            f"expected {expected}"
+        )
+        self.request_id = request_id
+        self.expected = expected
+        self.actual = actual
+
+
+class RequestFilter(NamedTuple):
+    """Criteria for selecting stored procurement requests.
+
+    Every criterion left as `None` matches all requests. The creation date
+    range includes `created_from` and excludes `created_to`.
+    """
+
+    status: ProcurementRequestStatus | None = None
+    commodity_group: str | None = None
+    vendor_name: str | None = None
+    department: str | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+
+
+class PageCursor(NamedTuple):
+    """Position of the last request of a page in `(created_at, id)` order."""
+
+    created_at: datetime
+    id: str
+
+
+class StatusUpdateSummary(NamedTuple):
+    """Outcome of changing the status of several requests at once."""
+
+    updated: list[str]
+    not_found: list[str]
+    # The current status of every request that was not allowed to change
+    rejected: dict[str, ProcurementRequestStatus]
+    # Requests that already had the status, they are left as they are
+    unchanged: list[str]
+
 
 class Repository(Protocol):
     """Protocol for procurement request repository operations."""
@@ -44,16 +137,86 @@ class Repository(Protocol):
         self, request: ProcurementRequestCreate
     ) -> ProcurementRequestStored: ...
 
+    def store_many(
+        self, requests: Sequence[ProcurementRequestCreate]
+    ) -> list[ProcurementRequestStored]: ...
+
     def get_all(self) -> list[ProcurementRequestStored]: ...
     def get_by_id(self, request_id: str) -> ProcurementRequestStored | None: ...
+    def find(
+        self,
+        criteria: RequestFilter,
+        after: PageCursor | None = None,
+        limit: int | None = None,
+    ) -> list[ProcurementRequestStored]: ...
+    def update_status(
+        self,
+        request_id: str,
+        status: ProcurementRequestStatus,
+        expected_version: int | None = None,
+    ) -> ProcurementRequestStored | None: ...
+    def update_status_many(
+        self,
+        request_ids: Sequence[str],
+        status: ProcurementRequestStatus,
+        allowed_from: Collection[ProcurementRequestStatus],
+    ) -> StatusUpdateSummary: ...
     def clear(self) -> None: ...
+    def close(self) -> None: ...
+
+
+# Requests are kept in creation order inside every index bucket.
+_SortKey = tuple[datetime, str]
+
+
+class StoredRecord(Protocol):
+    """What the in-memory repositories need from the records they keep."""
+
+    id: str
+    created_at: datetime
+    status: ProcurementRequestStatus
+    version: int
+
+
+RecordT = TypeVar("RecordT", bound=StoredRecord)
+
 
+def _sort_key(record: StoredRecord) -> _SortKey:
+    return (record.created_at, record.id)
 
-class InMemoryRepository(Repository):
-    """In-memory implementation of the procurement request repository."""
+
+class BaseInMemoryRepository(Repository, ABC, Generic[RecordT]):
+    """In-memory implementation of the procurement request repository.
+
+    Besides the primary storage by ID, the repository maintains a secondary
+    index for every indexed field in `RequestFilter`, so filtered lookups only
+    touch the requests in the smallest matching index bucket. All index buckets
+    are sorted by `(created_at, id)`, which makes date ranges and cursors a
+    binary search.
+
+    Subclasses decide how a request is represented in memory by implementing
+    `_pack`, `_unpack` and `_index_fields`.
+
+    The repository is safe to use from several threads.
+    """
+
+    _index_fields: dict[str, Callable[[RecordT], str]]
 
     def __init__(self) -> None:
-        self._storage: dict[str, ProcurementRequestStored] = {}
+        self._lock = threading.Lock()
+        self._storage: dict[str, RecordT] = {}
+        self._ordered: list[_SortKey] = []
+        self._indexes: dict[str, dict[str, list[_SortKey]]] = {
+            field: {} for field in self._index_fields
+        }
+
+    @abstractmethod
+    def _pack(self, stored_request: ProcurementRequestStored) -> RecordT:
+        """Convert a stored request into the record kept in memory."""
+
+    @abstractmethod
+    def _unpack(self, record: RecordT) -> ProcurementRequestStored:
+        """Convert a record kept in memory into a stored request."""
 
     def store_procurement_request(
         self, request: ProcurementRequestCreate
@@ -68,17 +231,207 @@ class InMemoryRepository(Repository):
             The stored procurement request with ID and timestamp
         """
         stored_request = ProcurementRequestStored(request)
-        self._storage[stored_request.id] = stored_request
+        self._insert([stored_request])
         return stored_request
 
+    def store_many(
+        self, requests: Sequence[ProcurementRequestCreate]
+    ) -> list[ProcurementRequestStored]:
+        """Store a batch of procurement requests at once."""
+        stored_requests = [ProcurementRequestStored(request) for request in requests]
+        self._insert(stored_requests)
+        return stored_requests
+
     def get_all(self) -> list[ProcurementRequestStored]:
         """Get all stored procurement requests."""
-        return list(self._storage.values())
+        with self._lock:
+            records = list(self._storage.values())
+        return [self._unpack(record) for record in records]
 
     def get_by_id(self, request_id: str) -> ProcurementRequestStored | None:
         """Get a procurement request by ID."""
-        return self._storage.get(request_id)
+        record = self._storage.get(request_id)
+        return None if record is None else self._unpack(record)
+
+    def find(
+        self,
+        criteria: RequestFilter,
+        after: PageCursor | None = None,
+        limit: int | None = None,
+    ) -> list[ProcurementRequestStored]:
+        """
+        Get stored procurement requests matching the given criteria.
+
+        Args:
+            criteria: The filter to apply, `None` criteria match everything
+            after: Only return requests ordered after this cursor
+            limit: Maximum number of requests to return
+
+        Returns:
+            The matching requests in `(created_at, id)` order
+        """
+        wanted = {
+            field: value
+            for field, value in criteria._asdict().items()
+            if field in self._index_fields and value is not None
+        }
+
+        with self._lock:
+            # Scan the smallest bucket and check the remaining criteria per request
+            candidates = min(
+                (
+                    self._indexes[field].get(value, [])
+                    for field, value in wanted.items()
+                ),
+                key=len,
+                default=self._ordered,
+            )
+            start = 0
+            if after is not None:
+                start = bisect_right(candidates, (after.created_at, after.id))
+            if criteria.created_from is not None:
+                # The empty ID sorts before every request created at that instant
+                lower = (criteria.created_from, "")
+                start = max(start, bisect_left(candidates, lower))
+
+            matches: list[RecordT] = []
+            for position in range(start, len(candidates)):
+                created_at, request_id = candidates[position]
+                if limit is not None and len(matches) >= limit:
+                    break
+                if (
+                    criteria.created_to is not None
+                    and created_at >= criteria.created_to
+                ):
+                    break
+                record = self._storage[request_id]
+                if all(
+                    self._index_fields[field](record) == value
+                    for field, value in wanted.items()
+                ):
+                    matches.append(record)
+        return [self._unpack(record) for record in matches]
+
+    def update_status(
+        self,
+        request_id: str,
+        status: ProcurementRequestStatus,
+        expected_version: int | None = None,
+    ) -> ProcurementRequestStored | None:
+        """
+        Update the status of a stored request and keep the index in sync.
+
+        Args:
+            request_id: The ID of the request to update
+            status: The new status
+            expected_version: Only update if the request is at this version
+
+        Returns:
+            The updated request, or `None` if there is no request with the ID
+
+        Raises:
+            VersionConflictException: If the request is at another version
+        """
+        with self._lock:
+            record = self._storage.get(request_id)
+            if record is None:
+                return None
+            if expected_version is not None and record.version != expected_version:
+                raise VersionConflictException(
+                    request_id, expected_version, record.version
+                )
+
+            self._remove_from_index("status", record)
+            record.status = status
+            record.version += 1
+            self._add_to_index("status", record)
+        return self._unpack(record)
+
+    def update_status_many(
+        self,
+        request_ids: Sequence[str],
+        status: ProcurementRequestStatus,
+        allowed_from: Collection[ProcurementRequestStatus],
+    ) -> StatusUpdateSummary:
+        """
+        Update the status of several requests in one step.
+
+        Args:
+            request_ids: The IDs of the requests to update
+            status: The new status
+            allowed_from: Only requests currently in one of these are updated
+
+        Returns:
+            Which requests were updated, missing, not allowed to change or
+            unchanged
+        """
+        summary = StatusUpdateSummary(
+            updated=[], not_found=[], rejected={}, unchanged=[]
+        )
+        with self._lock:
+            for request_id in dict.fromkeys(request_ids):
+                record = self._storage.get(request_id)
+                if record is None:
+                    summary.not_found.append(request_id)
+                elif record.status == status:
+                    summary.unchanged.append(request_id)
+                elif record.status not in allowed_from:
+                    summary.rejected[request_id] = record.status
+                else:
+                    self._remove_from_index("status", record)
+                    record.status = status
+                    record.version += 1
+                    self._add_to_index("status", record)
+                    summary.updated.append(request_id)
+        return summary
 
     def clear(self) -> None:
         """Clear all stored requests (useful for testing)."""
-        self._storage.clear()
+        with self._lock:
+            self._storage.clear()
+            self._ordered.clear()
+            for index in self._indexes.values():
+                index.clear()
+
+    def close(self) -> None:
+        """Nothing to release, the requests are only kept in memory."""
+
+    def _insert(self, stored_requests: Iterable[ProcurementRequestStored]) -> None:
+        """Add requests that already have their IDs, e.g. when restoring them."""
+        records = [self._pack(stored_request) for stored_request in stored_requests]
+        with self._lock:
+            for record in records:
+                self._storage[record.id] = record
+                insort(self._ordered, _sort_key(record))
+                for field in self._index_fields:
+                    self._add_to_index(field, record)
+
+    def _add_to_index(self, field: str, record: RecordT) -> None:
+        value = self._index_fields[field](record)
+        insort(self._indexes[field].setdefault(value, []), _sort_key(record))
+
+    def _remove_from_index(self, field: str, record: RecordT) -> None:
+        value = self._index_fields[field](record)
+        bucket = self._indexes[field][value]
+        del bucket[bisect_left(bucket, _sort_key(record))]
+        if not bucket:
+            del self._indexes[field][value]
+
+
+class InMemoryRepository(BaseInMemoryRepository[ProcurementRequestStored]):
+    """In-memory repository that keeps the stored requests themselves."""
+
+    _index_fields = {
+        "status": lambda stored: stored.status,
+        "commodity_group": lambda stored: stored.request.commodity_group,
+        "vendor_name": lambda stored: stored.request.vendor_name,
+        "department": lambda stored: stored.request.department,
+    }
+
+    def _pack(
+        self, stored_request: ProcurementRequestStored
+    ) -> ProcurementRequestStored:
+        return stored_request
+
+    def _unpack(self, record: ProcurementRequestStored) -> ProcurementRequestStored:
+        return record
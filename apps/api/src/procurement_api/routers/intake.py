@@ -1,23 +1,130 @@
-from typing import Any, cast
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import UTC, datetime
+from typing import Any, AsyncIterator, cast
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from pydantic import BaseModel
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, model_validator
 
-from procurement_api.intake import CommodityGroupNotFoundException, IntakeApi
+from procurement_api.export import (
+    MEDIA_TYPES,
+    ExportFormat,
+    gzip_chunks,
+    iter_csv,
+    iter_ndjson,
+)
+from procurement_api.intake import (
+    MAX_BULK_STATUS_IDS,
+    CommodityGroupNotFoundException,
+    IntakeApi,
+    InvalidStatusTransitionException,
+    TooManyRequestsSelectedException,
+)
 from procurement_api.models.commodity_group import CommodityGroupInfo
 from procurement_api.models.procurement import ProcurementRequestCreate
-from procurement_api.repository import ProcurementRequestStatus
+from procurement_api.ndjson import (
+    NDJSON_MEDIA_TYPE,
+    DuplexStreamingResponse,
+    LineTooLongError,
+    encode_line,
+    iter_lines,
+)
+from procurement_api.repository import (
+    PageCursor,
+    ProcurementRequestStatus,
+    ProcurementRequestStored,
+    RequestFilter,
+    VersionConflictException,
+)
 
+# Handlers are plain functions, so FastAPI runs them in its threadpool and
+# blocking repository calls never stall the event loop.
 router = APIRouter(prefix="/intake", tags=["intake"])
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+BULK_BATCH_SIZE = 500
+
+
+class RawJSONResponse(Response):
+    """Response for content that is already encoded as JSON.
+
+    Stored requests cache their own JSON encoding, so handlers hand over bytes
+    and skip FastAPI's validation and `jsonable_encoder` round trip.
+    """
+
+    media_type = "application/json"
+
 
 def get_intake(request: Request) -> IntakeApi:
     """Get intake API from request state."""
     return cast(IntakeApi, request.state.intake)
 
 
+def encode_cursor(cursor: PageCursor) -> str:
+    """Encode a page cursor as an opaque URL-safe token."""
+    raw = f"{cursor.created_at.isoformat()}|{cursor.id}"
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(token: str) -> PageCursor:
+    """Decode a token created by `encode_cursor`."""
+    try:
+        created_at, request_id = urlsafe_b64decode(token).decode().split("|", 1)
+        cursor = PageCursor(
+            created_at=datetime.fromisoformat(created_at), id=request_id
+        )
+    except ValueError:
+        cursor = None
+    # Issued cursors are always aware, a naive one cannot be compared to the
+    # stored timestamps
+    if cursor is None or cursor.created_at.tzinfo is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor: '{token}'.",
+        )
+    return cursor
+
+
+def stored_response(stored: ProcurementRequestStored) -> RawJSONResponse:
+    """Respond with a stored request and its version as the ETag."""
+    return RawJSONResponse(stored.to_json(), headers={"ETag": f'"{stored.version}"'})
+
+
+def parse_if_match(value: str | None) -> int | None:
+    """Get the version an `If-Match` header asks for, `None` matches any."""
+    if value is None or value.strip() == "*":
+        return None
+    try:
+        return int(value.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        # An ETag we never issued cannot match the current version
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"Invalid If-Match header: '{value}'.",
+        )
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    """Interpret naive datetimes as UTC so they compare with stored timestamps."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
 @router.get("/commodity_groups", status_code=status.HTTP_200_OK)
-async def get_commodity_groups(
+def get_commodity_groups(
     intake: IntakeApi = Depends(get_intake),
 ) -> list[CommodityGroupInfo]:
     """
@@ -27,7 +134,7 @@ async def get_commodity_groups(
 
 
 @router.post("/request", status_code=status.HTTP_201_CREATED)
-async def create_procurement_request(
+def create_procurement_request(
     request: ProcurementRequestCreate, intake: IntakeApi = Depends(get_intake)
 ) -> dict[str, str]:
     """
@@ -43,19 +150,157 @@ async def create_procurement_request(
         )
 
 
-@router.get("/requests", status_code=status.HTTP_200_OK)
-async def get_all_requests(intake: IntakeApi = Depends(get_intake)) -> list[dict]:
+@router.post("/requests/bulk", status_code=status.HTTP_200_OK)
+async def bulk_create_procurement_requests(
+    request: Request, intake: IntakeApi = Depends(get_intake)
+) -> DuplexStreamingResponse:
     """
-    Get all procurement requests.
+    Create procurement requests from a newline delimited JSON body.
+
+    Each line holds one procurement request. The body is read and stored in
+    batches, and one result line per input line is streamed back with the
+    new request ID or the error for that line.
     """
-    requests = intake.get_all_requests()
-    return [req.to_dict() for req in requests]
 
+    async def store(
+        batch: list[tuple[int, ProcurementRequestCreate | dict[str, Any]]],
+    ) -> bytes:
+        valid = [r for _, r in batch if isinstance(r, ProcurementRequestCreate)]
+        stored = iter(
+            await run_in_threadpool(intake.create_procurement_requests, valid)
+        )
+
+        results = []
+        for line_number, parsed in batch:
+            if not isinstance(parsed, ProcurementRequestCreate):
+                results.append(encode_line({"line": line_number, **parsed}))
+            elif (stored_request := next(stored)) is None:
+                error = f"Invalid commodity_group: '{parsed.commodity_group}'."
+                results.append(encode_line({"line": line_number, "error": error}))
+            else:
+                result = {
+                    "line": line_number,
+                    "id": stored_request.id,
+                    "status": stored_request.status.value,
+                }
+                results.append(encode_line(result))
+        return b"".join(results)
+
+    async def results() -> AsyncIterator[bytes]:
+        batch: list[tuple[int, ProcurementRequestCreate | dict[str, Any]]] = []
+        line_number = 0
+        try:
+            async for line in iter_lines(request.stream()):
+                line_number += 1
+                if not line.strip():
+                    continue
+                try:
+                    request_create = ProcurementRequestCreate.model_validate_json(line)
+                    batch.append((line_number, request_create))
+                except ValidationError as error:
+                    # The input of a line that is not JSON is raw bytes
+                    errors = error.errors(
+                        include_url=False, include_context=False, include_input=False
+                    )
+                    batch.append((line_number, {"error": errors}))
+                if len(batch) >= BULK_BATCH_SIZE:
+                    yield await store(batch)
+                    batch = []
+        except LineTooLongError as error:
+            # The rest of the body cannot be split into lines reliably
+            batch.append((line_number + 1, {"error": str(error)}))
+        if batch:
+            yield await store(batch)
+
+    return DuplexStreamingResponse(results(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def get_request_filter(
+    request_status: ProcurementRequestStatus | None = Query(None, alias="status"),
+    commodity_group: str | None = None,
+    vendor_name: str | None = None,
+    department: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> RequestFilter:
+    """Get the request filter from the query parameters."""
+    return RequestFilter(
+        status=request_status,
+        commodity_group=commodity_group,
+        vendor_name=vendor_name,
+        department=department,
+        created_from=_as_utc(created_from),
+        created_to=_as_utc(created_to),
+    )
+
+
+@router.get("/requests/export", status_code=status.HTTP_200_OK)
+def export_requests(
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    gzip: bool = False,
+    criteria: RequestFilter = Depends(get_request_filter),
+    intake: IntakeApi = Depends(get_intake),
+) -> StreamingResponse:
+    """
+    Stream all matching procurement requests as NDJSON or CSV.
 
-@router.get("/requests/{request_id}", status_code=status.HTTP_200_OK)
-async def get_request_by_id(
+    Requests are read from the repository page by page and encoded as they
+    are sent, so memory use does not depend on the number of requests.
+    """
+    requests = intake.iter_requests(criteria)
+    match export_format:
+        case ExportFormat.NDJSON:
+            chunks = iter_ndjson(requests)
+        case ExportFormat.CSV:
+            chunks = iter_csv(requests)
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="requests.{export_format.value}"'
+    }
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        chunks, media_type=MEDIA_TYPES[export_format], headers=headers
+    )
+
+
+@router.get("/requests", status_code=status.HTTP_200_OK, response_class=RawJSONResponse)
+def get_all_requests(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    criteria: RequestFilter = Depends(get_request_filter),
+    intake: IntakeApi = Depends(get_intake),
+) -> RawJSONResponse:
+    """
+    Get a page of procurement requests ordered by creation time.
+
+    If there are more matching requests, the cursor for the next page is
+    returned in the `X-Next-Cursor` header.
+    """
+    after = decode_cursor(cursor) if cursor is not None else None
+
+    # Fetch one extra request to learn whether there is a next page
+    requests = intake.get_all_requests(criteria, after=after, limit=limit + 1)
+    response = RawJSONResponse(
+        b"[" + b",".join(req.to_json() for req in requests[:limit]) + b"]"
+    )
+    if len(requests) > limit:
+        last = requests[limit - 1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            PageCursor(created_at=last.created_at, id=last.id)
+        )
+    return response
+
+
+@router.get(
+    "/requests/{request_id}",
+    status_code=status.HTTP_200_OK,
+    response_class=RawJSONResponse,
+)
+def get_request_by_id(
     request_id: str, intake: IntakeApi = Depends(get_intake)
-) -> dict:
+) -> RawJSONResponse:
     """
     Get a single procurement request by ID.
     """
@@ -65,7 +310,7 @@ async def get_request_by_id(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Procurement request with ID '{request_id}' not found.",
         )
-    return request.to_dict()
+    return stored_response(request)
 
 
 class StatusUpdate(BaseModel):
@@ -74,19 +319,111 @@ class StatusUpdate(BaseModel):
     status: ProcurementRequestStatus
 
 
-@router.patch("/requests/{request_id}/status", status_code=status.HTTP_200_OK)
-async def update_request_status(
+class StatusUpdateFilter(BaseModel):
+    """Selects the requests of a bulk status update, like the list filters."""
+
+    status: ProcurementRequestStatus | None = None
+    commodity_group: str | None = None
+    vendor_name: str | None = None
+    department: str | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+
+    def to_request_filter(self) -> RequestFilter:
+        return RequestFilter(
+            status=self.status,
+            commodity_group=self.commodity_group,
+            vendor_name=self.vendor_name,
+            department=self.department,
+            created_from=_as_utc(self.created_from),
+            created_to=_as_utc(self.created_to),
+        )
+
+
+class BulkStatusUpdate(BaseModel):
+    """Request body for updating the status of several requests."""
+
+    status: ProcurementRequestStatus
+    ids: list[str] | None = Field(None, max_length=MAX_BULK_STATUS_IDS)
+    filter: StatusUpdateFilter | None = None
+
+    @model_validator(mode="after")
+    def check_selection(self) -> "BulkStatusUpdate":
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Select the requests with either 'ids' or 'filter'.")
+        return self
+
+
+@router.patch("/requests/status", status_code=status.HTTP_200_OK)
+def update_request_statuses(
+    status_update: BulkStatusUpdate, intake: IntakeApi = Depends(get_intake)
+) -> dict[str, Any]:
+    """
+    Update the status of several procurement requests at once.
+
+    The requests are given as a list of IDs or as a filter, either selects
+    at most `MAX_BULK_STATUS_IDS` requests. The IDs of the updated requests
+    and of those that already had the status are returned, together with
+    the reason for every request that could not be updated.
+    """
+    try:
+        summary = intake.update_request_statuses(
+            status_update.status,
+            request_ids=status_update.ids or (),
+            criteria=(
+                status_update.filter.to_request_filter()
+                if status_update.filter is not None
+                else None
+            ),
+        )
+    except TooManyRequestsSelectedException as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    target = status_update.status.value
+    failed = {request_id: "Not found." for request_id in summary.not_found}
+    failed.update(
+        (request_id, f"Cannot change status from '{current.value}' to '{target}'.")
+        for request_id, current in summary.rejected.items()
+    )
+    return {
+        "updated": summary.updated,
+        "unchanged": summary.unchanged,
+        "failed": failed,
+    }
+
+
+@router.patch(
+    "/requests/{request_id}/status",
+    status_code=status.HTTP_200_OK,
+    response_class=RawJSONResponse,
+)
+def update_request_status(
     request_id: str,
     status_update: StatusUpdate,
+    if_match: str | None = Header(None),
     intake: IntakeApi = Depends(get_intake),
-) -> dict:
+) -> RawJSONResponse:
     """
     Update the status of a procurement request.
+
+    Requests move from open to in-progress to closed, never back. Send the
+    `ETag` of the request as `If-Match` to only update the version you have
+    seen, a concurrent change then gives a 412 instead of being overwritten.
     """
-    updated_request = intake.update_request_status(request_id, status_update.status)
+    try:
+        updated_request = intake.update_request_status(
+            request_id, status_update.status, parse_if_match(if_match)
+        )
+    except VersionConflictException as error:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(error),
+            headers={"ETag": f'"{error.actual}"'},
+        )
+    except InvalidStatusTransitionException as error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
     if not updated_request:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Procurement request with ID '{request_id}' not found.",
         )
-    return updated_request.to_dict()
+    return stored_response(updated_request)
@@ -7,6 +7,7 @@ from uvicorn import Config, Server
 
 from procurement_api.config import AppConfig
 from procurement_api.intake import IntakeApi
+from procurement_api.routers.intake import NEXT_CURSOR_HEADER
 from procurement_api.routers.intake import router as intake_router
 
 
@@ -30,6 +31,7 @@ def build_app(intake: IntakeApi) -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
     )
 
     app.include_router(intake_router)
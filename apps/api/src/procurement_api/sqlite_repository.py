@@ -0,0 +1,421 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from typing import Any, Collection, Iterator, Sequence
+
+from procurement_api.models.procurement import OrderLine, ProcurementRequestCreate
+from procurement_api.repository import (
+    PageCursor,
+    ProcurementRequestStatus,
+    ProcurementRequestStored,
+    Repository,
+    RequestFilter,
+    StatusUpdateSummary,
+    VersionConflictException,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS procurement_requests (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    requestor_name TEXT NOT NULL,
+    title TEXT NOT NULL,
+    vendor_name TEXT NOT NULL,
+    vat_id TEXT NOT NULL,
+    commodity_group TEXT NOT NULL,
+    total_cost REAL NOT NULL,
+    department TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS order_lines (
+    request_id TEXT NOT NULL REFERENCES procurement_requests (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    position_description TEXT NOT NULL,
+    unit_price REAL NOT NULL,
+    amount INTEGER NOT NULL,
+    unit TEXT NOT NULL,
+    total_price REAL NOT NULL,
+    PRIMARY KEY (request_id, position)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ix_requests_created_at
+    ON procurement_requests (created_at, id);
+CREATE INDEX IF NOT EXISTS ix_requests_status
+    ON procurement_requests (status, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_requests_commodity_group
+    ON procurement_requests (commodity_group, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_requests_vendor_name
+    ON procurement_requests (vendor_name, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_requests_department
+    ON procurement_requests (department, created_at, id);
+"""
+
+_INSERT_REQUEST = """
+INSERT INTO procurement_requests (
+    id, created_at, status, requestor_name, title, vendor_name, vat_id,
+    commodity_group, total_cost, department, version
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_ORDER_LINE = """
+INSERT INTO order_lines (
+    request_id, position, position_description, unit_price, amount, unit,
+    total_price
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# The page of requests is selected first, then joined with its order lines
+_SELECT_PAGE = """
+SELECT
+    r.id, r.created_at, r.status, r.requestor_name, r.title, r.vendor_name,
+    r.vat_id, r.commodity_group, r.total_cost, r.department, r.version,
+    l.position_description, l.unit_price, l.amount, l.unit, l.total_price
+FROM (
+    SELECT * FROM procurement_requests
+    WHERE {where}
+    ORDER BY created_at, id
+    LIMIT ?
+) AS r
+JOIN order_lines AS l ON l.request_id = r.id
+ORDER BY r.created_at, r.id, l.position
+"""
+
+_FILTER_COLUMNS = ("status", "commodity_group", "vendor_name", "department")
+
+# IDs are looked up in chunks to stay below SQLite's limit on query parameters
+_ID_CHUNK_SIZE = 500
+
+
+def _encode_time(value: datetime) -> str:
+    """Encode a timestamp so that text order equals chronological order."""
+    return value.astimezone(UTC).isoformat(timespec="microseconds")
+
+
+class SqliteRepository(Repository):
+    """SQLite implementation of the procurement request repository.
+
+    The database runs in WAL mode, so readers never wait for the writer.
+    All writes go through a single connection guarded by a lock, while reads
+    borrow a connection from a small pool. Every method is blocking and safe
+    to call from several threads, e.g. FastAPI's threadpool.
+    """
+
+    def __init__(self, path: str, read_pool_size: int = 4) -> None:
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        self._migrate()
+        self._writer.executescript(_SCHEMA)
+
+        self._readers: queue.Queue[sqlite3.Connection] = queue.Queue()
+        for _ in range(read_pool_size):
+            self._readers.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode, transactions are started explicitly for writes.
+        # The statement cache keeps the fixed SQL statements prepared.
+        connection = sqlite3.connect(
+            self.path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=128,
+        )
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.execute("PRAGMA busy_timeout = 5000")
+        return connection
+
+    def _migrate(self) -> None:
+        """Bring a database created by an earlier version up to date."""
+        columns = {
+            row[1]
+            for row in self._writer.execute("PRAGMA table_info(procurement_requests)")
+        }
+        if columns and "version" not in columns:
+            self._writer.execute(
+                "ALTER TABLE procurement_requests"
+                " ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+            )
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        connection = self._readers.get()
+        try:
+            yield connection
+        finally:
+            self._readers.put(connection)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._writer
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+            self._writer.execute("COMMIT")
+
+    def store_procurement_request(
+        self, request: ProcurementRequestCreate
+    ) -> ProcurementRequestStored:
+        """
+        Store a procurement request in the database.
+
+        Args:
+            request: The procurement request to store
+
+        Returns:
+            The stored procurement request with ID and timestamp
+        """
+        return self.store_many([request])[0]
+
+    def store_many(
+        self, requests: Sequence[ProcurementRequestCreate]
+    ) -> list[ProcurementRequestStored]:
+        """Store a batch of procurement requests in a single transaction."""
+        stored_requests = [ProcurementRequestStored(request) for request in requests]
+        with self._transaction() as connection:
+            connection.executemany(
+                _INSERT_REQUEST,
+                (
+                    (
+                        stored.id,
+                        _encode_time(stored.created_at),
+                        stored.status.value,
+                        stored.request.requestor_name,
+                        stored.request.title,
+                        stored.request.vendor_name,
+                        stored.request.vat_id,
+                        stored.request.commodity_group,
+                        stored.request.total_cost,
+                        stored.request.department,
+                        stored.version,
+                    )
+                    for stored in stored_requests
+                ),
+            )
+            connection.executemany(
+                _INSERT_ORDER_LINE,
+                (
+                    (
+                        stored.id,
+                        position,
+                        line.position_description,
+                        line.unit_price,
+                        line.amount,
+                        line.unit,
+                        line.total_price,
+                    )
+                    for stored in stored_requests
+                    for position, line in enumerate(stored.request.order_lines)
+                ),
+            )
+        return stored_requests
+
+    def get_all(self) -> list[ProcurementRequestStored]:
+        """Get all stored procurement requests."""
+        return self.find(RequestFilter())
+
+    def get_by_id(self, request_id: str) -> ProcurementRequestStored | None:
+        """Get a procurement request by ID."""
+        found = self._select("id = ?", [request_id], limit=1)
+        return found[0] if found else None
+
+    def find(
+        self,
+        criteria: RequestFilter,
+        after: PageCursor | None = None,
+        limit: int | None = None,
+    ) -> list[ProcurementRequestStored]:
+        """
+        Get stored procurement requests matching the given criteria.
+
+        Args:
+            criteria: The filter to apply, `None` criteria match everything
+            after: Only return requests ordered after this cursor
+            limit: Maximum number of requests to return
+
+        Returns:
+            The matching requests in `(created_at, id)` order
+        """
+        conditions = []
+        parameters: list[Any] = []
+        for column in _FILTER_COLUMNS:
+            value = getattr(criteria, column)
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        if criteria.created_from is not None:
+            conditions.append("created_at >= ?")
+            parameters.append(_encode_time(criteria.created_from))
+        if criteria.created_to is not None:
+            conditions.append("created_at < ?")
+            parameters.append(_encode_time(criteria.created_to))
+        if after is not None:
+            conditions.append("(created_at, id) > (?, ?)")
+            parameters.extend([_encode_time(after.created_at), after.id])
+
+        where = " AND ".join(conditions) or "1"
+        return self._select(where, parameters, limit=-1 if limit is None else limit)
+
+    def update_status(
+        self,
+        request_id: str,
+        status: ProcurementRequestStatus,
+        expected_version: int | None = None,
+    ) -> ProcurementRequestStored | None:
+        """
+        Update the status of a stored request.
+
+        Args:
+            request_id: The ID of the request to update
+            status: The new status
+            expected_version: Only update if the request is at this version
+
+        Returns:
+            The updated request, or `None` if there is no request with the ID
+
+        Raises:
+            VersionConflictException: If the request is at another version
+        """
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT version FROM procurement_requests WHERE id = ?",
+                (request_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            if expected_version is not None and row[0] != expected_version:
+                raise VersionConflictException(request_id, expected_version, row[0])
+            connection.execute(
+                "UPDATE procurement_requests SET status = ?, version = version + 1"
+                " WHERE id = ?",
+                (status.value, request_id),
+            )
+            # Read back inside the transaction to return exactly this version
+            return self._select_with(connection, "id = ?", [request_id], limit=1)[0]
+
+    def update_status_many(
+        self,
+        request_ids: Sequence[str],
+        status: ProcurementRequestStatus,
+        allowed_from: Collection[ProcurementRequestStatus],
+    ) -> StatusUpdateSummary:
+        """
+        Update the status of several requests in a single transaction.
+
+        Args:
+            request_ids: The IDs of the requests to update
+            status: The new status
+            allowed_from: Only requests currently in one of these are updated
+
+        Returns:
+            Which requests were updated, missing, not allowed to change or
+            unchanged
+        """
+        unique_ids = list(dict.fromkeys(request_ids))
+        summary = StatusUpdateSummary(
+            updated=[], not_found=[], rejected={}, unchanged=[]
+        )
+        with self._transaction() as connection:
+            current: dict[str, str] = {}
+            for start in range(0, len(unique_ids), _ID_CHUNK_SIZE):
+                chunk = unique_ids[start : start + _ID_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                current.update(
+                    connection.execute(
+                        "SELECT id, status FROM procurement_requests"
+                        f" WHERE id IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                )
+
+            for request_id in unique_ids:
+                if request_id not in current:
+                    summary.not_found.append(request_id)
+                    continue
+                current_status = ProcurementRequestStatus(current[request_id])
+                if current_status == status:
+                    summary.unchanged.append(request_id)
+                elif current_status in allowed_from:
+                    summary.updated.append(request_id)
+                else:
+                    summary.rejected[request_id] = current_status
+
+            connection.executemany(
+                "UPDATE procurement_requests SET status = ?, version = version + 1"
+                " WHERE id = ?",
+                ((status.value, request_id) for request_id in summary.updated),
+            )
+        return summary
+
+    def clear(self) -> None:
+        """Clear all stored requests (useful for testing)."""
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM order_lines")
+            connection.execute("DELETE FROM procurement_requests")
+
+    def close(self) -> None:
+        """Close all database connections."""
+        with self._write_lock:
+            self._writer.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+    def _select(
+        self, where: str, parameters: list[Any], limit: int
+    ) -> list[ProcurementRequestStored]:
+        with self._reader() as connection:
+            return self._select_with(connection, where, parameters, limit)
+
+    def _select_with(
+        self,
+        connection: sqlite3.Connection,
+        where: str,
+        parameters: list[Any],
+        limit: int,
+    ) -> list[ProcurementRequestStored]:
+        rows = connection.execute(
+            _SELECT_PAGE.format(where=where), [*parameters, limit]
+        ).fetchall()
+
+        # Rows are ordered by request, one row per order line
+        found: list[ProcurementRequestStored] = []
+        lines: list[OrderLine] = []
+        for row in rows:
+            if not found or found[-1].id != row[0]:
+                lines = []
+                found.append(
+                    ProcurementRequestStored(
+                        ProcurementRequestCreate.model_construct(
+                            requestor_name=row[3],
+                            title=row[4],
+                            vendor_name=row[5],
+                            vat_id=row[6],
+                            commodity_group=row[7],
+                            order_lines=lines,
+                            total_cost=row[8],
+                            department=row[9],
+                        ),
+                        status=ProcurementRequestStatus(row[2]),
+                        request_id=row[0],
+                        created_at=datetime.fromisoformat(row[1]),
+                        version=row[10],
+                    )
+                )
+            lines.append(
+                OrderLine.model_construct(
+                    position_description=row[11],
+                    unit_price=row[12],
+                    amount=row[13],
+                    unit=row[14],
+                    total_price=row[15],
+                )
+            )
+        return found
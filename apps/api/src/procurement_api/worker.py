@@ -1,4 +1,4 @@
-from typing import NamedTuple, Protocol
+from typing import AsyncIterator, NamedTuple, Protocol
 
 
 class CompletionResponse(NamedTuple):
@@ -15,6 +15,24 @@ class WorkerApi(Protocol):
 
     async def complete(self, prompts: list[str]) -> list[CompletionResponse]: ...
 
+    async def complete_stream(
+        self, prompts: list[str]
+    ) -> AsyncIterator[tuple[int, CompletionResponse]]:
+        """
+        Complete prompts and yield each completion as soon as it is finished.
+
+        Workers that cannot stream yield all completions once the batch is
+        finished, which is what this default does.
+
+        Args:
+            prompts: The prompts to complete
+
+        Yields:
+            The index of a prompt and its completion, in the order they finish
+        """
+        for index, response in enumerate(await self.complete(prompts)):
+            yield index, response
+
 
 class StubWorker(WorkerApi):
     """Stub worker implementation that returns the prompt as the completion."""
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import random
+from typing import AsyncIterator, Awaitable, Callable, NamedTuple, Sequence
+
+import httpx
+
+from procurement_api.batcher import estimate_tokens
+from procurement_api.worker import CompletionResponse, WorkerApi
+
+logger = logging.getLogger(__name__)
+
+HealthCheck = Callable[[WorkerApi], Awaitable[object]]
+
+
+async def probe(worker: WorkerApi) -> None:
+    """Check a worker, raises if it is down.
+
+    Workers with a `check_health` method, like `HttpWorker`, are checked
+    with it, which costs the worker far less than a completion. Others
+    complete an empty prompt.
+    """
+    check_health = getattr(worker, "check_health", None)
+    if check_health is not None:
+        await check_health()
+    else:
+        await worker.complete([""])
+
+
+def is_worker_failure(error: Exception) -> bool:
+    """
+    Whether a batch failed because of its worker rather than the batch.
+
+    Workers that cannot be reached, time out or answer with a server error
+    are failures. Errors of the batch itself, e.g. a client error status for
+    a prompt that is too long, would fail on every worker.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.is_server_error
+    return isinstance(
+        error, (httpx.TransportError, ConnectionError, asyncio.TimeoutError)
+    )
+
+
+class BackendStats(NamedTuple):
+    """State and counters of a worker in a pool.
+
+    `outstanding_batches` is the queue depth of the worker. `tokens` counts
+    the completion tokens since the pool was created, sampled over time it
+    gives the token throughput.
+    """
+
+    healthy: bool
+    outstanding_batches: int
+    outstanding_tokens: int
+    batches: int
+    tokens: int
+    failures: int
+
+
+class _Backend:
+    def __init__(self, worker: WorkerApi) -> None:
+        self.worker = worker
+        self.healthy = True
+        self.outstanding_batches = 0
+        self.outstanding_tokens = 0
+        self.batches = 0
+        self.tokens = 0
+        self.failures = 0
+
+    def stats(self) -> BackendStats:
+        return BackendStats(
+            healthy=self.healthy,
+            outstanding_batches=self.outstanding_batches,
+            outstanding_tokens=self.outstanding_tokens,
+            batches=self.batches,
+            tokens=self.tokens,
+            failures=self.failures,
+        )
+
+
+class WorkerPool(WorkerApi):
+    """Spreads batches over several workers, e.g. one process per GPU.
+
+    Each batch goes to the less loaded of two random healthy workers, load
+    being the estimated prompt tokens of their outstanding batches. This
+    avoids both the herding of always picking the least loaded worker and
+    the stale view of a shared counter.
+
+    A worker whose batch fails with `is_worker_failure` is marked unhealthy
+    and the batch is retried on another worker, up to `retries` times. Other
+    errors are raised right away. Health checks, or a batch that an
+    unhealthy worker completes, mark it healthy again. If no worker is
+    healthy, all are tried.
+    """
+
+    def __init__(
+        self,
+        workers: Sequence[WorkerApi],
+        retries: int = 1,
+        health_check: HealthCheck = probe,
+        health_timeout: float = 5.0,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ) -> None:
+        if not workers:
+            raise ValueError("A pool needs at least one worker.")
+        self.retries = retries
+        self.health_check = health_check
+        self.health_timeout = health_timeout
+        self.count_tokens = count_tokens
+        self._backends = [_Backend(worker) for worker in workers]
+
+    def stats(self) -> list[BackendStats]:
+        """Get the state and counters of the workers, in their order."""
+        return [backend.stats() for backend in self._backends]
+
+    async def complete(self, prompts: list[str]) -> list[CompletionResponse]:
+        """
+        Complete a batch of prompts on one of the workers.
+
+        Args:
+            prompts: The prompts to complete
+
+        Returns:
+            The completions in the order of the prompts
+
+        Raises:
+            Exception: The error of the last worker tried, if all failed
+        """
+        if not prompts:
+            return []
+        tokens = sum(self.count_tokens(prompt) for prompt in prompts)
+        tried: list[_Backend] = []
+        while True:
+            backend = self._choose(tried)
+            tried.append(backend)
+            backend.outstanding_batches += 1
+            backend.outstanding_tokens += tokens
+            try:
+                responses = await backend.worker.complete(prompts)
+                if len(responses) != len(prompts):
+                    raise RuntimeError(
+                        f"Worker returned {len(responses)} completions "
+                        f"for {len(prompts)} prompts."
+                    )
+            except Exception as error:
+                if not is_worker_failure(error):
+                    raise
+                backend.failures += 1
+                backend.healthy = False
+                if len(tried) > self.retries or len(tried) == len(self._backends):
+                    raise
+                logger.warning("Retrying batch on another worker: %s", error)
+                continue
+            finally:
+                backend.outstanding_batches -= 1
+                backend.outstanding_tokens -= tokens
+            backend.healthy = True
+            backend.batches += 1
+            backend.tokens += sum(response.tokens for response in responses)
+            return responses
+
+    async def complete_stream(
+        self, prompts: list[str]
+    ) -> AsyncIterator[tuple[int, CompletionResponse]]:
+        """
+        Complete a batch of prompts on one of the workers, streaming.
+
+        The worker is chosen like for `complete`. A failed batch is not
+        retried, since some of its completions may already be yielded, but
+        a failure of the worker still marks it unhealthy.
+
+        Args:
+            prompts: The prompts to complete
+
+        Yields:
+            The index of a prompt and its completion, in the order they finish
+        """
+        if not prompts:
+            return
+        tokens = sum(self.count_tokens(prompt) for prompt in prompts)
+        backend = self._choose([])
+        backend.outstanding_batches += 1
+        backend.outstanding_tokens += tokens
+        completed_tokens = 0
+        try:
+            async for index, response in backend.worker.complete_stream(prompts):
+                completed_tokens += response.tokens
+                yield index, response
+        except Exception as error:
+            if is_worker_failure(error):
+                backend.failures += 1
+                backend.healthy = False
+            raise
+        finally:
+            backend.outstanding_batches -= 1
+            backend.outstanding_tokens -= tokens
+        backend.healthy = True
+        backend.batches += 1
+        backend.tokens += completed_tokens
+
+    async def check_health(self) -> None:
+        """Check all workers at the same time and update their health."""
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(self.health_check(backend.worker), self.health_timeout)
+                for backend in self._backends
+            ),
+            return_exceptions=True,
+        )
+        for index, (backend, result) in enumerate(zip(self._backends, results)):
+            healthy = not isinstance(result, BaseException)
+            if healthy != backend.healthy:
+                logger.info(
+                    "Worker %s is %s", index, "healthy" if healthy else "unhealthy"
+                )
+            backend.healthy = healthy
+
+    async def run_health_checks(self, interval: float) -> None:
+        """Check the health of the workers every `interval` seconds."""
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    def _choose(self, tried: list[_Backend]) -> _Backend:
+        untried = [backend for backend in self._backends if backend not in tried]
+        candidates = [backend for backend in untried if backend.healthy] or untried
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        if second.outstanding_tokens < first.outstanding_tokens:
+            return second
+        return first
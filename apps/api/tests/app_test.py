@@ -1,7 +1,11 @@
 import asyncio
 
+import pytest
+
+from procurement_api import app as app_module
 from procurement_api.app import App
 from procurement_api.config import AppConfig
+from procurement_api.repository import InMemoryRepository, Repository
 
 
 async def test_app_can_be_shutdown(config: AppConfig):
@@ -15,3 +19,36 @@ async def test_app_can_be_shutdown(config: AppConfig):
 
     # Then the task completes
     await asyncio.wait_for(task, timeout=1.0)
+
+
+class ClosingRepository(InMemoryRepository):
+    """In-memory repository that records whether it was closed."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+async def test_shutdown_closes_the_repository(
+    config: AppConfig, monkeypatch: pytest.MonkeyPatch
+):
+    # Given a running app with a repository that records being closed
+    repository = ClosingRepository()
+
+    def build_repository(config: AppConfig) -> Repository:
+        return repository
+
+    monkeypatch.setattr(app_module, "build_repository", build_repository)
+    app = App(config)
+    task = asyncio.create_task(app.run())
+    await asyncio.sleep(0.01)
+
+    # When we shutdown the app
+    app.shutdown()
+    await asyncio.wait_for(task, timeout=1.0)
+
+    # Then the repository was closed
+    assert repository.closed
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from procurement_api.batcher import BatcherStats, BatchingWorker
+from procurement_api.worker import CompletionResponse, StubWorker, WorkerApi
+
+
+class RecordingWorker(WorkerApi):
+    """Stub worker that keeps the batches it was asked to complete."""
+
+    def __init__(self, error: BaseException | None = None) -> None:
+        self.batches: list[list[str]] = []
+        self.error = error
+
+    async def complete(self, prompts: list[str]) -> list[CompletionResponse]:
+        self.batches.append(prompts)
+        if self.error is not None:
+            raise self.error
+        return await StubWorker().complete(prompts)
+
+
+async def test_concurrent_prompts_are_completed_in_one_batch():
+    # given a batching worker
+    worker = RecordingWorker()
+    batcher = BatchingWorker(worker, max_wait=0.01)
+
+    # when three callers submit a prompt at the same time
+    responses = await asyncio.gather(
+        *(batcher.submit(prompt) for prompt in ["a", "bb", "ccc"])
+    )
+
+    # then the worker got one batch and every caller its own completion
+    assert worker.batches == [["a", "bb", "ccc"]]
+    assert [response.completion for response in responses] == ["a", "bb", "ccc"]
+    assert batcher.stats() == BatcherStats(batches=1, prompts=3, tokens=3)
+
+
+async def test_batches_are_sent_when_full():
+    # given a batching worker for batches of two prompts
+    worker = RecordingWorker()
+    batcher = BatchingWorker(worker, max_batch_size=2, max_wait=10)
+
+    # when four prompts are submitted
+    await asyncio.wait_for(
+        asyncio.gather(*(batcher.submit(str(n)) for n in range(4))), timeout=1
+    )
+
+    # then they were sent without waiting, two at a time
+    assert worker.batches == [["0", "1"], ["2", "3"]]
+
+
+async def test_batches_are_sent_before_they_exceed_the_token_budget():
+    # given a batching worker for ten tokens per batch, a token per character
+    worker = RecordingWorker()
+    batcher = BatchingWorker(worker, max_batch_tokens=10, count_tokens=len)
+
+    # when prompts of six, four and three tokens are submitted
+    await batcher.complete(["aaaaaa", "bbbb", "ccc"])
+
+    # then the first two filled a batch and the third waited for the next one
+    assert worker.batches == [["aaaaaa", "bbbb"], ["ccc"]]
+
+
+async def test_every_caller_gets_the_error_of_its_batch():
+    # given a worker that fails
+    batcher = BatchingWorker(RecordingWorker(RuntimeError("worker crashed")))
+
+    # when two prompts are submitted
+    results = await asyncio.gather(
+        batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+    )
+
+    # then both callers get the error
+    assert [str(result) for result in results] == ["worker crashed"] * 2
+
+
+async def test_prompts_of_cancelled_callers_are_not_sent():
+    # given a caller that goes away before its batch is sent
+    worker = RecordingWorker()
+    batcher = BatchingWorker(worker, max_wait=0.01)
+    gone = asyncio.create_task(batcher.submit("gone"))
+    await asyncio.sleep(0)
+    gone.cancel()
+
+    # when another caller submits a prompt
+    response = await batcher.submit("kept")
+
+    # then only its prompt was sent
+    assert response.completion == "kept"
+    assert worker.batches == [["kept"]]
+    with pytest.raises(asyncio.CancelledError):
+        await gone
+
+
+class Abort(BaseException):
+    """Error that is no `Exception`, like a shutdown of the worker."""
+
+
+async def test_callers_of_a_batch_that_raises_a_base_exception_are_cancelled():
+    # given a batching worker for a worker that aborts
+    batcher = BatchingWorker(RecordingWorker(error=Abort()), max_wait=0.01)
+
+    # when two callers submit a prompt
+    results = await asyncio.gather(
+        batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+    )
+
+    # then both are cancelled instead of waiting forever
+    assert [type(result) for result in results] == [asyncio.CancelledError] * 2
+
+
+async def test_callers_of_a_cancelled_batch_are_cancelled():
+    # given a batching worker for a worker that never answers
+    class HangingWorker(WorkerApi):
+        async def complete(self, prompts: list[str]) -> list[CompletionResponse]:
+            await asyncio.Event().wait()
+            return []
+
+    batcher = BatchingWorker(HangingWorker(), max_batch_size=1)
+    caller = asyncio.create_task(batcher.submit("a"))
+    await asyncio.sleep(0)
+
+    # when the batch is cancelled, e.g. on shutdown
+    for batch in list(batcher._batches):
+        batch.cancel()
+
+    # then its caller is cancelled instead of waiting forever
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(caller, timeout=1.0)
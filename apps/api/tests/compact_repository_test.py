@@ -0,0 +1,76 @@
+import pytest
+
+from procurement_api.compact_repository import CompactInMemoryRepository
+from procurement_api.models.procurement import OrderLine
+from procurement_api.repository import (
+    PageCursor,
+    ProcurementRequestStatus,
+    RequestFilter,
+)
+from tests.repository_test import make_request
+
+
+@pytest.fixture
+def repository():
+    """Create a fresh compact in-memory repository for each test."""
+    return CompactInMemoryRepository()
+
+
+def test_stored_request_round_trips(repository: CompactInMemoryRepository):
+    # given a request with several order lines
+    request = make_request()
+    request.order_lines.append(
+        OrderLine(
+            position_description="Adobe Stock",
+            unit_price=29.99,
+            amount=3,
+            unit="subscriptions",
+            total_price=89.97,
+        )
+    )
+
+    # when we store it and read it back
+    stored = repository.store_procurement_request(request)
+    found = repository.get_by_id(stored.id)
+
+    # then it is equal to the stored request
+    assert found is not None
+    assert found.to_dict() == stored.to_dict()
+    assert found.to_json() == stored.to_json()
+
+
+def test_vendor_names_are_shared(repository: CompactInMemoryRepository):
+    # given two requests for the same vendor, parsed separately
+    first = make_request(vendor_name="".join(["Del", "l"]))
+    second = make_request(vendor_name="".join(["De", "ll"]))
+    assert first.vendor_name is not second.vendor_name
+
+    # when we store both
+    stored = repository.store_many([first, second])
+
+    # then the stored records share one vendor name
+    records = [repository._storage[request.id] for request in stored]
+    assert records[0].vendor_name is records[1].vendor_name
+
+
+def test_find_and_update_status(repository: CompactInMemoryRepository):
+    # given requests for different vendors
+    first = repository.store_procurement_request(make_request())
+    repository.store_procurement_request(make_request(vendor_name="Dell"))
+    third = repository.store_procurement_request(make_request())
+
+    # when we close the first one
+    updated = repository.update_status(first.id, ProcurementRequestStatus.CLOSED)
+
+    # then the status index and the filters follow
+    assert updated is not None
+    assert updated.status == ProcurementRequestStatus.CLOSED
+    open_adobe = repository.find(
+        RequestFilter(status=ProcurementRequestStatus.OPEN, vendor_name="Adobe Inc")
+    )
+    assert [found.id for found in open_adobe] == [third.id]
+    after_first = repository.find(
+        RequestFilter(vendor_name="Adobe Inc"),
+        after=PageCursor(first.created_at, first.id),
+    )
+    assert [found.id for found in after_first] == [third.id]
@@ -0,0 +1,168 @@
+import json
+
+import httpx
+import pytest
+
+from procurement_api.fake_worker import build_fake_worker
+from procurement_api.http_worker import HttpWorker, split_tokens
+from procurement_api.worker import CompletionResponse
+
+
+def make_worker(latency: float = 0) -> HttpWorker:
+    """HTTP worker that calls a fake worker in the same process."""
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=build_fake_worker(latency, 0)),
+        base_url="http://worker",
+    )
+    return HttpWorker("http://worker", model="fake", client=client)
+
+
+async def test_a_batch_is_completed_with_one_request():
+    # given an HTTP worker for the fake worker
+    worker = make_worker()
+
+    # when a batch of prompts is completed
+    responses = await worker.complete(["a", "bb", "ccc"])
+
+    # then every prompt got its completion and share of the tokens
+    assert responses == [
+        CompletionResponse(completion="a", tokens=1),
+        CompletionResponse(completion="bb", tokens=2),
+        CompletionResponse(completion="ccc", tokens=3),
+    ]
+    await worker.aclose()
+
+
+async def test_completions_are_returned_in_the_order_of_the_prompts():
+    # given a worker that answers with the choices out of order
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            json={
+                "choices": [
+                    {"index": 1, "text": "second"},
+                    {"index": 0, "text": "first"},
+                ],
+                "usage": {"completion_tokens": 4},
+            },
+        )
+
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://worker"
+    )
+    worker = HttpWorker("http://worker", model="fake", client=client)
+
+    # when two prompts are completed
+    responses = await worker.complete(["one", "two"])
+
+    # then the completions match the prompts
+    assert [response.completion for response in responses] == ["first", "second"]
+
+
+async def test_error_status_of_the_worker_is_raised():
+    # given a worker that is overloaded
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(503)),
+        base_url="http://worker",
+    )
+    worker = HttpWorker("http://worker", model="fake", client=client)
+
+    # when a prompt is completed, then the error status is raised
+    with pytest.raises(httpx.HTTPStatusError):
+        await worker.complete(["a"])
+
+
+async def test_empty_batch_sends_no_request():
+    # given a worker that fails every request
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(500)),
+        base_url="http://worker",
+    )
+    worker = HttpWorker("http://worker", model="fake", client=client)
+
+    # when no prompts are completed, then there is nothing to fail
+    assert await worker.complete([]) == []
+
+
+async def test_health_check_of_a_worker_that_is_down_raises():
+    # given a worker whose health endpoint reports an error
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(503)),
+        base_url="http://worker",
+    )
+    worker = HttpWorker("http://worker", model="fake", client=client)
+
+    # when its health is checked, then the error status is raised
+    with pytest.raises(httpx.HTTPStatusError):
+        await worker.check_health()
+
+
+def test_split_tokens_adds_up_to_the_total():
+    # when ten tokens are split over completions of one and two characters
+    tokens = split_tokens(10, ["a", "bb"])
+
+    # then the longer completion gets the larger share and the remainder
+    assert tokens == [3, 7]
+
+
+async def test_streamed_completions_are_yielded_as_they_finish():
+    # given a worker that finishes the second prompt first
+    events = [
+        {"choices": [{"index": 1, "text": "fa", "finish_reason": None}]},
+        {"choices": [{"index": 0, "text": "sl", "finish_reason": None}]},
+        {"choices": [{"index": 1, "text": "st", "finish_reason": "stop"}]},
+        {"choices": [{"index": 0, "text": "ow", "finish_reason": None}]},
+        {"choices": [{"index": 0, "text": "", "finish_reason": "length"}]},
+    ]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events)
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, text=body + "data: [DONE]\n\n")
+        ),
+        base_url="http://worker",
+    )
+    worker = HttpWorker("http://worker", model="fake", client=client)
+
+    # when two prompts are completed as a stream
+    streamed = [item async for item in worker.complete_stream(["one", "two"])]
+
+    # then the completions came in the order they finished
+    assert streamed == [
+        (1, CompletionResponse(completion="fast", tokens=2)),
+        (0, CompletionResponse(completion="slow", tokens=2)),
+    ]
+
+
+async def test_stream_of_the_fake_worker_completes_every_prompt():
+    # given an HTTP worker for the fake worker
+    worker = make_worker()
+
+    # when a batch of prompts is completed as a stream
+    streamed = [item async for item in worker.complete_stream(["a", "bb"])]
+
+    # then every prompt got its completion, a token per character
+    assert sorted(streamed) == [
+        (0, CompletionResponse(completion="a", tokens=1)),
+        (1, CompletionResponse(completion="bb", tokens=2)),
+    ]
+    await worker.aclose()
+
+
+async def test_stream_that_ends_early_raises():
+    # given a worker that stops streaming before all prompts are finished
+    event = {"choices": [{"index": 0, "text": "a", "finish_reason": "stop"}]}
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, text=f"data: {json.dumps(event)}\n\n")
+        ),
+        base_url="http://worker",
+    )
+    worker = HttpWorker("http://worker", model="fake", client=client)
+
+    # when two prompts are completed as a stream, then the finished one is
+    # yielded before the error is raised
+    streamed = []
+    with pytest.raises(httpx.DecodingError):
+        async for item in worker.complete_stream(["a", "b"]):
+            streamed.append(item)
+    assert streamed == [(0, CompletionResponse(completion="a", tokens=1))]
@@ -3,14 +3,23 @@ from pathlib import Path
 
 import pytest
 
-from procurement_api.intake import CommodityGroupNotFoundException, Intake
+from procurement_api import intake as intake_module
+from procurement_api.intake import (
+    CommodityGroupNotFoundException,
+    Intake,
+    InvalidStatusTransitionException,
+    TooManyRequestsSelectedException,
+)
 from procurement_api.models.commodity_group import CommodityGroupInfo
 from procurement_api.models.procurement import OrderLine, ProcurementRequestCreate
 from procurement_api.repository import (
     InMemoryRepository,
     ProcurementRequestStatus,
     Repository,
+    RequestFilter,
+    VersionConflictException,
 )
+from tests.repository_test import make_request
 
 
 @pytest.fixture
@@ -339,3 +348,202 @@ def test_commodity_groups_are_immutable(intake: Intake):
     # then they are the same set
     assert groups1 == groups2
     assert groups1 is groups2  # Same object reference
+
+
+def test_create_procurement_requests_skips_invalid_commodity_groups(intake: Intake):
+    # given a batch with one invalid commodity group
+    def make(commodity_group: str) -> ProcurementRequestCreate:
+        return ProcurementRequestCreate(
+            requestor_name="Alice Smith",
+            title="Software Licenses",
+            vendor_name="Adobe Inc",
+            vat_id="DE123456789",
+            commodity_group=commodity_group,
+            order_lines=[
+                OrderLine(
+                    position_description="Adobe Creative Cloud",
+                    unit_price=500.0,
+                    amount=10,
+                    unit="licenses",
+                    total_price=5000.0,
+                )
+            ],
+            total_cost=5000.0,
+            department="Design",
+        )
+
+    # when we create the batch
+    results = intake.create_procurement_requests(
+        [make("Software"), make("InvalidGroup"), make("Hardware")]
+    )
+
+    # then only the valid requests are stored, in input order
+    assert results[1] is None
+    assert [r.request.commodity_group for r in results if r] == [
+        "Software",
+        "Hardware",
+    ]
+    assert len(intake.get_all_requests()) == 2
+
+
+def test_iter_requests_pages_through_the_repository(
+    intake: Intake, monkeypatch: pytest.MonkeyPatch
+):
+    # given more requests than fit on one page
+    monkeypatch.setattr(intake_module, "ITER_PAGE_SIZE", 2)
+    request = ProcurementRequestCreate(
+        requestor_name="Alice Smith",
+        title="Software Licenses",
+        vendor_name="Adobe Inc",
+        vat_id="DE123456789",
+        commodity_group="Software",
+        order_lines=[
+            OrderLine(
+                position_description="Adobe Creative Cloud",
+                unit_price=500.0,
+                amount=10,
+                unit="licenses",
+                total_price=5000.0,
+            )
+        ],
+        total_cost=5000.0,
+        department="Design",
+    )
+    ids = [intake.create_procurement_request(request)["id"] for _ in range(5)]
+
+    # when we iterate over all requests
+    iterated = [r.id for r in intake.iter_requests()]
+
+    # then every request is returned once, in creation order
+    assert iterated == ids
+
+
+def test_update_request_status_rejects_moving_backwards(intake: Intake):
+    # given a closed request
+    stored = intake.create_procurement_requests([make_request()])[0]
+    assert stored is not None
+    intake.update_request_status(stored.id, ProcurementRequestStatus.IN_PROGRESS)
+    intake.update_request_status(stored.id, ProcurementRequestStatus.CLOSED)
+
+    # when we try to reopen it
+    # then the transition is rejected
+    with pytest.raises(InvalidStatusTransitionException):
+        intake.update_request_status(stored.id, ProcurementRequestStatus.OPEN)
+
+
+def test_update_request_status_rejects_skipping_in_progress(intake: Intake):
+    # given an open request
+    stored = intake.create_procurement_requests([make_request()])[0]
+    assert stored is not None
+
+    # when we close it before it was in progress
+    # then the transition is rejected and the request stays open
+    with pytest.raises(InvalidStatusTransitionException):
+        intake.update_request_status(stored.id, ProcurementRequestStatus.CLOSED)
+    unchanged = intake.get_request_by_id(stored.id)
+    assert unchanged is not None
+    assert unchanged.status == ProcurementRequestStatus.OPEN
+
+
+def test_update_request_status_to_the_current_status_changes_nothing(
+    intake: Intake,
+):
+    # given a closed request
+    stored = intake.create_procurement_requests([make_request()])[0]
+    assert stored is not None
+    intake.update_request_status(stored.id, ProcurementRequestStatus.IN_PROGRESS)
+    closed = intake.update_request_status(stored.id, ProcurementRequestStatus.CLOSED)
+    assert closed is not None
+
+    # when we close it again
+    updated = intake.update_request_status(stored.id, ProcurementRequestStatus.CLOSED)
+
+    # then the request is returned unchanged
+    assert updated is not None
+    assert updated.status == ProcurementRequestStatus.CLOSED
+    assert updated.version == closed.version
+
+
+def test_update_request_status_checks_expected_version(intake: Intake):
+    # given a request that was moved to in progress
+    stored = intake.create_procurement_requests([make_request()])[0]
+    assert stored is not None
+    intake.update_request_status(stored.id, ProcurementRequestStatus.IN_PROGRESS)
+
+    # when we close it expecting the version before that change
+    # then the update is rejected
+    with pytest.raises(VersionConflictException):
+        intake.update_request_status(
+            stored.id, ProcurementRequestStatus.CLOSED, expected_version=1
+        )
+
+
+def test_update_request_status_retries_lost_races(
+    temp_commodity_groups_file: str,
+):
+    # given a request in progress, in a repository where another writer gets
+    # in first once
+    class RacingRepository(InMemoryRepository):
+        raced = False
+
+        def update_status(self, request_id, status, expected_version=None):
+            if status == ProcurementRequestStatus.CLOSED and not self.raced:
+                self.raced = True
+                super().update_status(request_id, ProcurementRequestStatus.IN_PROGRESS)
+            return super().update_status(request_id, status, expected_version)
+
+    intake = Intake(temp_commodity_groups_file, RacingRepository())
+    stored = intake.create_procurement_requests([make_request()])[0]
+    assert stored is not None
+    intake.update_request_status(stored.id, ProcurementRequestStatus.IN_PROGRESS)
+
+    # when we close the request
+    updated = intake.update_request_status(stored.id, ProcurementRequestStatus.CLOSED)
+
+    # then the update is applied on top of the concurrent change
+    assert updated is not None
+    assert updated.status == ProcurementRequestStatus.CLOSED
+    assert updated.version == 4
+
+
+def test_update_request_statuses_by_filter(intake: Intake):
+    # given open requests of two vendors, one of which is already in progress
+    adobe, dell, started = intake.create_procurement_requests(
+        [make_request(), make_request(vendor_name="Dell"), make_request()]
+    )
+    assert adobe is not None and dell is not None and started is not None
+    intake.update_request_status(started.id, ProcurementRequestStatus.IN_PROGRESS)
+
+    # when we move all requests of the first vendor to in progress
+    summary = intake.update_request_statuses(
+        ProcurementRequestStatus.IN_PROGRESS,
+        criteria=RequestFilter(vendor_name="Adobe Inc"),
+    )
+
+    # then its open request is moved and the started one is left as it is
+    assert summary.updated == [adobe.id]
+    assert summary.rejected == {}
+    assert summary.unchanged == [started.id]
+    untouched = intake.get_request_by_id(dell.id)
+    assert untouched is not None
+    assert untouched.status == ProcurementRequestStatus.OPEN
+
+
+def test_update_request_statuses_caps_the_requests_of_a_filter(
+    intake: Intake, monkeypatch: pytest.MonkeyPatch
+):
+    # given a cap of two requests and three matching requests
+    monkeypatch.setattr(intake_module, "MAX_BULK_STATUS_IDS", 2)
+    stored = intake.create_procurement_requests([make_request() for _ in range(3)])
+
+    # when we move all of them to in progress by filter
+    # then the update is rejected and no request changed
+    with pytest.raises(TooManyRequestsSelectedException):
+        intake.update_request_statuses(
+            ProcurementRequestStatus.IN_PROGRESS,
+            criteria=RequestFilter(vendor_name="Adobe Inc"),
+        )
+    assert all(
+        request is not None and request.status == ProcurementRequestStatus.OPEN
+        for request in stored
+    )
@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from procurement_api.journal import JournaledRepository
+from procurement_api.models.procurement import OrderLine, ProcurementRequestCreate
+from procurement_api.repository import ProcurementRequestStatus, RequestFilter
+
+
+def make_request() -> ProcurementRequestCreate:
+    return ProcurementRequestCreate(
+        requestor_name="Alice Smith",
+        title="Software Licenses",
+        vendor_name="Adobe Inc",
+        vat_id="DE123456789",
+        commodity_group="Software",
+        order_lines=[
+            OrderLine(
+                position_description="Adobe Creative Cloud",
+                unit_price=500.0,
+                amount=10,
+                unit="licenses",
+                total_price=5000.0,
+            )
+        ],
+        total_cost=5000.0,
+        department="Design",
+    )
+
+
+def test_requests_and_status_changes_survive_restart(tmp_path: Path):
+    # given a repository with a stored and an updated request
+    repository = JournaledRepository(str(tmp_path))
+    first = repository.store_procurement_request(make_request())
+    second = repository.store_procurement_request(make_request())
+    repository.update_status(second.id, ProcurementRequestStatus.IN_PROGRESS)
+    repository.close()
+
+    # when we open the repository again
+    reopened = JournaledRepository(str(tmp_path))
+
+    # then the requests and their status are restored, including the indexes
+    assert [r.to_dict() for r in reopened.get_all()] == [
+        first.to_dict(),
+        second.to_dict(),
+    ]
+    in_progress = reopened.find(
+        RequestFilter(status=ProcurementRequestStatus.IN_PROGRESS)
+    )
+    assert [r.id for r in in_progress] == [second.id]
+    assert reopened.recovery.requests == 2
+    assert reopened.recovery.journal_records == 3
+    reopened.close()
+
+
+def test_snapshot_compacts_the_journal(tmp_path: Path):
+    # given a repository that snapshots every three changes
+    repository = JournaledRepository(str(tmp_path), snapshot_every=3)
+    stored = [repository.store_procurement_request(make_request()) for _ in range(4)]
+    repository.close()
+
+    # when we open the repository again
+    reopened = JournaledRepository(str(tmp_path))
+
+    # then the state comes from the snapshot plus the remaining journal
+    assert [r.id for r in reopened.get_all()] == [r.id for r in stored]
+    assert reopened.recovery.snapshot_records == 3
+    assert reopened.recovery.journal_records == 1
+    reopened.close()
+
+
+def test_clear_is_journaled(tmp_path: Path):
+    # given a repository that was cleared after storing a request
+    repository = JournaledRepository(str(tmp_path))
+    repository.store_procurement_request(make_request())
+    repository.clear()
+    repository.close()
+
+    # when we open the repository again
+    reopened = JournaledRepository(str(tmp_path))
+
+    # then it is still empty
+    assert reopened.get_all() == []
+    reopened.close()
+
+
+def test_torn_last_record_is_dropped(tmp_path: Path):
+    # given a journal whose last record was only partially written
+    repository = JournaledRepository(str(tmp_path))
+    stored = repository.store_procurement_request(make_request())
+    repository.close()
+    with open(tmp_path / "journal.jsonl", "ab") as f:
+        f.write(b'{"op":"status","id":')
+
+    # when we open the repository again
+    reopened = JournaledRepository(str(tmp_path))
+
+    # then the complete records are restored and the torn one is cut off
+    assert [r.id for r in reopened.get_all()] == [stored.id]
+    assert (tmp_path / "journal.jsonl").read_bytes().endswith(b"\n")
+    reopened.close()
+
+
+def test_concurrent_writes_share_fsyncs(tmp_path: Path):
+    # given a journaled repository
+    repository = JournaledRepository(str(tmp_path))
+
+    # when many threads store requests at the same time
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(
+            executor.map(
+                lambda _: repository.store_procurement_request(make_request()),
+                range(64),
+            )
+        )
+
+    # then every record is written and no more fsyncs than records happen
+    stats = repository.journal_stats()
+    assert stats.records == 64
+    assert stats.fsyncs <= 64
+    repository.close()
+
+
+def test_bulk_status_changes_survive_restart(tmp_path: Path):
+    # given requests that were closed together
+    repository = JournaledRepository(str(tmp_path))
+    stored = repository.store_many([make_request(), make_request()])
+    repository.update_status_many(
+        [r.id for r in stored],
+        ProcurementRequestStatus.CLOSED,
+        allowed_from={ProcurementRequestStatus.OPEN},
+    )
+    repository.close()
+
+    # when we open the repository again
+    reopened = JournaledRepository(str(tmp_path))
+
+    # then both are closed
+    closed = reopened.find(RequestFilter(status=ProcurementRequestStatus.CLOSED))
+    assert [r.id for r in closed] == [r.id for r in stored]
+    assert [r.version for r in closed] == [2, 2]
+    reopened.close()
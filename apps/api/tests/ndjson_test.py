@@ -0,0 +1,31 @@
+from typing import AsyncIterator
+
+import pytest
+
+from procurement_api.ndjson import LineTooLongError, iter_lines
+
+
+async def chunks(*parts: bytes) -> AsyncIterator[bytes]:
+    for part in parts:
+        yield part
+
+
+async def test_lines_are_split_across_chunks():
+    # when chunks that split lines are read
+    lines = [line async for line in iter_lines(chunks(b'{"a"', b':1}\n{"b":2', b"}"))]
+
+    # then the lines are whole
+    assert lines == [b'{"a":1}', b'{"b":2}']
+
+
+async def test_line_longer_than_the_limit_raises():
+    # given a stream whose second line never ends
+    stream = chunks(b"short\n", b"x" * 8, b"x" * 8)
+
+    # when it is read with a limit of ten bytes per line, then the lines
+    # before are yielded and the long one raises
+    lines = []
+    with pytest.raises(LineTooLongError):
+        async for line in iter_lines(stream, max_length=10):
+            lines.append(line)
+    assert lines == [b"short"]
@@ -0,0 +1,99 @@
+import pytest
+
+from procurement_api.prompt_cache import CachingWorker, PromptCacheStats
+from procurement_api.worker import CompletionResponse, WorkerApi
+from tests.batcher_test import RecordingWorker
+
+
+async def test_repeated_prompts_are_answered_from_the_cache():
+    # given a caching worker that completed a prompt before
+    worker = RecordingWorker()
+    cache = CachingWorker(worker)
+    await cache.complete(["hello"])
+
+    # when the prompt is completed again together with a new one
+    responses = await cache.complete(["hello", "world!"])
+
+    # then only the new prompt was sent to the worker
+    assert worker.batches == [["hello"], ["world!"]]
+    assert [response.completion for response in responses] == ["hello", "world!"]
+    assert cache.stats() == PromptCacheStats(
+        hits=1, misses=2, tokens_saved=5, entries=2, tokens=15
+    )
+
+
+async def test_identical_prompts_of_a_batch_are_sent_once():
+    # given a caching worker
+    worker = RecordingWorker()
+    cache = CachingWorker(worker)
+
+    # when a batch repeats a prompt
+    responses = await cache.complete(["a", "bb", "a", "a"])
+
+    # then the worker completed it once and every prompt got its completion
+    assert worker.batches == [["a", "bb"]]
+    assert [response.completion for response in responses] == ["a", "bb", "a", "a"]
+    assert cache.stats().hits == 2
+    assert cache.stats().tokens_saved == 2
+
+
+async def test_least_recently_used_completions_are_evicted():
+    # given a caching worker for eight tokens, holding two prompts and
+    # completions of four tokens each
+    worker = RecordingWorker()
+    cache = CachingWorker(worker, max_tokens=8, count_tokens=len)
+    await cache.complete(["aa", "bb"])
+    await cache.complete(["aa"])
+
+    # when four more tokens are cached
+    await cache.complete(["cc"])
+
+    # then the least recently used completion was evicted
+    await cache.complete(["aa", "bb"])
+    assert worker.batches == [["aa", "bb"], ["cc"], ["bb"]]
+    assert cache.stats().tokens <= 8
+
+
+async def test_completions_larger_than_the_cache_are_not_cached():
+    # given a caching worker for three tokens
+    worker = RecordingWorker()
+    cache = CachingWorker(worker, max_tokens=3)
+
+    # when a prompt with a larger completion is completed twice
+    await cache.complete(["abcd"])
+    await cache.complete(["abcd"])
+
+    # then it was sent to the worker both times
+    assert worker.batches == [["abcd"], ["abcd"]]
+    assert cache.stats().entries == 0
+
+
+async def test_prompts_with_empty_completions_are_evicted():
+    # given a caching worker for a hundred tokens and a worker whose
+    # completions are empty, e.g. cut off at zero tokens
+    class EmptyWorker(WorkerApi):
+        async def complete(self, prompts: list[str]) -> list[CompletionResponse]:
+            return [CompletionResponse(completion="", tokens=0) for _ in prompts]
+
+    cache = CachingWorker(EmptyWorker(), max_tokens=100, count_tokens=len)
+
+    # when many long prompts are completed
+    for index in range(100):
+        await cache.complete([f"{index:03} " + "x" * 20])
+
+    # then their prompts count against the budget and old ones are evicted
+    assert cache.stats().tokens <= 100
+    assert cache.stats().entries == 4
+
+
+async def test_errors_of_the_worker_are_not_cached():
+    # given a caching worker for a failing worker
+    worker = RecordingWorker(error=ConnectionError("refused"))
+    cache = CachingWorker(worker)
+
+    # when a prompt is completed, then the error is raised
+    with pytest.raises(ConnectionError):
+        await cache.complete(["a"])
+
+    # and nothing was cached
+    assert cache.stats().entries == 0
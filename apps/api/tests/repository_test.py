@@ -0,0 +1,234 @@
+import json
+from datetime import timedelta
+
+import pytest
+
+from procurement_api.models.procurement import OrderLine, ProcurementRequestCreate
+from procurement_api.repository import (
+    InMemoryRepository,
+    PageCursor,
+    ProcurementRequestStatus,
+    RequestFilter,
+    VersionConflictException,
+)
+
+
+def make_request(
+    vendor_name: str = "Adobe Inc",
+    commodity_group: str = "Software",
+    department: str = "Design",
+) -> ProcurementRequestCreate:
+    return ProcurementRequestCreate(
+        requestor_name="Alice Smith",
+        title="Software Licenses",
+        vendor_name=vendor_name,
+        vat_id="DE123456789",
+        commodity_group=commodity_group,
+        order_lines=[
+            OrderLine(
+                position_description="Adobe Creative Cloud",
+                unit_price=500.0,
+                amount=10,
+                unit="licenses",
+                total_price=5000.0,
+            )
+        ],
+        total_cost=5000.0,
+        department=department,
+    )
+
+
+@pytest.fixture
+def repository():
+    """Create a fresh in-memory repository for each test."""
+    return InMemoryRepository()
+
+
+def test_find_without_criteria_returns_all_requests(repository: InMemoryRepository):
+    # given two stored requests
+    first = repository.store_procurement_request(make_request())
+    second = repository.store_procurement_request(make_request(vendor_name="Dell"))
+
+    # when we find without any criteria
+    found = repository.find(RequestFilter())
+
+    # then we get all requests in creation order
+    assert found == [first, second]
+
+
+def test_find_combines_criteria(repository: InMemoryRepository):
+    # given requests for different vendors and departments
+    match = repository.store_procurement_request(
+        make_request(vendor_name="Dell", department="IT")
+    )
+    repository.store_procurement_request(
+        make_request(vendor_name="Dell", department="Design")
+    )
+    repository.store_procurement_request(
+        make_request(vendor_name="Adobe Inc", department="IT")
+    )
+
+    # when we filter by vendor and department
+    found = repository.find(RequestFilter(vendor_name="Dell", department="IT"))
+
+    # then only the request matching both criteria is returned
+    assert found == [match]
+
+
+def test_find_returns_empty_list_for_unknown_value(repository: InMemoryRepository):
+    # given a stored request
+    repository.store_procurement_request(make_request())
+
+    # when we filter by a commodity group nobody uses
+    found = repository.find(RequestFilter(commodity_group="Hardware"))
+
+    # then nothing is returned
+    assert found == []
+
+
+def test_update_status_keeps_status_index_in_sync(repository: InMemoryRepository):
+    # given two open requests
+    first = repository.store_procurement_request(make_request())
+    second = repository.store_procurement_request(make_request())
+
+    # when we move the first one to in progress
+    updated = repository.update_status(first.id, ProcurementRequestStatus.IN_PROGRESS)
+
+    # then the status lookups reflect the change
+    assert updated is first
+    assert repository.find(RequestFilter(status=ProcurementRequestStatus.OPEN)) == [
+        second
+    ]
+    assert repository.find(
+        RequestFilter(status=ProcurementRequestStatus.IN_PROGRESS)
+    ) == [first]
+
+
+def test_update_status_returns_none_for_nonexistent_id(
+    repository: InMemoryRepository,
+):
+    # when we update a request that does not exist
+    updated = repository.update_status(
+        "non-existent-id", ProcurementRequestStatus.CLOSED
+    )
+
+    # then we get None
+    assert updated is None
+
+
+def test_clear_empties_the_indexes(repository: InMemoryRepository):
+    # given a stored request
+    repository.store_procurement_request(make_request())
+
+    # when we clear the repository
+    repository.clear()
+
+    # then filtered lookups find nothing
+    assert repository.find(RequestFilter(status=ProcurementRequestStatus.OPEN)) == []
+
+
+def test_find_pages_through_requests_with_cursor(repository: InMemoryRepository):
+    # given five stored requests
+    stored = [repository.store_procurement_request(make_request()) for _ in range(5)]
+
+    # when we page through them two at a time
+    pages = []
+    after = None
+    while page := repository.find(RequestFilter(), after=after, limit=2):
+        pages.append(page)
+        after = PageCursor(created_at=page[-1].created_at, id=page[-1].id)
+
+    # then every request is returned exactly once, in order
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [r for page in pages for r in page] == stored
+
+
+def test_find_filters_by_creation_date_range(repository: InMemoryRepository):
+    # given three stored requests
+    first, second, third = [
+        repository.store_procurement_request(make_request()) for _ in range(3)
+    ]
+
+    if second.created_at == third.created_at:
+        pytest.skip("timestamps collided")
+
+    # when we filter on a range starting at the second and ending at the third
+    found = repository.find(
+        RequestFilter(created_from=second.created_at, created_to=third.created_at)
+    )
+
+    # then the range includes its start and excludes its end
+    assert found == [second]
+    assert first not in repository.find(
+        RequestFilter(created_from=first.created_at + timedelta(days=1))
+    )
+
+
+def test_to_json_matches_to_dict(repository: InMemoryRepository):
+    # given a stored request
+    stored = repository.store_procurement_request(make_request())
+
+    # when we encode it as JSON
+    encoded = stored.to_json()
+
+    # then it decodes to the dictionary representation
+    assert json.loads(encoded) == stored.to_dict()
+
+
+def test_to_json_follows_status_changes(repository: InMemoryRepository):
+    # given a stored request that was encoded before
+    stored = repository.store_procurement_request(make_request())
+    stored.to_json()
+
+    # when its status changes
+    repository.update_status(stored.id, ProcurementRequestStatus.CLOSED)
+
+    # then the encoding reflects the new status
+    assert json.loads(stored.to_json())["status"] == "closed"
+
+
+def test_update_status_compares_versions(repository: InMemoryRepository):
+    # given a stored request at its first version
+    stored = repository.store_procurement_request(make_request())
+    assert stored.version == 1
+
+    # when we update it expecting that version
+    updated = repository.update_status(
+        stored.id, ProcurementRequestStatus.IN_PROGRESS, expected_version=1
+    )
+
+    # then the version is incremented
+    assert updated is not None
+    assert updated.version == 2
+
+    # and an update expecting the old version is rejected
+    with pytest.raises(VersionConflictException):
+        repository.update_status(
+            stored.id, ProcurementRequestStatus.CLOSED, expected_version=1
+        )
+    assert stored.status == ProcurementRequestStatus.IN_PROGRESS
+
+
+def test_update_status_many_reports_every_request(repository: InMemoryRepository):
+    # given an open, an in progress and a closed request
+    open_request = repository.store_procurement_request(make_request())
+    started = repository.store_procurement_request(make_request())
+    repository.update_status(started.id, ProcurementRequestStatus.IN_PROGRESS)
+    closed_request = repository.store_procurement_request(make_request())
+    repository.update_status(closed_request.id, ProcurementRequestStatus.CLOSED)
+
+    # when we close all of them and a request that does not exist
+    summary = repository.update_status_many(
+        [open_request.id, started.id, closed_request.id, "non-existent-id"],
+        ProcurementRequestStatus.CLOSED,
+        allowed_from={ProcurementRequestStatus.OPEN},
+    )
+
+    # then only the open request is updated and the others are reported
+    assert summary.updated == [open_request.id]
+    assert summary.not_found == ["non-existent-id"]
+    assert summary.rejected == {started.id: ProcurementRequestStatus.IN_PROGRESS}
+    assert summary.unchanged == [closed_request.id]
+    assert closed_request.version == 2
+    assert repository.find(RequestFilter(status=ProcurementRequestStatus.OPEN)) == []
+    assert open_request.version == 2
@@ -1,22 +1,38 @@
 import asyncio
+import csv
+import io
+import json
+from base64 import urlsafe_b64encode
+from typing import Iterator, Sequence
 
 from fastapi.testclient import TestClient
 
 from procurement_api.config import AppConfig
-from procurement_api.intake import CommodityGroupNotFoundException, IntakeApi
+from procurement_api.intake import (
+    STATUS_TRANSITIONS,
+    CommodityGroupNotFoundException,
+    IntakeApi,
+    InvalidStatusTransitionException,
+)
 from procurement_api.models.commodity_group import CommodityGroupInfo
 from procurement_api.models.procurement import OrderLine, ProcurementRequestCreate
 from procurement_api.repository import (
+    PageCursor,
     ProcurementRequestStatus,
     ProcurementRequestStored,
+    RequestFilter,
+    StatusUpdateSummary,
+    VersionConflictException,
 )
 from procurement_api.shell import Shell, build_app
+from tests.repository_test import make_request
 
 
 class StubIntake(IntakeApi):
     def __init__(self) -> None:
         self.commodity_groups: set[CommodityGroupInfo] = set()
         self.requests: dict[str, ProcurementRequestStored] = {}
+        self.last_criteria: RequestFilter | None = None
 
     def get_commodity_groups(self) -> set[CommodityGroupInfo]:
         return {CommodityGroupInfo(category="Information Technology", name="Software")}
@@ -37,20 +53,82 @@ class StubIntake(IntakeApi):
             "status": stored.status.value,
         }
 
-    def get_all_requests(self) -> list[ProcurementRequestStored]:
-        return list(self.requests.values())
+    def create_procurement_requests(
+        self, requests: Sequence[ProcurementRequestCreate]
+    ) -> list[ProcurementRequestStored | None]:
+        results: list[ProcurementRequestStored | None] = []
+        for request in requests:
+            if not self.is_valid_commodity_group(request.commodity_group):
+                results.append(None)
+                continue
+            stored = ProcurementRequestStored(request)
+            self.requests[stored.id] = stored
+            results.append(stored)
+        return results
+
+    def get_all_requests(
+        self,
+        criteria: RequestFilter = RequestFilter(),
+        after: PageCursor | None = None,
+        limit: int | None = None,
+    ) -> list[ProcurementRequestStored]:
+        self.last_criteria = criteria
+        requests = sorted(self.requests.values(), key=lambda r: (r.created_at, r.id))
+        if after is not None:
+            requests = [r for r in requests if (r.created_at, r.id) > after]
+        return requests if limit is None else requests[:limit]
+
+    def iter_requests(
+        self, criteria: RequestFilter = RequestFilter()
+    ) -> Iterator[ProcurementRequestStored]:
+        self.last_criteria = criteria
+        return iter(list(self.requests.values()))
 
     def get_request_by_id(self, request_id: str) -> ProcurementRequestStored | None:
         return self.requests.get(request_id)
 
     def update_request_status(
-        self, request_id: str, status: ProcurementRequestStatus
+        self,
+        request_id: str,
+        status: ProcurementRequestStatus,
+        expected_version: int | None = None,
     ) -> ProcurementRequestStored | None:
         request = self.requests.get(request_id)
-        if request:
-            request.status = status
+        if request is None:
+            return None
+        if expected_version is not None and request.version != expected_version:
+            raise VersionConflictException(
+                request_id, expected_version, request.version
+            )
+        if status not in STATUS_TRANSITIONS[request.status]:
+            raise InvalidStatusTransitionException()
+        request.status = status
+        request.version += 1
         return request
 
+    def update_request_statuses(
+        self,
+        status: ProcurementRequestStatus,
+        request_ids: Sequence[str] = (),
+        criteria: RequestFilter | None = None,
+    ) -> StatusUpdateSummary:
+        self.last_criteria = criteria
+        summary = StatusUpdateSummary(
+            updated=[], not_found=[], rejected={}, unchanged=[]
+        )
+        for request_id in request_ids:
+            request = self.requests.get(request_id)
+            if request is None:
+                summary.not_found.append(request_id)
+            elif request.status == status:
+                summary.unchanged.append(request_id)
+            elif status not in STATUS_TRANSITIONS[request.status]:
+                summary.rejected[request_id] = request.status
+            else:
+                request.status = status
+                summary.updated.append(request_id)
+        return summary
+
 
 async def test_shell_can_be_shutdown(config: AppConfig):
     # Given a running shell
@@ -313,6 +391,119 @@ def test_update_request_status_gives_200():
         assert updated_request["status"] == "in-progress"
 
 
+def test_update_request_status_with_if_match():
+    # given an app with a request
+    stub_intake = StubIntake()
+    app = build_app(stub_intake)
+    request_id = stub_intake.create_procurement_request(make_request())["id"]
+
+    with TestClient(app) as client:
+        # when we fetch the request
+        response = client.get(f"/intake/requests/{request_id}")
+
+        # then its version is the ETag
+        etag = response.headers["ETag"]
+        assert etag == '"1"'
+
+        # and updating that version gives the next ETag
+        response = client.patch(
+            f"/intake/requests/{request_id}/status",
+            json={"status": "in-progress"},
+            headers={"If-Match": etag},
+        )
+        assert response.status_code == 200
+        assert response.headers["ETag"] == '"2"'
+
+        # and updating the old version again fails the precondition
+        response = client.patch(
+            f"/intake/requests/{request_id}/status",
+            json={"status": "closed"},
+            headers={"If-Match": etag},
+        )
+        assert response.status_code == 412
+        assert response.headers["ETag"] == '"2"'
+
+
+def test_update_request_status_backwards_gives_409():
+    # given an app with a closed request
+    stub_intake = StubIntake()
+    app = build_app(stub_intake)
+    request_id = stub_intake.create_procurement_request(make_request())["id"]
+    stub_intake.update_request_status(request_id, ProcurementRequestStatus.IN_PROGRESS)
+    stub_intake.update_request_status(request_id, ProcurementRequestStatus.CLOSED)
+
+    # when we try to reopen it
+    with TestClient(app) as client:
+        response = client.patch(
+            f"/intake/requests/{request_id}/status", json={"status": "open"}
+        )
+
+    # then we get a conflict
+    assert response.status_code == 409
+
+
+def test_bulk_update_request_statuses_by_ids():
+    # given an app with an open, an in progress and a closed request
+    stub_intake = StubIntake()
+    app = build_app(stub_intake)
+    open_id = stub_intake.create_procurement_request(make_request())["id"]
+    started_id = stub_intake.create_procurement_request(make_request())["id"]
+    closed_id = stub_intake.create_procurement_request(make_request())["id"]
+    stub_intake.update_request_status(started_id, ProcurementRequestStatus.IN_PROGRESS)
+    stub_intake.update_request_status(closed_id, ProcurementRequestStatus.IN_PROGRESS)
+    stub_intake.update_request_status(closed_id, ProcurementRequestStatus.CLOSED)
+
+    # when we move all of them and a request that does not exist to in progress
+    with TestClient(app) as client:
+        response = client.patch(
+            "/intake/requests/status",
+            json={
+                "status": "in-progress",
+                "ids": [open_id, started_id, closed_id, "missing"],
+            },
+        )
+
+    # then we get the updated and unchanged IDs and the reason for each failure
+    assert response.status_code == 200
+    assert response.json() == {
+        "updated": [open_id],
+        "unchanged": [started_id],
+        "failed": {
+            "missing": "Not found.",
+            closed_id: "Cannot change status from 'closed' to 'in-progress'.",
+        },
+    }
+
+
+def test_bulk_update_request_statuses_by_filter():
+    # given an app
+    stub_intake = StubIntake()
+    app = build_app(stub_intake)
+
+    # when we close all requests of a vendor
+    with TestClient(app) as client:
+        response = client.patch(
+            "/intake/requests/status",
+            json={"status": "closed", "filter": {"vendor_name": "Adobe Inc"}},
+        )
+
+    # then the filter is handed to the intake
+    assert response.status_code == 200
+    assert stub_intake.last_criteria == RequestFilter(vendor_name="Adobe Inc")
+
+
+def test_bulk_update_request_statuses_needs_ids_or_filter():
+    # given an app
+    app = build_app(StubIntake())
+
+    # when we neither give IDs nor a filter
+    with TestClient(app) as client:
+        response = client.patch("/intake/requests/status", json={"status": "closed"})
+
+    # then the request is rejected
+    assert response.status_code == 422
+
+
 def test_update_request_status_gives_404():
     # given an app
     app = build_app(StubIntake())
@@ -327,3 +518,281 @@ def test_update_request_status_gives_404():
         # then we get a 404 not found response
         assert response.status_code == 404
         assert "not found" in response.json()["detail"].lower()
+
+
+def test_get_all_requests_pages_with_cursor():
+    # given an app with three requests
+    stub_intake = StubIntake()
+    app = build_app(stub_intake)
+    for name in ["Alice Smith", "Bob Jones", "Charlie Brown"]:
+        stub_intake.create_procurement_request(
+            ProcurementRequestCreate(
+                requestor_name=name,
+                title="Software Licenses",
+                vendor_name="Software Inc",
+                vat_id="DE222222222",
+                commodity_group="Software",
+                order_lines=[
+                    OrderLine(
+                        position_description="MS Office License",
+                        unit_price=100.0,
+                        amount=5,
+                        unit="licenses",
+                        total_price=500.0,
+                    )
+                ],
+                total_cost=500.0,
+                department="Engineering",
+            )
+        )
+
+    with TestClient(app) as client:
+        # when we request the first page of two
+        first_page = client.get("/intake/requests", params={"limit": 2})
+
+        # then we get two requests and a cursor for the next page
+        assert first_page.status_code == 200
+        assert len(first_page.json()) == 2
+        cursor = first_page.headers["X-Next-Cursor"]
+
+        # and when we follow the cursor
+        second_page = client.get(
+            "/intake/requests", params={"limit": 2, "cursor": cursor}
+        )
+
+        # then we get the remaining request and no further cursor
+        assert second_page.status_code == 200
+        assert [r["request"]["requestor_name"] for r in second_page.json()] == [
+            "Charlie Brown"
+        ]
+        assert "X-Next-Cursor" not in second_page.headers
+
+
+def test_get_all_requests_passes_filters_to_intake():
+    # given an app
+    stub_intake = StubIntake()
+    app = build_app(stub_intake)
+
+    # when we filter the requests
+    with TestClient(app) as client:
+        response = client.get(
+            "/intake/requests",
+            params={
+                "status": "open",
+                "commodity_group": "Software",
+                "vendor_name": "Adobe",
+                "created_from": "2025-01-01T00:00:00",
+            },
+        )
+
+    # then the filter is handed to the intake
+    assert response.status_code == 200
+    assert stub_intake.last_criteria is not None
+    assert stub_intake.last_criteria.status == ProcurementRequestStatus.OPEN
+    assert stub_intake.last_criteria.commodity_group == "Software"
+    assert stub_intake.last_criteria.vendor_name == "Adobe"
+    assert stub_intake.last_criteria.created_from is not None
+    assert stub_intake.last_criteria.created_from.tzinfo is not None
+
+
+def test_get_all_requests_with_invalid_cursor_gives_400():
+    # given an app
+    app = build_app(StubIntake())
+
+    # when we pass a cursor that was not issued by the API
+    with TestClient(app) as client:
+        response = client.get("/intake/requests", params={"cursor": "not-a-cursor"})
+
+        # then we get a 400 bad request response
+        assert response.status_code == 400
+
+
+def test_get_all_requests_with_naive_cursor_gives_400():
+    # given an app
+    app = build_app(StubIntake())
+    cursor = urlsafe_b64encode(b"2025-01-01T00:00:00|some-id").decode()
+
+    # when we pass a cursor without a timezone
+    with TestClient(app) as client:
+        response = client.get("/intake/requests", params={"cursor": cursor})
+
+        # then we get a 400 bad request response
+        assert response.status_code == 400
+
+
+def test_bulk_create_streams_one_result_per_line():
+    # given an app
+    stub_intake = StubIntake()
+    app = build_app(stub_intake)
+    valid = {
+        "requestor_name": "John Doe",
+        "title": "Adobe Creative Cloud Subscription",
+        "vendor_name": "Adobe Systems",
+        "vat_id": "DE123456789",
+        "commodity_group": "Software",
+        "order_lines": [
+            {
+                "position_description": "Adobe Photoshop License",
+                "unit_price": 200.0,
+                "amount": 5,
+                "unit": "licenses",
+                "total_price": 1000.0,
+            }
+        ],
+        "total_cost": 1000.0,
+        "department": "Marketing",
+    }
+    body = "\n".join(
+        [
+            json.dumps(valid),
+            json.dumps({**valid, "commodity_group": "InvalidGroup"}),
+            "",
+            json.dumps({**valid, "order_lines": []}),
+            json.dumps(valid),
+        ]
+    )
+
+    # when we upload the requests as newline delimited JSON
+    with TestClient(app) as client:
+        response = client.post(
+            "/intake/requests/bulk",
+            content=body.encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+    # then we get one result per non-empty line
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["line"] for r in results] == [1, 2, 4, 5]
+    assert results[0]["status"] == "open"
+    assert "Invalid commodity_group" in results[1]["error"]
+    assert results[2]["error"][0]["loc"] == ["order_lines"]
+    assert results[3]["id"] in stub_intake.requests
+    assert len(stub_intake.requests) == 2
+
+
+def test_bulk_create_reports_lines_that_are_not_json():
+    # given an app
+    stub_intake = StubIntake()
+    app = build_app(stub_intake)
+    valid = {
+        "requestor_name": "John Doe",
+        "title": "Adobe Creative Cloud Subscription",
+        "vendor_name": "Adobe Systems",
+        "vat_id": "DE123456789",
+        "commodity_group": "Software",
+        "order_lines": [
+            {
+                "position_description": "Adobe Photoshop License",
+                "unit_price": 200.0,
+                "amount": 5,
+                "unit": "licenses",
+                "total_price": 1000.0,
+            }
+        ],
+        "total_cost": 1000.0,
+        "department": "Marketing",
+    }
+    body = "\n".join([json.dumps(valid), "{not json", json.dumps(valid)])
+
+    # when we upload a line that is not JSON between valid ones
+    with TestClient(app) as client:
+        response = client.post(
+            "/intake/requests/bulk",
+            content=body.encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+    # then the stream reports its error and the IDs of the valid lines
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["line"] for r in results] == [1, 2, 3]
+    assert results[1]["error"][0]["type"] == "json_invalid"
+    assert results[0]["id"] in stub_intake.requests
+    assert results[2]["id"] in stub_intake.requests
+
+
+def make_stub_intake_with_requests() -> StubIntake:
+    stub_intake = StubIntake()
+    for name in ["Alice Smith", "Bob Jones"]:
+        stub_intake.create_procurement_request(
+            ProcurementRequestCreate(
+                requestor_name=name,
+                title="Software Licenses",
+                vendor_name="Software Inc",
+                vat_id="DE222222222",
+                commodity_group="Software",
+                order_lines=[
+                    OrderLine(
+                        position_description="MS Office License",
+                        unit_price=100.0,
+                        amount=5,
+                        unit="licenses",
+                        total_price=500.0,
+                    ),
+                    OrderLine(
+                        position_description="MS Visio License",
+                        unit_price=50.0,
+                        amount=2,
+                        unit="licenses",
+                        total_price=100.0,
+                    ),
+                ],
+                total_cost=600.0,
+                department="Engineering",
+            )
+        )
+    return stub_intake
+
+
+def test_export_requests_as_ndjson():
+    # given an app with two requests
+    app = build_app(make_stub_intake_with_requests())
+
+    # when we export the requests
+    with TestClient(app) as client:
+        response = client.get("/intake/requests/export")
+
+    # then we get one JSON document per line
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["request"]["requestor_name"] for r in records] == [
+        "Alice Smith",
+        "Bob Jones",
+    ]
+
+
+def test_export_requests_as_gzipped_csv():
+    # given an app with two requests of two order lines each
+    app = build_app(make_stub_intake_with_requests())
+
+    # when we export the requests as compressed CSV
+    with TestClient(app) as client:
+        response = client.get(
+            "/intake/requests/export", params={"format": "csv", "gzip": True}
+        )
+
+    # then we get a gzip encoded CSV with one row per order line
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 4
+    assert rows[1]["requestor_name"] == "Alice Smith"
+    assert rows[1]["position_description"] == "MS Visio License"
+
+
+def test_export_passes_filters_to_intake():
+    # given an app
+    stub_intake = StubIntake()
+    app = build_app(stub_intake)
+
+    # when we export only the closed requests
+    with TestClient(app) as client:
+        response = client.get("/intake/requests/export", params={"status": "closed"})
+
+    # then the filter is handed to the intake
+    assert response.status_code == 200
+    assert stub_intake.last_criteria == RequestFilter(
+        status=ProcurementRequestStatus.CLOSED
+    )
@@ -0,0 +1,221 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from procurement_api.models.procurement import OrderLine, ProcurementRequestCreate
+from procurement_api.repository import (
+    PageCursor,
+    ProcurementRequestStatus,
+    RequestFilter,
+    VersionConflictException,
+)
+from procurement_api.sqlite_repository import SqliteRepository
+
+
+def make_request(
+    vendor_name: str = "Adobe Inc", department: str = "Design"
+) -> ProcurementRequestCreate:
+    return ProcurementRequestCreate(
+        requestor_name="Alice Smith",
+        title="Software Licenses",
+        vendor_name=vendor_name,
+        vat_id="DE123456789",
+        commodity_group="Software",
+        order_lines=[
+            OrderLine(
+                position_description="Adobe Photoshop License",
+                unit_price=200.0,
+                amount=5,
+                unit="licenses",
+                total_price=1000.0,
+            ),
+            OrderLine(
+                position_description="Adobe Illustrator License",
+                unit_price=150.0,
+                amount=3,
+                unit="licenses",
+                total_price=450.0,
+            ),
+        ],
+        total_cost=1450.0,
+        department=department,
+    )
+
+
+@pytest.fixture
+def repository(tmp_path: Path):
+    """Create a repository backed by a fresh database file."""
+    repository = SqliteRepository(str(tmp_path / "procurement.db"))
+    yield repository
+    repository.close()
+
+
+def test_stored_request_round_trips(repository: SqliteRepository):
+    # given a stored request
+    request = make_request()
+    stored = repository.store_procurement_request(request)
+
+    # when we load it by id
+    loaded = repository.get_by_id(stored.id)
+
+    # then we get the same request including its order lines in order
+    assert loaded is not None
+    assert loaded.id == stored.id
+    assert loaded.created_at == stored.created_at
+    assert loaded.status == ProcurementRequestStatus.OPEN
+    assert loaded.to_dict() == stored.to_dict()
+
+
+def test_get_by_id_returns_none_for_nonexistent_id(repository: SqliteRepository):
+    # when we load a request that does not exist
+    # then we get None
+    assert repository.get_by_id("non-existent-id") is None
+
+
+def test_find_filters_and_pages(repository: SqliteRepository):
+    # given requests from two vendors
+    dell = [
+        repository.store_procurement_request(make_request(vendor_name="Dell"))
+        for _ in range(3)
+    ]
+    repository.store_procurement_request(make_request(vendor_name="Adobe Inc"))
+
+    # when we page through the Dell requests two at a time
+    criteria = RequestFilter(vendor_name="Dell")
+    first_page = repository.find(criteria, limit=2)
+    after = PageCursor(created_at=first_page[-1].created_at, id=first_page[-1].id)
+    second_page = repository.find(criteria, after=after, limit=2)
+
+    # then we get exactly the Dell requests in creation order
+    assert [r.id for r in first_page + second_page] == [r.id for r in dell]
+
+
+def test_update_status_is_visible_to_readers(repository: SqliteRepository):
+    # given a stored request
+    stored = repository.store_procurement_request(make_request())
+
+    # when we update its status
+    updated = repository.update_status(stored.id, ProcurementRequestStatus.CLOSED)
+
+    # then the new status is returned and can be filtered on
+    assert updated is not None
+    assert updated.status == ProcurementRequestStatus.CLOSED
+    closed = repository.find(RequestFilter(status=ProcurementRequestStatus.CLOSED))
+    assert [r.id for r in closed] == [stored.id]
+
+
+def test_update_status_returns_none_for_nonexistent_id(
+    repository: SqliteRepository,
+):
+    # when we update a request that does not exist
+    # then we get None
+    assert (
+        repository.update_status("non-existent-id", ProcurementRequestStatus.CLOSED)
+        is None
+    )
+
+
+def test_requests_survive_reopening(tmp_path: Path):
+    # given a request stored in a database that is closed afterwards
+    path = str(tmp_path / "procurement.db")
+    repository = SqliteRepository(path)
+    stored = repository.store_procurement_request(make_request())
+    repository.close()
+
+    # when we open the database again
+    reopened = SqliteRepository(path)
+
+    # then the request is still there
+    assert [r.id for r in reopened.get_all()] == [stored.id]
+    reopened.close()
+
+
+def test_concurrent_writes_and_reads(repository: SqliteRepository):
+    # when many threads store and read requests at the same time
+    def store_and_read(_: int) -> str:
+        stored = repository.store_procurement_request(make_request())
+        assert repository.get_by_id(stored.id) is not None
+        return stored.id
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        ids = list(executor.map(store_and_read, range(50)))
+
+    # then every request was stored
+    assert {r.id for r in repository.get_all()} == set(ids)
+
+
+def test_store_many_stores_a_batch(repository: SqliteRepository):
+    # when we store a batch of requests
+    stored = repository.store_many(
+        [make_request(vendor_name="Dell"), make_request(vendor_name="HP")]
+    )
+
+    # then all of them can be loaded with their order lines
+    loaded = repository.get_all()
+    assert [r.to_dict() for r in loaded] == [r.to_dict() for r in stored]
+
+
+def test_update_status_compares_versions(repository: SqliteRepository):
+    # given a request that was updated once
+    stored = repository.store_procurement_request(make_request())
+    repository.update_status(stored.id, ProcurementRequestStatus.IN_PROGRESS)
+
+    # when we update it expecting the first version
+    # then the update is rejected and the request is unchanged
+    with pytest.raises(VersionConflictException):
+        repository.update_status(
+            stored.id, ProcurementRequestStatus.CLOSED, expected_version=1
+        )
+    loaded = repository.get_by_id(stored.id)
+    assert loaded is not None
+    assert loaded.status == ProcurementRequestStatus.IN_PROGRESS
+    assert loaded.version == 2
+
+
+def test_database_without_versions_is_migrated(tmp_path: Path):
+    # given a database created before requests had versions
+    path = str(tmp_path / "procurement.db")
+    repository = SqliteRepository(path)
+    stored = repository.store_procurement_request(make_request())
+    repository.close()
+    connection = sqlite3.connect(path)
+    connection.execute("ALTER TABLE procurement_requests DROP COLUMN version")
+    connection.commit()
+    connection.close()
+
+    # when we open it again
+    reopened = SqliteRepository(path)
+
+    # then existing requests start at the first version
+    loaded = reopened.get_by_id(stored.id)
+    assert loaded is not None
+    assert loaded.version == 1
+    reopened.close()
+
+
+def test_update_status_many_updates_in_one_transaction(repository: SqliteRepository):
+    # given an open, an in-progress and a closed request
+    open_request = repository.store_procurement_request(make_request())
+    started = repository.store_procurement_request(make_request())
+    repository.update_status(started.id, ProcurementRequestStatus.IN_PROGRESS)
+    closed = repository.store_procurement_request(make_request())
+    repository.update_status(closed.id, ProcurementRequestStatus.CLOSED)
+
+    # when we move all of them to in progress
+    summary = repository.update_status_many(
+        [open_request.id, started.id, closed.id, "non-existent-id"],
+        ProcurementRequestStatus.IN_PROGRESS,
+        allowed_from={ProcurementRequestStatus.OPEN},
+    )
+
+    # then only the open request changes
+    assert summary.updated == [open_request.id]
+    assert summary.not_found == ["non-existent-id"]
+    assert summary.rejected == {closed.id: ProcurementRequestStatus.CLOSED}
+    assert summary.unchanged == [started.id]
+    loaded = repository.get_by_id(open_request.id)
+    assert loaded is not None
+    assert loaded.status == ProcurementRequestStatus.IN_PROGRESS
+    assert loaded.version == 2
@@ -0,0 +1,255 @@
+import asyncio
+from typing import AsyncIterator
+
+import httpx
+import pytest
+
+from procurement_api.worker import CompletionResponse, StubWorker, WorkerApi
+from procurement_api.worker_pool import BackendStats, WorkerPool, probe
+from tests.batcher_test import RecordingWorker
+from tests.http_worker_test import make_worker
+
+
+class SlowWorker(WorkerApi):
+    """Stub worker that holds every batch until it is released."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+        self.release = asyncio.Event()
+
+    async def complete(self, prompts: list[str]) -> list[CompletionResponse]:
+        self.batches.append(prompts)
+        await self.release.wait()
+        return await StubWorker().complete(prompts)
+
+
+class StreamingWorker(WorkerApi):
+    """Stub worker that streams the completions of a batch in reverse order."""
+
+    def __init__(self) -> None:
+        self.streamed: list[list[str]] = []
+
+    async def complete(self, prompts: list[str]) -> list[CompletionResponse]:
+        raise AssertionError("the batch should be streamed")
+
+    async def complete_stream(
+        self, prompts: list[str]
+    ) -> AsyncIterator[tuple[int, CompletionResponse]]:
+        self.streamed.append(prompts)
+        for index in reversed(range(len(prompts))):
+            yield index, CompletionResponse(prompts[index], len(prompts[index]))
+
+
+async def test_batches_go_to_the_worker_with_fewer_outstanding_tokens():
+    # given a pool of two workers
+    first, second = SlowWorker(), SlowWorker()
+    pool = WorkerPool([first, second], count_tokens=len)
+
+    # when a long and then a short batch are completed at the same time
+    long_batch = asyncio.create_task(pool.complete(["x" * 100]))
+    await asyncio.sleep(0)
+    short_batch = asyncio.create_task(pool.complete(["a"]))
+    await asyncio.sleep(0)
+
+    # then each worker got one of them
+    assert sorted([first.batches, second.batches]) == [[["a"]], [["x" * 100]]]
+    first.release.set()
+    second.release.set()
+    await asyncio.gather(long_batch, short_batch)
+
+
+async def test_outstanding_batches_are_counted_per_worker():
+    # given a pool of a single slow worker
+    worker = SlowWorker()
+    pool = WorkerPool([worker], count_tokens=len)
+
+    # when two batches are in flight
+    batches = asyncio.gather(pool.complete(["ab"]), pool.complete(["cde"]))
+    await asyncio.sleep(0)
+
+    # then the worker's queue depth and tokens show them
+    assert pool.stats()[0].outstanding_batches == 2
+    assert pool.stats()[0].outstanding_tokens == 5
+
+    # when they are completed
+    worker.release.set()
+    await batches
+
+    # then the completed tokens are counted instead
+    assert pool.stats() == [
+        BackendStats(
+            healthy=True,
+            outstanding_batches=0,
+            outstanding_tokens=0,
+            batches=2,
+            tokens=5,
+            failures=0,
+        )
+    ]
+
+
+async def test_failed_batch_is_retried_on_another_worker():
+    # given a pool of a worker that went down and one that recovered since
+    # the last health check
+    failing = RecordingWorker()
+    recovered = RecordingWorker(error=ConnectionError("refused"))
+    pool = WorkerPool([failing, recovered])
+    await pool.check_health()
+    failing.error, recovered.error = recovered.error, None
+
+    # when a batch is completed
+    responses = await pool.complete(["a"])
+
+    # then the recovered worker completed it
+    assert [response.completion for response in responses] == ["a"]
+    assert [stats.healthy for stats in pool.stats()] == [False, True]
+    assert [stats.failures for stats in pool.stats()] == [1, 0]
+
+
+async def test_unhealthy_workers_get_no_batches():
+    # given a pool with a worker that failed its health check
+    unhealthy = RecordingWorker(error=ConnectionError("refused"))
+    healthy = RecordingWorker()
+    pool = WorkerPool([unhealthy, healthy])
+    await pool.check_health()
+
+    # when batches are completed
+    for prompt in ["a", "b", "c"]:
+        await pool.complete([prompt])
+
+    # then only the healthy worker got them
+    assert unhealthy.batches == [[""]]
+    assert healthy.batches == [[""], ["a"], ["b"], ["c"]]
+
+
+async def test_error_is_raised_when_every_worker_failed():
+    # given a pool of two failing workers
+    pool = WorkerPool(
+        [
+            RecordingWorker(error=ConnectionError("a")),
+            RecordingWorker(error=ConnectionError("b")),
+        ]
+    )
+
+    # when a batch is completed, then the error of the last try is raised
+    with pytest.raises(ConnectionError):
+        await pool.complete(["a"])
+    assert [stats.failures for stats in pool.stats()] == [1, 1]
+
+
+async def test_errors_of_the_batch_are_raised_without_a_retry():
+    # given a pool of two workers that reject the batch, e.g. for a prompt
+    # that is too long
+    request = httpx.Request("POST", "http://worker/v1/completions")
+    rejected = httpx.HTTPStatusError(
+        "400 Bad Request", request=request, response=httpx.Response(400)
+    )
+    workers = [RecordingWorker(error=rejected), RecordingWorker(error=rejected)]
+    pool = WorkerPool(workers, retries=1)
+
+    # when the batch is completed, then the error is raised right away
+    with pytest.raises(httpx.HTTPStatusError):
+        await pool.complete(["x" * 100_000])
+
+    # and only one worker was asked, which is still healthy
+    assert sum(len(worker.batches) for worker in workers) == 1
+    assert all(stats.healthy for stats in pool.stats())
+
+
+async def test_streamed_batch_is_streamed_by_one_worker():
+    # given a pool of a worker that streams
+    worker = StreamingWorker()
+    pool = WorkerPool([worker], count_tokens=len)
+
+    # when a batch is streamed
+    stream = pool.complete_stream(["a", "bb"])
+    first = await anext(stream)
+
+    # then the worker streams it and it is outstanding until it finished
+    assert first == (1, CompletionResponse("bb", 2))
+    assert pool.stats()[0].outstanding_batches == 1
+    assert pool.stats()[0].outstanding_tokens == 3
+    assert [item async for item in stream] == [(0, CompletionResponse("a", 1))]
+    assert worker.streamed == [["a", "bb"]]
+    assert pool.stats() == [
+        BackendStats(
+            healthy=True,
+            outstanding_batches=0,
+            outstanding_tokens=0,
+            batches=1,
+            tokens=3,
+            failures=0,
+        )
+    ]
+
+
+async def test_failed_stream_is_not_retried_on_another_worker():
+    # given a pool of two workers that are down
+    workers = [
+        RecordingWorker(error=ConnectionError("a")),
+        RecordingWorker(error=ConnectionError("b")),
+    ]
+    pool = WorkerPool(workers, retries=1)
+
+    # when a batch is streamed, then the error is raised right away
+    with pytest.raises(ConnectionError):
+        async for _ in pool.complete_stream(["a"]):
+            pass
+
+    # and the worker that was asked is marked unhealthy
+    assert sum(len(worker.batches) for worker in workers) == 1
+    assert sorted(stats.healthy for stats in pool.stats()) == [False, True]
+    assert sum(stats.failures for stats in pool.stats()) == 1
+
+
+async def test_health_checks_update_the_health_of_workers():
+    # given a pool of a recovered worker and one that went down
+    recovered = RecordingWorker()
+    down = RecordingWorker(error=ConnectionError("refused"))
+    pool = WorkerPool([recovered, down])
+    recovered.error = ConnectionError("refused")
+    await pool.check_health()
+    recovered.error = None
+
+    # when the health is checked
+    await pool.check_health()
+
+    # then the health of the workers is updated
+    assert [stats.healthy for stats in pool.stats()] == [True, False]
+
+
+def test_pool_needs_a_worker():
+    # when a pool without workers is created, then it is rejected
+    with pytest.raises(ValueError):
+        WorkerPool([])
+
+
+async def test_probe_uses_the_health_endpoint_of_http_workers():
+    # given an HTTP worker that counts its completion requests
+    completions: list[list[str]] = []
+    worker = make_worker()
+    complete = worker.complete
+
+    async def counting_complete(prompts: list[str]) -> list[CompletionResponse]:
+        completions.append(prompts)
+        return await complete(prompts)
+
+    worker.complete = counting_complete  # type: ignore[method-assign]
+
+    # when the worker is probed
+    await probe(worker)
+
+    # then its health endpoint answered without a completion
+    assert completions == []
+    await worker.aclose()
+
+
+async def test_probe_completes_a_prompt_without_a_health_endpoint():
+    # given a worker without a health endpoint
+    worker = RecordingWorker()
+
+    # when the worker is probed
+    await probe(worker)
+
+    # then an empty prompt was completed
+    assert worker.batches == [[""]]
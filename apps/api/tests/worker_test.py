@@ -0,0 +1,15 @@
+from procurement_api.worker import CompletionResponse, StubWorker
+
+
+async def test_stub_worker_streams_the_completions_of_a_batch():
+    # given a stub worker
+    worker = StubWorker()
+
+    # when prompts are completed as a stream
+    streamed = [item async for item in worker.complete_stream(["a", "bb"])]
+
+    # then each prompt's index came with its completion
+    assert streamed == [
+        (0, CompletionResponse(completion="a", tokens=1)),
+        (1, CompletionResponse(completion="bb", tokens=2)),
+    ]
@@ -45,6 +45,41 @@ interface ProcurementRequestData {
   department: string;
 }
 
+// Data of the events of the streaming intake endpoint, `result` holds the whole extraction
+type IntakeStreamData = Partial<ProcurementRequestData> & {
+  name?: string;
+  value?: string | number | null;
+  index?: number;
+  order_line?: OrderLine;
+  detail?: string;
+};
+
+// Read a Server-Sent Events body and call onEvent for each event with its parsed data
+async function readServerSentEvents(
+  body: ReadableStream<Uint8Array>,
+  onEvent: (event: string, data: IntakeStreamData) => void,
+) {
+  const reader = body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      onEvent(event, JSON.parse(data));
+    }
+  }
+}
+
 export default function Intake() {
   const [formData, setFormData] = useState<ProcurementRequestData>({
     requestor_name: '',
@@ -148,37 +183,43 @@ export default function Intake() {
       const formDataUpload = new FormData();
       formDataUpload.append('file', file);
 
+      // Stream the extraction so fields fill in as soon as the model generated them
       const agentApiUrl = import.meta.env.VITE_AGENT_API_URL || 'http://localhost:8082';
-      const response = await fetch(`${agentApiUrl}/agent/intake`, {
+      const response = await fetch(`${agentApiUrl}/agent/intake/stream`, {
         method: 'POST',
         body: formDataUpload,
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error(`Upload failed: ${response.statusText}`);
       }
 
-      const data = await response.json();
-
-      // Calculate total_cost from order_lines
-      const total_cost = (data.order_lines || []).reduce((sum: number, line: OrderLine) => sum + line.total_price, 0);
-
-      // Prefill form with response data
-      setFormData({
-        requestor_name: data.requestor_name || '',
-        title: data.title || '',
-        vendor_name: data.vendor_name || '',
-        vat_id: data.vat_id || '',
-        commodity_group: data.commodity_group || '',
-        order_lines: data.order_lines && data.order_lines.length > 0 ? data.order_lines : [{
-          position_description: '',
-          unit_price: 0,
-          amount: 0,
-          unit: '',
-          total_price: 0,
-        }],
-        total_cost: data.total_cost || total_cost || 0,
-        department: data.department || '',
+      await readServerSentEvents(response.body, (event, data) => {
+        switch (event) {
+          case 'field': {
+            const { name, value } = data;
+            if (name) {
+              setFormData((prev) => ({ ...prev, [name]: value ?? '' }));
+            }
+            break;
+          }
+          case 'order_line': {
+            const { index, order_line } = data;
+            if (index === undefined || !order_line) break;
+            setFormData((prev) => {
+              const order_lines = [...prev.order_lines];
+              order_lines[index] = order_line;
+              const total_cost = order_lines.reduce((sum, line) => sum + (line?.total_price || 0), 0);
+              return { ...prev, order_lines, total_cost };
+            });
+            break;
+          }
+          case 'result':
+            prefillForm(data);
+            break;
+          case 'error':
+            throw new Error(data.detail || 'Failed to process document');
+        }
       });
 
       setSuccess('Document processed successfully! Form fields have been pre-filled.');
@@ -189,6 +230,29 @@ export default function Intake() {
     }
   };
 
+  const prefillForm = (data: Partial<ProcurementRequestData>) => {
+    // Calculate total_cost from order_lines
+    const total_cost = (data.order_lines || []).reduce((sum: number, line: OrderLine) => sum + line.total_price, 0);
+
+    // Prefill form with response data
+    setFormData({
+      requestor_name: data.requestor_name || '',
+      title: data.title || '',
+      vendor_name: data.vendor_name || '',
+      vat_id: data.vat_id || '',
+      commodity_group: data.commodity_group || '',
+      order_lines: data.order_lines && data.order_lines.length > 0 ? data.order_lines : [{
+        position_description: '',
+        unit_price: 0,
+        amount: 0,
+        unit: '',
+        total_price: 0,
+      }],
+      total_cost: data.total_cost || total_cost || 0,
+      department: data.department || '',
+    });
+  };
+
   const handleRemoveFile = () => {
     // Revoke the blob URL to free memory
     if (pdfUrl) {
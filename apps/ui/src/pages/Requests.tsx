@@ -48,9 +48,13 @@ interface RequestData {
   id: string;
   created_at: string;
   status: string;
+  version: number;
   request: ProcurementRequest;
 }
 
+// Requests only move forward: open -> in-progress -> closed
+const statusOrder = ['open', 'in-progress', 'closed'];
+
 const statusColors: Record<string, 'default' | 'warning' | 'success'> = {
   open: 'default',
   'in-progress': 'warning',
@@ -71,6 +75,8 @@ export default function Requests() {
   const [error, setError] = useState<string | null>(null);
   const [success, setSuccess] = useState<string | null>(null);
   const [statusLoading, setStatusLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const intakeApiUrl = import.meta.env.VITE_INTAKE_API_URL || 'http://localhost:8081';
 
@@ -90,16 +96,22 @@ export default function Requests() {
     }
   }, [id]);
 
+  const fetchRequestsPage = async (cursor: string | null) => {
+    const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    const response = await fetch(`${intakeApiUrl}/intake/requests${params}`);
+    if (!response.ok) {
+      throw new Error(`Failed to fetch requests: ${response.statusText}`);
+    }
+    const data: RequestData[] = await response.json();
+    setNextCursor(response.headers.get('X-Next-Cursor'));
+    return data;
+  };
+
   const fetchAllRequests = async () => {
     setLoading(true);
     setError(null);
     try {
-      const response = await fetch(`${intakeApiUrl}/intake/requests`);
-      if (!response.ok) {
-        throw new Error(`Failed to fetch requests: ${response.statusText}`);
-      }
-      const data = await response.json();
-      setRequests(data);
+      setRequests(await fetchRequestsPage(null));
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to fetch requests');
     } finally {
@@ -107,6 +119,21 @@ export default function Requests() {
     }
   };
 
+  const fetchMoreRequests = async () => {
+    if (!nextCursor) return;
+
+    setLoadingMore(true);
+    setError(null);
+    try {
+      const data = await fetchRequestsPage(nextCursor);
+      setRequests((previous) => [...previous, ...data]);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to fetch requests');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchRequestById = async (requestId: string) => {
     setLoading(true);
     setError(null);
@@ -136,10 +163,14 @@ export default function Requests() {
         method: 'PATCH',
         headers: {
           'Content-Type': 'application/json',
+          'If-Match': `"${selectedRequest.version}"`,
         },
         body: JSON.stringify({ status: newStatus }),
       });
 
+      if (response.status === 412) {
+        throw new Error('The request was changed by someone else. Reload it and try again.');
+      }
       if (!response.ok) {
         throw new Error(`Failed to update status: ${response.statusText}`);
       }
@@ -237,6 +268,14 @@ export default function Requests() {
               ))}
             </Box>
           )}
+
+          {!loading && nextCursor && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', mt: 3 }}>
+              <Button variant="outlined" onClick={fetchMoreRequests} disabled={loadingMore}>
+                {loadingMore ? <CircularProgress size={24} /> : 'Load more'}
+              </Button>
+            </Box>
+          )}
         </Box>
       </Container>
     );
@@ -302,9 +341,19 @@ export default function Requests() {
                   onChange={(e) => handleStatusChange(e.target.value)}
                   disabled={statusLoading}
                 >
-                  <MenuItem value="open">Open</MenuItem>
-                  <MenuItem value="in-progress">In Progress</MenuItem>
-                  <MenuItem value="closed">Closed</MenuItem>
+                  {[
+                    ['open', 'Open'],
+                    ['in-progress', 'In Progress'],
+                    ['closed', 'Closed'],
+                  ].map(([value, label]) => (
+                    <MenuItem
+                      key={value}
+                      value={value}
+                      disabled={statusOrder.indexOf(value) < statusOrder.indexOf(selectedRequest.status)}
+                    >
+                      {label}
+                    </MenuItem>
+                  ))}
                 </Select>
               </FormControl>
             </Box>